@@ -0,0 +1,172 @@
+import threading
+import time
+
+import numpy as np
+
+from pose_result import KEYPOINT_CONF_THRESHOLD, PoseResult, result_arrays
+
+NEAR_MARGIN = 15.0  # Degrees from a threshold within which every frame is inferred
+FAR_MARGIN = 60.0  # Degrees from the nearest threshold at which the most frames are skipped
+MAX_SKIP_FRAMES = 4  # Most consecutive frames filled in by prediction
+FRAME_INTERVAL_SMOOTHING = 0.2  # EMA weight of the newest inter-frame interval
+
+
+class AdaptiveRateController:
+    """
+    Decides per frame whether a session needs a real pose inference or can be
+    served a predicted pose. After each inference the driving metric (e.g. the
+    elbow angle) is compared with the thresholds that can move the current
+    rep phase on: near one every frame is inferred, far from all of them up
+    to max_skip frames in a row are skipped. The skip run is also capped so
+    that, at the angle's current speed, it ends before the angle could get
+    within near_margin of a threshold, so no transition happens unobserved.
+
+    Skipped frames get the last inferred keypoints moved along their
+    constant per-keypoint velocity (estimated from the last two inferences).
+
+    metric_fn(keypoints_data, exercise) returns the exercise's metrics dict
+    and thresholds maps exercise -> (metric name, {phase: threshold angles}).
+    """
+
+    def __init__(self, metric_fn, thresholds, near_margin=NEAR_MARGIN,
+                 far_margin=FAR_MARGIN, max_skip=MAX_SKIP_FRAMES):
+        self.metric_fn = metric_fn
+        self.thresholds = thresholds
+        self.near_margin = near_margin
+        self.far_margin = far_margin
+        self.max_skip = max_skip
+        self._lock = threading.Lock()
+        self._keypoints = None  # Last inferred (17, 3) keypoints of the tracked person
+        self._box = None
+        self._velocity = None  # Pixels per second, per keypoint
+        self._metric = None
+        self._inferred_at = 0.0
+        self._exercise = None
+        self._allowed_skip = 0
+        self._skipped = 0
+        self._last_frame_at = None
+        self._frame_interval = None
+        self.inferred_frames = 0
+        self.predicted_frames = 0
+
+    def predict(self, frame, exercise, now=None):
+        """Returns a predicted PoseResult for frame, or None if it must be inferred."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._note_frame(now)
+            if (self._keypoints is None or exercise != self._exercise
+                    or self._skipped >= self._allowed_skip):
+                return None
+
+            elapsed = now - self._inferred_at
+            keypoints = self._keypoints.copy()
+            visible = keypoints[:, 2] >= KEYPOINT_CONF_THRESHOLD
+            keypoints[visible, :2] += self._velocity[visible] * elapsed
+            box = self._box.copy()
+            if visible.any():
+                # Move the box with the body's mean motion
+                shift = self._velocity[visible].mean(axis=0) * elapsed
+                box[[0, 2]] += shift[0]
+                box[[1, 3]] += shift[1]
+
+            self._skipped += 1
+            self.predicted_frames += 1
+        return PoseResult(keypoints[None], box[None], frame, predicted=True)
+
+    def observe(self, result, exercise, phase=None, now=None):
+        """
+        Records an inference result and plans how many frames may be skipped
+        next. phase is the rep state ("down", "up", ...) before this frame.
+        """
+        now = time.monotonic() if now is None else now
+        keypoints = result_arrays(result)[0] if result is not None else ()
+        with self._lock:
+            self.inferred_frames += 1
+            self._skipped = 0
+            if len(keypoints) == 0:
+                # Nobody in view: keep inferring every frame until someone is found
+                self._keypoints = None
+                self._allowed_skip = 0
+                return
+
+            person = np.array(keypoints[0], dtype=np.float32)
+            box = np.array(result_arrays(result)[1][0, :6], dtype=np.float32)
+            metric = self.metric_fn(person[None], exercise).get(self._metric_name(exercise))
+
+            velocity = np.zeros((len(person), 2), np.float32)
+            metric_rate = 0.0
+            elapsed = now - self._inferred_at
+            if self._keypoints is not None and exercise == self._exercise and elapsed > 0:
+                both = ((person[:, 2] >= KEYPOINT_CONF_THRESHOLD)
+                        & (self._keypoints[:, 2] >= KEYPOINT_CONF_THRESHOLD))
+                velocity[both] = (person[both, :2] - self._keypoints[both, :2]) / elapsed
+                if metric is not None and self._metric is not None:
+                    metric_rate = (metric - self._metric) / elapsed
+
+            self._keypoints, self._box, self._velocity = person, box, velocity
+            self._metric, self._inferred_at, self._exercise = metric, now, exercise
+            self._allowed_skip = self._plan_skip(exercise, phase, metric, metric_rate)
+
+    def reset(self):
+        with self._lock:
+            self._keypoints = None
+            self._metric = None
+            self._allowed_skip = 0
+            self._skipped = 0
+
+    def stats(self):
+        total = self.inferred_frames + self.predicted_frames
+        return {
+            "inferred_frames": self.inferred_frames,
+            "predicted_frames": self.predicted_frames,
+            "predicted_ratio": round(self.predicted_frames / total, 3) if total else 0.0
+        }
+
+    def _metric_name(self, exercise):
+        entry = self.thresholds.get(exercise)
+        return entry[0] if entry else None
+
+    def _note_frame(self, now):
+        if self._last_frame_at is not None and now > self._last_frame_at:
+            interval = now - self._last_frame_at
+            if self._frame_interval is None:
+                self._frame_interval = interval
+            else:
+                self._frame_interval += FRAME_INTERVAL_SMOOTHING * (interval - self._frame_interval)
+        self._last_frame_at = now
+
+    def _plan_skip(self, exercise, phase, metric, metric_rate):
+        entry = self.thresholds.get(exercise)
+        if entry is None or metric is None:
+            # No known state machine for this exercise: infer every frame
+            return 0
+
+        # Unknown phase: stay clear of every threshold of the exercise
+        thresholds = entry[1].get(phase) or [t for ts in entry[1].values() for t in ts]
+        margin = min(abs(metric - threshold) for threshold in thresholds)
+        if margin <= self.near_margin:
+            return 0
+        span = max(self.far_margin - self.near_margin, 1e-6)
+        allowed = int(self.max_skip * min(1.0, (margin - self.near_margin) / span))
+
+        # At the current angular speed, stop skipping before reaching the near band
+        if metric_rate and self._frame_interval:
+            frames_to_band = (margin - self.near_margin) / (abs(metric_rate) * self._frame_interval)
+            allowed = min(allowed, int(frames_to_band))
+        return max(0, allowed)
+
+
+def adaptive_inference(controller, frame, exercise, infer, state=None):
+    """
+    Serves frame from the controller's prediction when it allows a skip and
+    runs infer(frame) otherwise. state is the session's exercise state, whose
+    current phase picks the thresholds to watch. Returns a result like infer does.
+    """
+    now = time.monotonic()
+    predicted = controller.predict(frame, exercise, now)
+    if predicted is not None:
+        return predicted
+    result = infer(frame)
+    phase = state.get("current_state") if state is not None else None
+    controller.observe(result, exercise, phase, now)
+    return result
@@ -0,0 +1,294 @@
+import argparse
+import itertools
+import os
+import time
+from collections import deque
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import cv2
+import numpy as np
+
+from inference_workers import InferenceWorkerPool
+from pose_result import NUM_KEYPOINTS, result_arrays
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; without it columns are written as .npz
+    pa = None
+
+CHUNK_SECONDS = 10.0  # Length of the slices rep state is stitched and progress reported in
+ANALYSIS_BATCH_SIZE = 8  # Most frames a worker runs in one batched model call
+DEFAULT_FPS = 30.0  # Used when the container doesn't report a frame rate
+WORKER_CHECK_INTERVAL = 1.0  # Seconds between worker liveness checks while waiting for a frame
+
+
+def probe_video(path):
+    """
+    Returns (frame_count, fps). frame_count is None when the container
+    doesn't say (e.g. WebM from the browser recorder); the decoder then
+    simply reads until the end.
+    """
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video: {path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or DEFAULT_FPS
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return (frame_count if frame_count > 0 else None), fps
+
+
+def read_frames(path):
+    """
+    Yields every frame of the video in order from one sequential decoder.
+    Never seeks, since seeking is unreliable in some containers (e.g.
+    browser WebM) and every frame is needed anyway.
+    """
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video: {path}")
+    try:
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                return
+            yield frame
+    finally:
+        cap.release()
+
+
+def _wait(pool, future):
+    while True:
+        try:
+            return future.result(WORKER_CHECK_INTERVAL)
+        except FutureTimeout:
+            if pool.stats()["alive"] < pool.num_workers:
+                raise RuntimeError("An inference worker died during the analysis")
+
+
+def infer_in_order(pool, frames, imgsz=None, window=None):
+    """
+    Runs frames through the worker pool as they are decoded, with up to
+    window frames in flight, and yields each frame's result in frame
+    order. Frames that don't fit the pool's slots (the video changed
+    resolution) yield None, as if nobody was found.
+    """
+    window = window or pool.slots
+    pending = deque()
+    skipped = 0
+    for frame in frames:
+        if pool.fits(frame):
+            pending.append(pool.submit(frame, imgsz))
+        else:
+            if not skipped:
+                print(f"⚠️ Frame of shape {frame.shape} is larger than the first frame, skipping such frames")
+            skipped += 1
+            pending.append(None)
+        while len(pending) > window:
+            future = pending.popleft()
+            yield future and _wait(pool, future)
+    while pending:
+        future = pending.popleft()
+        yield future and _wait(pool, future)
+
+
+def collect_chunks(results, exercise, chunk_frames):
+    """
+    Groups per-frame results (in frame order) into chunks of chunk_frames:
+    the first person's keypoints and per-frame metrics, as RepStitcher.feed
+    and frame_columns take them.
+    """
+    from gym_posture_correction_yolo import compute_metrics
+
+    results = iter(results)
+    for start in itertools.count(0, chunk_frames):
+        batch = list(itertools.islice(results, chunk_frames))
+        if not batch:
+            return
+        keypoints = np.zeros((len(batch), NUM_KEYPOINTS, 3), np.float32)
+        found = np.zeros(len(batch), bool)
+        for i, result in enumerate(batch):
+            people = result_arrays(result)[0] if result is not None else ()
+            if len(people):
+                keypoints[i] = people[0]
+                found[i] = True
+        metrics = [compute_metrics(keypoints[i:i + 1], exercise) if found[i] else {} for i in range(len(batch))]
+        yield {"start": start, "keypoints": keypoints, "found": found, "metrics": metrics}
+
+
+class RepStitcher:
+    """
+    Replays per-frame metrics through the live rep state machine chunk by
+    chunk in frame order, so reps count exactly as in the live app. Collects per-frame state and per-rep
+    summaries (start/end frame, duration, metric range). A rep starts at the
+    frame, before it completes, where the driving metric was furthest from
+    the completing threshold (e.g. the last full extension of a curl).
+    """
+
+    def __init__(self, exercise, fps):
+        from gym_posture_correction_yolo import REP_THRESHOLDS, new_exercise_state
+        self.exercise = exercise
+        self.fps = fps
+        self.state = new_exercise_state()
+        self.rep_counts = []
+        self.phases = []
+        self.reps = []
+        self._metric, phase_thresholds = REP_THRESHOLDS.get(exercise, (None, {}))
+        self._completion = phase_thresholds.get("down", (None,))[0]
+        self._rep_start = 0
+        self._rep_metrics = []
+        self._furthest = -1.0
+
+    def feed(self, chunk):
+        from gym_posture_correction_yolo import update_rep_state
+
+        for i, metrics in enumerate(chunk["metrics"]):
+            frame = chunk["start"] + i
+            before = self.state["rep_count"]
+            if chunk["found"][i]:
+                update_rep_state(metrics, self.exercise, self.state)
+                self._track(frame, metrics)
+            if self.state["rep_count"] > before:
+                self._close_rep(frame)
+            self.rep_counts.append(self.state["rep_count"])
+            self.phases.append(self.state["current_state"])
+
+    def _track(self, frame, metrics):
+        value = metrics.get(self._metric)
+        if value is not None and self._completion is not None and self.state["current_state"] == "down":
+            distance = abs(value - self._completion)
+            if distance >= self._furthest:
+                # Back at (or beyond) the start position: the rep starts here
+                self._furthest = distance
+                self._rep_start = frame
+                self._rep_metrics = []
+        self._rep_metrics.append(metrics)
+
+    def _close_rep(self, frame):
+        summary = {
+            "rep": self.state["rep_count"],
+            "start_frame": self._rep_start,
+            "end_frame": frame,
+            "start_s": round(self._rep_start / self.fps, 3),
+            "end_s": round(frame / self.fps, 3),
+            "duration_s": round((frame - self._rep_start) / self.fps, 3)
+        }
+        for name in sorted({name for metrics in self._rep_metrics for name in metrics}):
+            values = [metrics[name] for metrics in self._rep_metrics if name in metrics]
+            summary[f"min_{name}"] = round(float(min(values)), 2)
+            summary[f"max_{name}"] = round(float(max(values)), 2)
+        self.reps.append(summary)
+        self._rep_start = frame
+        self._rep_metrics = []
+        self._furthest = -1.0
+
+
+def frame_columns(chunks, stitcher, fps):
+    """Per-frame columns: frame, time, person found, rep state, metrics and every keypoint's x/y/confidence."""
+    # The empty arrays keep a video without frames at empty columns
+    keypoints = np.concatenate([np.zeros((0, NUM_KEYPOINTS, 3), np.float32)] + [chunk["keypoints"] for chunk in chunks])
+    metrics = [m for chunk in chunks for m in chunk["metrics"]]
+    frames = np.concatenate([np.zeros(0, np.int64)] + [np.arange(chunk["start"], chunk["start"] + len(chunk["found"]))
+                                                       for chunk in chunks])
+
+    columns = {
+        "frame": frames,
+        "time_s": frames / fps,
+        "person_found": np.concatenate([np.zeros(0, bool)] + [chunk["found"] for chunk in chunks]),
+        "rep_count": np.array(stitcher.rep_counts, np.int32),
+        "phase": np.array(stitcher.phases)
+    }
+    for name in sorted({name for m in metrics for name in m}):
+        columns[name] = np.array([m.get(name, np.nan) for m in metrics], np.float32)
+    for k in range(NUM_KEYPOINTS):
+        for j, axis in enumerate(("x", "y", "conf")):
+            columns[f"kp{k}_{axis}"] = keypoints[:, k, j]
+    return columns
+
+
+def write_columns(columns, path_stem):
+    """Writes a dict of equal-length columns as Parquet (with pyarrow) or .npz. Returns the path."""
+    if pa is not None:
+        path = path_stem + ".parquet"
+        pq.write_table(pa.table({name: np.asarray(values) for name, values in columns.items()}), path)
+    else:
+        path = path_stem + ".npz"
+        np.savez(path, **{name: np.asarray(values) for name, values in columns.items()})
+    return path
+
+
+def analyze_video(path, exercise="bicep_curl", workers=None, chunk_seconds=CHUNK_SECONDS,
+                  engine=None, imgsz=None, out_dir=None):
+    """
+    Re-scores a recorded session: decodes the video once, in order, and
+    runs pose inference on its frames in parallel worker processes (see
+    inference_workers), stitches rep state in frame order and writes
+    <name>_frames and <name>_reps columnar files. Returns a summary dict
+    including frames/sec.
+    """
+    from gym_posture_correction_yolo import INFERENCE_ENGINE
+
+    start_time = time.perf_counter()
+    frame_count, fps = probe_video(path)
+    workers = workers or (os.cpu_count() or 1) // 2 or 1
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    print(f"🎬 {path}: {frame_count or 'unknown number of'} frames at {fps:.1f} fps on {workers} worker(s)")
+
+    stitcher = RepStitcher(exercise, fps)
+    results = []
+    frames = read_frames(path)
+    first = next(frames, None)
+    if first is not None:
+        # Slots sized to the video, so frames are copied into shared memory and never pickled
+        pool = InferenceWorkerPool(workers, threads_per_worker=threads, max_frame_shape=first.shape[:2],
+                                   max_batch_size=ANALYSIS_BATCH_SIZE, engine=engine or INFERENCE_ENGINE,
+                                   warmup_sizes=[first.shape[:2]])
+        try:
+            if not pool.wait_ready():
+                raise RuntimeError("Inference workers failed to start")
+            poses = infer_in_order(pool, itertools.chain([first], frames), imgsz)
+            chunk_frames = max(1, int(round(chunk_seconds * fps)))
+            for chunk in collect_chunks(poses, exercise, chunk_frames):
+                stitcher.feed(chunk)
+                results.append(chunk)
+                print(f"   ✅ {len(stitcher.rep_counts)}/{frame_count or '?'} frames, "
+                      f"{stitcher.state['rep_count']} reps")
+        finally:
+            frames.close()
+            pool.close()
+
+    out_dir = out_dir or os.path.dirname(os.path.abspath(path))
+    stem = os.path.join(out_dir, os.path.splitext(os.path.basename(path))[0])
+    frames_path = write_columns(frame_columns(results, stitcher, fps), stem + "_frames")
+    rep_columns = {name: [rep.get(name, np.nan) for rep in stitcher.reps]
+                   for name in dict.fromkeys(name for rep in stitcher.reps for name in rep)}
+    reps_path = write_columns(rep_columns, stem + "_reps")
+
+    elapsed = time.perf_counter() - start_time
+    processed = len(stitcher.rep_counts)
+    summary = {
+        "frames": processed,
+        "reps": stitcher.state["rep_count"],
+        "seconds": round(elapsed, 2),
+        "frames_per_second": round(processed / elapsed, 1) if elapsed else 0.0,
+        "frames_file": frames_path,
+        "reps_file": reps_path
+    }
+    print(f"🏁 {processed} frames in {elapsed:.1f}s ({summary['frames_per_second']} frames/sec), "
+          f"{summary['reps']} reps -> {frames_path}, {reps_path}")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-score a recorded workout video offline")
+    parser.add_argument("video")
+    parser.add_argument("--exercise", default="bicep_curl")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: half the CPUs)")
+    parser.add_argument("--chunk-seconds", type=float, default=CHUNK_SECONDS,
+                        help="Progress is reported every this many seconds of video")
+    parser.add_argument("--engine", choices=["ultralytics", "onnx"], default=None)
+    parser.add_argument("--imgsz", type=int, default=None, help="Network input size override")
+    parser.add_argument("--out-dir", default=None, help="Output directory (default: next to the video)")
+    args = parser.parse_args()
+    analyze_video(args.video, args.exercise, args.workers, args.chunk_seconds, args.engine, args.imgsz,
+                  args.out_dir)
@@ -0,0 +1,163 @@
+# Production serving mode: the same Socket.IO events and REST endpoints as
+# flask_backend on an asyncio (ASGI) Socket.IO server, instead of the Werkzeug
+# development server's thread per connection. The event loop only handles
+# connections and admission; decode, inference and encode run on the frame
+# pipeline's threads (or a bounded executor when the pipeline is off), so an
+# idle connection costs one coroutine. All REPWISE_* settings apply.
+#
+# Run with `python asgi_backend.py` or `uvicorn asgi_backend:app`.
+import asyncio
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import socketio
+
+import flask_backend as backend
+
+HOST = os.environ.get("REPWISE_HOST", "0.0.0.0")
+PORT = int(os.environ.get("REPWISE_PORT", "5000"))
+# Threads for blocking work off the event loop: REST requests, and whole frames when the pipeline is off
+ASGI_EXECUTOR_WORKERS = int(os.environ.get("REPWISE_ASGI_EXECUTOR_WORKERS", "4"))
+ASGI_BACKLOG = int(os.environ.get("REPWISE_ASGI_BACKLOG", "2048"))  # Pending TCP connections the socket queues
+
+sio = socketio.AsyncServer(async_mode="asgi", cors_allowed_origins="*")
+executor = ThreadPoolExecutor(ASGI_EXECUTOR_WORKERS, thread_name_prefix="asgi-worker")
+loop = None  # The server's event loop, set on startup
+
+
+def emit_from_thread(sid, event, data):
+    """Emitter for flask_backend: results are produced on worker threads and sent on the event loop."""
+    asyncio.run_coroutine_threadsafe(sio.emit(event, data, to=sid), loop)
+
+
+@sio.event
+async def connect(sid, environ, auth=None):
+    # No session until the client sends a frame or configures, so idle connections stay cheap
+    backend.sessions.connect(sid)
+    await sio.emit('connected', {'status': 'ok', 'sid': sid}, to=sid)
+
+
+@sio.event
+async def disconnect(sid, *args):
+    backend.close_session(sid)
+
+
+@sio.event
+async def configure(sid, data):
+    event, payload = backend.configure_session(sid, data)
+    await sio.emit(event, payload, to=sid)
+
+
+@sio.event
+async def frame(sid, data):
+    session, item, error = backend.accept_frame(sid, data)
+    if error is not None:
+        await sio.emit('error', {'message': error}, to=sid)
+        return
+    if item is None:
+        return  # Parked in the mailbox; started when the in-flight frame finishes
+
+    if backend.pipeline is not None:
+        backend.submit_frame(session, *item)  # Never blocks: the pipeline intake is unbounded
+    else:
+        await loop.run_in_executor(executor, backend.drain_frames, session, item)
+
+
+@sio.event
+async def reset_exercise(sid, *args):
+    backend.reset_session(sid)
+    await sio.emit('reset_complete', {'status': 'ok'}, to=sid)
+
+
+def _wsgi_environ(scope, body):
+    server_name, server_port = scope.get("server") or ("localhost", PORT)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", ""),
+        "PATH_INFO": scope["path"],
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": server_name,
+        "SERVER_PORT": str(server_port),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": scope["client"][0] if scope.get("client") else "",
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False
+    }
+    for name, value in scope["headers"]:
+        name = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if name == "CONTENT_TYPE":
+            environ["CONTENT_TYPE"] = value
+        elif name != "CONTENT_LENGTH":
+            key = f"HTTP_{name}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def _call_wsgi(environ):
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response["status"] = int(status.split(" ", 1)[0])
+        response["headers"] = headers
+
+    chunks = backend.app(environ, start_response)
+    try:
+        response["body"] = b"".join(chunks)
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+    return response
+
+
+async def rest_app(scope, receive, send):
+    """Serves the Flask routes (/health, /reset, /metrics, /admin/...) on the executor."""
+    if scope["type"] != "http":
+        return
+    body = b""
+    more = True
+    while more:
+        message = await receive()
+        body += message.get("body", b"")
+        more = message.get("more_body", False)
+
+    response = await loop.run_in_executor(executor, _call_wsgi, _wsgi_environ(scope, body))
+    await send({
+        "type": "http.response.start",
+        "status": response["status"],
+        "headers": [(name.lower().encode("latin-1"), value.encode("latin-1"))
+                    for name, value in response["headers"]]
+    })
+    await send({"type": "http.response.body", "body": response["body"]})
+
+
+async def startup():
+    global loop
+    loop = asyncio.get_running_loop()
+    backend.set_emitter(emit_from_thread)
+    # Same as the threaded server: the model is warm before the first frame
+    await loop.run_in_executor(executor, backend.prepare_inference)
+    print(f"🚀 ASGI server ready ({'pipeline' if backend.pipeline is not None else 'executor'} mode)")
+
+
+def shutdown():
+    executor.shutdown(wait=False)
+
+
+app = socketio.ASGIApp(sio, other_asgi_app=rest_app, on_startup=startup, on_shutdown=shutdown)
+
+
+if __name__ == "__main__":
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("❌ The ASGI server needs uvicorn: pip install 'uvicorn[standard]'")
+    uvicorn.run(app, host=HOST, port=PORT, backlog=ASGI_BACKLOG, log_level="info" if backend.DEBUG else "warning")
@@ -0,0 +1,273 @@
+import argparse
+import base64
+import glob
+import json
+import os
+import platform
+import subprocess
+import time
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+
+STAGES = ("decode", "inference", "plot", "encode", "base64")
+PERCENTILES = (50, 95, 99)
+SYNTHETIC_FRAMES = 120
+SYNTHETIC_SIZE = (480, 640)  # (height, width)
+WARMUP_FRAMES = 5
+MAX_REGRESSION = 0.10  # Allowed slowdown of a p50/p95 against the baseline before --compare fails
+
+
+def synthetic_corpus(count=SYNTHETIC_FRAMES, size=SYNTHETIC_SIZE, quality=90):
+    """JPEG bytes of a stick figure curling its right arm, so the harness runs without a camera."""
+    height, width = size
+    rng = np.random.default_rng(0)
+    background = rng.integers(40, 80, (height, width, 3), dtype=np.uint8)
+    frames = []
+    for i in range(count):
+        frame = background.copy()
+        cx, cy, scale = width // 2, height // 3, height / 480
+        shoulder = (int(cx - 40 * scale), cy)
+        elbow = (shoulder[0], int(cy + 90 * scale))
+        angle = np.radians(105 + 70 * np.cos(2 * np.pi * i / 40))
+        wrist = (int(elbow[0] + 80 * scale * np.sin(angle)), int(elbow[1] - 80 * scale * np.cos(angle)))
+        cv2.circle(frame, (cx, int(cy - 60 * scale)), int(35 * scale), (200, 180, 160), -1)
+        cv2.line(frame, (cx, cy), (cx, int(cy + 180 * scale)), (200, 180, 160), int(30 * scale))
+        cv2.line(frame, shoulder, elbow, (200, 180, 160), int(18 * scale))
+        cv2.line(frame, elbow, wrist, (200, 180, 160), int(16 * scale))
+        frames.append(cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes())
+    return frames
+
+
+def load_corpus(path, limit=None):
+    """JPEG bytes from a directory of .jpg/.jpeg files or from a video file."""
+    if os.path.isdir(path):
+        files = sorted(glob.glob(os.path.join(path, "*.jpg")) + glob.glob(os.path.join(path, "*.jpeg")))
+        frames = []
+        for name in files[:limit]:
+            with open(name, "rb") as f:
+                frames.append(f.read())
+        return frames
+
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while limit is None or len(frames) < limit:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(cv2.imencode(".jpg", frame)[1].tobytes())
+    cap.release()
+    return frames
+
+
+class StageTimer:
+    """Collects per-frame durations of each stage, in milliseconds."""
+
+    def __init__(self):
+        self.samples = {stage: [] for stage in STAGES}
+        self.totals = []
+        self._current = {}
+
+    def wrap(self, stage, fn):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._current[stage] = self._current.get(stage, 0.0) + (time.perf_counter() - start) * 1000
+        return timed
+
+    def frame_done(self, total_ms):
+        for stage in STAGES:
+            self.samples[stage].append(self._current.get(stage, 0.0))
+        self.totals.append(total_ms)
+        self._current = {}
+
+    def summary(self, wall_seconds):
+        def stats(values):
+            values = np.asarray(values)
+            result = {f"p{p}": round(float(np.percentile(values, p)), 3) for p in PERCENTILES}
+            result["mean"] = round(float(values.mean()), 3)
+            return result
+
+        return {
+            "frames": len(self.totals),
+            "fps": round(len(self.totals) / wall_seconds, 2) if wall_seconds else 0.0,
+            "stages": {stage: stats(values) for stage, values in self.samples.items()},
+            "total": stats(self.totals)
+        }
+
+
+class _TimedModule:
+    """Stands in for a module inside the code under test, timing selected functions."""
+
+    def __init__(self, module, timer, stages):
+        self._module = module
+        self._wrapped = {name: timer.wrap(stage, getattr(module, name)) for name, stage in stages.items()}
+
+    def __getattr__(self, name):
+        if name in self._wrapped:
+            return self._wrapped[name]
+        return getattr(self._module, name)
+
+
+class _Silent:
+    """Stands in for a SpeechWorker, dropping every announcement."""
+
+    def say(self, text, force=False):
+        pass
+
+
+@contextmanager
+def _patched(target, **attributes):
+    originals = {name: getattr(target, name) for name in attributes}
+    for name, value in attributes.items():
+        setattr(target, name, value)
+    try:
+        yield
+    finally:
+        for name, value in originals.items():
+            setattr(target, name, value)
+
+
+def _run(corpus, timer, analyze, warmup):
+    for image in corpus[:warmup]:
+        analyze(image)
+    timer.__init__()  # Warmup frames don't count
+
+    wall_start = time.perf_counter()
+    for image in corpus:
+        start = time.perf_counter()
+        analyze(image)
+        timer.frame_done((time.perf_counter() - start) * 1000)
+    return timer.summary(time.perf_counter() - wall_start)
+
+
+def bench_yolo(corpus, warmup=WARMUP_FRAMES, response_mode="base64"):
+    """Times gym_posture_correction_yolo.analyze_pose_frame on base64 data URIs, as the web client sends them."""
+    import gym_posture_correction_yolo as yolo
+
+    timer = StageTimer()
+    payloads = ["data:image/jpeg;base64," + base64.b64encode(image).decode("ascii") for image in corpus]
+    yolo.get_model()  # Load before timing
+    plot_classes = {}
+
+    def infer(frame):
+        result = yolo.infer_frame(frame)
+        # Time the result class's plot() (ultralytics Results or PoseResult) once we know it
+        if result is not None and type(result) not in plot_classes:
+            cls = type(result)
+            plot_classes[cls] = cls.plot
+            cls.plot = timer.wrap("plot", cls.plot)
+        return result
+
+    state = yolo.new_exercise_state()
+    try:
+        with _patched(yolo,
+                      decode_frame=timer.wrap("decode", yolo.decode_frame),
+                      run_inference=timer.wrap("inference", yolo.run_inference),
+                      cv2=_TimedModule(cv2, timer, {"imencode": "encode"}),
+                      base64=_TimedModule(base64, timer, {"b64encode": "base64"})):
+            return _run(payloads, timer,
+                        lambda image: yolo.analyze_pose_frame(image, "bicep_curl", state, infer, response_mode),
+                        warmup)
+    finally:
+        for cls, plot in plot_classes.items():
+            cls.plot = plot
+
+
+def bench_mediapipe(corpus, warmup=WARMUP_FRAMES):
+    """Times gym_posture_correction_api.analyze_pose_frame; decode is timed here since it takes decoded frames."""
+    import gym_posture_correction_api as api
+
+    timer = StageTimer()
+    pose = api.get_pose()
+    timed_pose = _TimedModule(pose, timer, {"process": "inference"})
+    decode = timer.wrap("decode", lambda image: cv2.imdecode(np.frombuffer(image, np.uint8), cv2.IMREAD_COLOR))
+
+    with _patched(api,
+                  get_pose=lambda: timed_pose,
+                  speech=_Silent(),  # Speech is not part of the frame path
+                  draw_exercise_specs=timer.wrap("plot", api.draw_exercise_specs),
+                  cv2=_TimedModule(cv2, timer, {"imencode": "encode"}),
+                  base64=_TimedModule(base64, timer, {"b64encode": "base64"})):
+        return _run(corpus, timer, lambda image: api.analyze_pose_frame(decode(image), "bicep_curl"), warmup)
+
+
+def compare(results, baseline, max_regression=MAX_REGRESSION):
+    """Prints per-stage changes against a baseline results dict. Returns the list of regressions."""
+    regressions = []
+    for path, current in results["paths"].items():
+        previous = baseline.get("paths", {}).get(path)
+        if previous is None:
+            continue
+        rows = [(name, current["stages"][name], previous["stages"].get(name)) for name in STAGES]
+        rows.append(("total", current["total"], previous["total"]))
+        for name, now, before in rows:
+            if not before:
+                continue
+            for key in ("p50", "p95"):
+                if before[key] <= 0:
+                    continue
+                change = (now[key] - before[key]) / before[key]
+                marker = "❌" if change > max_regression else "  "
+                print(f"{marker} {path:10s} {name:10s} {key}: {before[key]:8.2f} -> {now[key]:8.2f} ms ({change:+.1%})")
+                if change > max_regression:
+                    regressions.append((path, name, key, change))
+        print(f"   {path:10s} fps: {previous['fps']} -> {current['fps']}")
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the analyze_pose_frame paths stage by stage")
+    parser.add_argument("--corpus", help="Directory of JPEG frames or a video file (default: synthetic frames)")
+    parser.add_argument("--limit", type=int, default=None, help="Most corpus frames to use")
+    parser.add_argument("--paths", default="yolo", help="Comma-separated paths to run: yolo, mediapipe")
+    parser.add_argument("--response-mode", default="base64", choices=["base64", "binary", "overlay"],
+                        help="Response mode for the yolo path")
+    parser.add_argument("--warmup", type=int, default=WARMUP_FRAMES)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="Baseline results JSON; exits non-zero on a regression")
+    parser.add_argument("--max-regression", type=float, default=MAX_REGRESSION)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus, args.limit) if args.corpus else synthetic_corpus(args.limit or SYNTHETIC_FRAMES)
+    if not corpus:
+        raise SystemExit(f"No frames found in {args.corpus}")
+    print(f"📦 {len(corpus)} frames ({args.corpus or 'synthetic'})")
+
+    results = {
+        "commit": _git_commit(),
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "corpus": args.corpus or "synthetic",
+        "paths": {}
+    }
+    benches = {"yolo": lambda: bench_yolo(corpus, args.warmup, args.response_mode),
+               "mediapipe": lambda: bench_mediapipe(corpus, args.warmup)}
+    for path in args.paths.split(","):
+        summary = benches[path]()
+        results["paths"][path] = summary
+        stages = ", ".join(f"{stage} {summary['stages'][stage]['p50']:.1f}" for stage in STAGES)
+        print(f"⏱️ {path}: {summary['fps']} fps, p50 ms: {stages}, "
+              f"total p50/p95/p99 {summary['total']['p50']}/{summary['total']['p95']}/{summary['total']['p99']}")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"💾 Saved {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.max_regression)
+        if regressions:
+            raise SystemExit(f"❌ {len(regressions)} regression(s) over {args.max_regression:.0%}")
@@ -0,0 +1,66 @@
+import cv2
+
+from exercise_rules import EXERCISE_RULES
+from joint_filters import JointFilterBank
+from pose_features import MEDIAPIPE_FEATURES, MEDIAPIPE_JOINTS, mediapipe_points, pixel_coords
+
+# Per-frame exercise feedback for the MediaPipe entry points (desktop app and API)
+
+# Colors for drawing (BGR)
+GOOD_COLOR = (0, 255, 0)  # Green
+WARN_COLOR = (255, 165, 0)  # Orange
+BAD_COLOR = (0, 0, 255)  # Red
+TEXT_COLOR = (255, 255, 255)  # White
+TONE_COLORS = {"good": GOOD_COLOR, "warn": WARN_COLOR, "bad": BAD_COLOR}
+
+
+def get_angle_filters(filters, exercise):
+    """
+    Returns the filter bank in filters (a dict keyed by exercise) that smooths
+    every joint angle for exercise, so one exercise's history never leaks
+    into another's.
+    """
+    bank = filters.get(exercise)
+    if bank is None:
+        bank = filters[exercise] = JointFilterBank(len(MEDIAPIPE_FEATURES.angle_names))
+    return bank
+
+
+def process_exercise(exercise, landmarks, frame_width, frame_height, rep_counter, exercise_state, feedback_text,
+                     angle_filters, faults, announce):
+    """
+    Runs one frame of an exercise's rule set (see exercise_rules.EXERCISES):
+    smooths the joint angles, advances the rep phase, picks the feedback and
+    passes each cue to announce(text, force). angle_filters and faults are
+    dicts keyed by exercise that carry smoothing and form-fault state
+    between frames.
+    Returns rep_counter, exercise_state, feedback_text and drawing specs.
+    """
+    rules = EXERCISE_RULES[exercise]
+
+    # All landmarks as one array; every joint angle in one vectorized call, smoothed in one update
+    points = mediapipe_points(landmarks)
+    angles = get_angle_filters(angle_filters, exercise).update(MEDIAPIPE_FEATURES(points)[0])
+
+    outcome = rules.evaluate(angles, exercise_state, faults.get(exercise))
+    faults[exercise] = outcome["faults"]
+    if outcome["rep"]:
+        rep_counter += 1
+
+    feedback_text, announcements = rules.cue(outcome, feedback_text)
+    for text, force in announcements:
+        announce(text, force)
+
+    pixels = pixel_coords(points, frame_width, frame_height)
+    drawing_specs = rules.drawing_specs(angles, pixels, MEDIAPIPE_JOINTS, outcome)
+    return rep_counter, outcome["phase"], feedback_text, drawing_specs
+
+
+def draw_exercise_specs(image, specs):
+    """Draws the lines, joints and angle labels from process_exercise onto image."""
+    for start, end, tone in specs["lines"]:
+        cv2.line(image, start, end, TONE_COLORS[tone], 4)
+    for center, tone in specs["joints"]:
+        cv2.circle(image, center, 10, TONE_COLORS[tone], -1)
+    for text, position in specs["labels"]:
+        cv2.putText(image, text, position, cv2.FONT_HERSHEY_SIMPLEX, 0.6, TEXT_COLOR, 2, cv2.LINE_AA)
@@ -0,0 +1,267 @@
+import numpy as np
+
+from pose_features import ANGLES, MEDIAPIPE_FEATURES
+
+FORM_HYSTERESIS = 5.0  # Degrees past its threshold a form fault must recover before it clears
+ANY_PHASE = -2  # Rule "from" value matching every phase
+UNKNOWN_PHASE = -1  # Phase index of a state name the exercise doesn't define
+
+# Exercises as data. "angles" maps the names used in conditions to kernel
+# angles (see pose_features.ANGLES). Rules are tried in order and the first
+# whose conditions all hold wins: a rule with "to" moves the rep phase (and
+# counts a rep with "rep"), one without just holds the phase with its cue.
+# "checks" are form faults with hysteresis, reported when no rule matches.
+# "tone" colors the exercise's joints: the matched rule's, else idle_tone.
+EXERCISES = {
+    "pushup": {
+        "angles": {"elbow": "left_elbow", "back": "left_hip"},
+        "checks": [
+            {"fault": "back < 160", "cue": "Keep your back straight!", "ok_cue": "Good back form!"}
+        ],
+        "rules": [
+            {"from": "*", "to": "down", "when": ["elbow < 90", "back > 160"], "cue": "Lower!"},
+            {"from": "down", "to": "up", "when": ["elbow > 160"], "cue": "Rep Complete!", "rep": True},
+            {"from": "up", "when": ["elbow > 160"], "cue": "Ready to lower!"}
+        ],
+        "idle_tone": "bad"
+    },
+    "bicep_curl": {
+        "angles": {"elbow": "right_elbow"},
+        "rules": [
+            {"from": "*", "to": "curled", "when": ["elbow < 50"], "cue": "Good curl!"},
+            {"from": "curled", "to": "extended", "when": ["elbow > 140"], "cue": "Rep complete!", "rep": True},
+            {"from": "extended", "when": ["elbow > 140"], "cue": "Curl your arm!"},
+            {"from": "*", "when": ["elbow > 50", "elbow < 140"], "cue": "Keep going...", "tone": "warn"}
+        ]
+    },
+    "barbell_squat": {
+        "angles": {"knee": "left_knee", "hip": "left_hip"},
+        "checks": [
+            {"fault": "hip < 45", "cue": "Keep your chest up!", "ok_cue": "Good posture!"}
+        ],
+        "rules": [
+            {"from": "*", "to": "down", "when": ["knee < 90"], "cue": "Good depth! Drive up!"},
+            {"from": "down", "to": "up", "when": ["knee > 160", "hip > 150"], "cue": "Rep complete!", "rep": True},
+            {"from": "up", "when": ["knee > 160"], "cue": "Squat down!"},
+            {"from": "*", "when": ["knee > 90", "knee < 160"], "cue": "Keep going...", "tone": "warn"}
+        ]
+    },
+    "deadlift": {
+        "angles": {"hip": "left_hip", "knee": "left_knee"},
+        "checks": [
+            {"fault": "knee < 90", "cue": "Hinge at the hips, don't squat!", "ok_cue": "Good hinge!"}
+        ],
+        "rules": [
+            {"from": "*", "to": "down", "when": ["hip < 100"], "cue": "Drive through your hips!"},
+            {"from": "down", "to": "up", "when": ["hip > 165", "knee > 155"], "cue": "Lockout! Rep complete!",
+             "rep": True},
+            {"from": "up", "when": ["hip > 165"], "cue": "Hinge down!"},
+            {"from": "*", "when": ["hip > 100", "hip < 165"], "cue": "Keep going...", "tone": "warn"}
+        ]
+    },
+    "chest_press": {
+        "angles": {"elbow": "left_elbow"},
+        "rules": [
+            {"from": "*", "to": "down", "when": ["elbow < 80"], "cue": "Press!"},
+            {"from": "down", "to": "up", "when": ["elbow > 155"], "cue": "Rep complete!", "rep": True},
+            {"from": "up", "when": ["elbow > 155"], "cue": "Lower the weight!"},
+            {"from": "*", "when": ["elbow > 80", "elbow < 155"], "cue": "Keep going...", "tone": "warn"}
+        ]
+    },
+    "shoulder_press": {
+        "angles": {"elbow": "left_elbow", "shoulder": "left_shoulder", "back": "left_hip"},
+        "checks": [
+            {"fault": "back < 150", "cue": "Don't lean back!", "ok_cue": "Good posture!"}
+        ],
+        "rules": [
+            {"from": "*", "to": "down", "when": ["elbow < 90", "shoulder < 100"], "cue": "Press up!"},
+            {"from": "down", "to": "up", "when": ["elbow > 155", "shoulder > 150"], "cue": "Rep complete!",
+             "rep": True},
+            {"from": "up", "when": ["elbow > 155"], "cue": "Lower to your shoulders!"},
+            {"from": "*", "when": ["elbow > 90", "elbow < 155"], "cue": "Keep going...", "tone": "warn"}
+        ]
+    },
+    "pull_up": {
+        "angles": {"elbow": "left_elbow"},
+        "rules": [
+            {"from": "*", "to": "down", "when": ["elbow > 150"], "cue": "Full hang. Pull!"},
+            {"from": "down", "to": "up", "when": ["elbow < 60"], "cue": "Chin over the bar! Rep complete!",
+             "rep": True},
+            {"from": "up", "when": ["elbow < 60"], "cue": "Lower with control!"},
+            {"from": "*", "when": ["elbow > 60", "elbow < 150"], "cue": "Keep going...", "tone": "warn"}
+        ]
+    }
+}
+
+
+def _parse_condition(condition, angles, angle_index):
+    """"elbow < 90" -> (kernel column, sign, threshold); sign * (value - threshold) > 0 means it holds."""
+    name, op, value = condition.split()
+    if op not in ("<", ">"):
+        raise ValueError(f"Unsupported operator in condition: {condition}")
+    return angle_index[angles[name]], (-1.0 if op == "<" else 1.0), float(value)
+
+
+class CompiledExercise:
+    """
+    One exercise definition compiled into index and threshold arrays, so a
+    step is a handful of NumPy operations regardless of how many rules
+    and checks are involved.
+    """
+
+    def __init__(self, name, definition, angle_index=MEDIAPIPE_FEATURES.angle_index,
+                 hysteresis=FORM_HYSTERESIS):
+        self.name = name
+        self.definition = definition
+        self.angles = definition["angles"]
+        self.rules = definition["rules"]
+        self.checks = definition.get("checks", [])
+        self.idle_tone = definition.get("idle_tone", "good")
+        self.hysteresis = hysteresis
+        self.angle_columns = {alias: angle_index[kernel] for alias, kernel in self.angles.items()}
+
+        # Phases in order of first mention
+        self.phases = []
+        for rule in self.rules:
+            for phase in (rule["from"], rule.get("to")):
+                if phase not in (None, "*") and phase not in self.phases:
+                    self.phases.append(phase)
+        phase_ids = {phase: i for i, phase in enumerate(self.phases)}
+
+        # Every rule condition as one row; membership says which rule it belongs to
+        conditions = [_parse_condition(c, self.angles, angle_index) for rule in self.rules for c in rule["when"]]
+        self._cond_column = np.array([c[0] for c in conditions], np.intp)
+        self._cond_sign = np.array([c[1] for c in conditions])
+        self._cond_threshold = np.array([c[2] for c in conditions])
+        self._membership = np.zeros((len(self.rules), len(conditions)), bool)
+        row = 0
+        for i, rule in enumerate(self.rules):
+            self._membership[i, row:row + len(rule["when"])] = True
+            row += len(rule["when"])
+
+        self._rule_from = np.array([ANY_PHASE if r["from"] == "*" else phase_ids[r["from"]] for r in self.rules])
+        self._rule_to = np.array([phase_ids[r["to"]] if "to" in r else UNKNOWN_PHASE for r in self.rules])
+        self._rule_rep = np.array([bool(r.get("rep")) for r in self.rules])
+
+        checks = [_parse_condition(c["fault"], self.angles, angle_index) for c in self.checks]
+        self._check_column = np.array([c[0] for c in checks], np.intp)
+        self._check_sign = np.array([c[1] for c in checks])
+        self._check_threshold = np.array([c[2] for c in checks])
+
+    def phase_index(self, phase):
+        return self.phases.index(phase) if phase in self.phases else UNKNOWN_PHASE
+
+    def step(self, angles, phase, faults):
+        """
+        Advances one frame. angles is (A,) in kernel order, phase a phase
+        index and faults (C,) the current form-fault flags.
+        Returns (phase, rep, matched rule index or -1, faults).
+        NaN angles fail every condition and leave their faults unchanged.
+        """
+        angles = np.asarray(angles, dtype=np.float64)
+
+        with np.errstate(invalid="ignore"):
+            holds = self._cond_sign * (angles[self._cond_column] - self._cond_threshold) > 0
+        rule_ok = ~(self._membership & ~holds).any(1)
+        matches = rule_ok & ((self._rule_from == ANY_PHASE) | (self._rule_from == phase))
+
+        rule = int(matches.argmax()) if matches.any() else -1
+        target = self._rule_to[rule] if rule >= 0 else UNKNOWN_PHASE
+        new_phase = int(target) if target >= 0 else phase
+        rep = rule >= 0 and bool(self._rule_rep[rule])
+
+        # Faults raise past the threshold and clear only hysteresis degrees beyond it
+        with np.errstate(invalid="ignore"):
+            margin = self._check_sign * (angles[self._check_column] - self._check_threshold)
+        faults = np.where(margin > 0, True, np.where(margin < -self.hysteresis, False, faults))
+        return new_phase, rep, rule, faults
+
+    def evaluate(self, angles, phase, faults=None):
+        """
+        step() on one (A,) angle vector and a phase name.
+        Returns a dict: phase, rep (bool), rule (the matched rule or None),
+        faults, raised/cleared (check indices that changed this frame).
+        """
+        if faults is None:
+            faults = np.zeros(len(self.checks), bool)
+        faults = np.asarray(faults, bool)
+        phase_id = self.phase_index(phase)
+        new_phase, rep, rule, new_faults = self.step(angles, phase_id, faults)
+        return {
+            "phase": self.phases[new_phase] if new_phase >= 0 else phase,
+            "phase_changed": new_phase != phase_id,
+            "rep": rep,
+            "rule": self.rules[rule] if rule >= 0 else None,
+            "faults": new_faults,
+            "raised": np.flatnonzero(new_faults & ~faults).tolist(),
+            "cleared": np.flatnonzero(faults & ~new_faults).tolist()
+        }
+
+    def cue(self, outcome, previous_text):
+        """
+        Feedback text for an evaluate() outcome and what to announce as
+        [(text, force)]: phase changes and form faults immediately, hold cues
+        only when the text changes.
+        """
+        announcements = []
+        for i in outcome["raised"]:
+            announcements.append((self.checks[i]["cue"], True))
+        for i in outcome["cleared"]:
+            announcements.append((self.checks[i]["ok_cue"], True))
+
+        rule = outcome["rule"]
+        if rule is not None:
+            text = rule["cue"]
+            if "to" in rule:
+                if outcome["phase_changed"]:
+                    announcements.append((text, True))
+            elif text != previous_text:
+                announcements.append((text, False))
+            return text, announcements
+
+        # No rule matched: report form, or keep the last feedback
+        active = np.flatnonzero(outcome["faults"])
+        if len(active):
+            return self.checks[active[0]]["cue"], announcements
+        if self.checks:
+            return self.checks[0]["ok_cue"], announcements
+        return previous_text, announcements
+
+    def drawing_specs(self, angles, pixels, joints, outcome):
+        """
+        Lines, joint circles and angle labels for the exercise's angles, as
+        {"lines": [(p1, p2, tone)], "joints": [(point, tone)], "labels": [(text, point)]}.
+        pixels are per-landmark pixel coordinates and joints the landmark index map.
+        """
+        rule_tone = outcome["rule"].get("tone", "good") if outcome["rule"] is not None else self.idle_tone
+        check_tones = {}
+        for i, check in enumerate(self.checks):
+            alias = check["fault"].split()[0]
+            if outcome["faults"][i] or check_tones.get(alias) == "bad":
+                check_tones[alias] = "bad"
+            else:
+                check_tones[alias] = "good"
+
+        specs = {"lines": [], "joints": [], "labels": []}
+        for alias, kernel in self.angles.items():
+            a, b, c = (tuple(pixels[joints[j]]) for j in ANGLES[kernel])
+            tone = check_tones.get(alias, rule_tone)
+            specs["lines"].append((a, b, tone))
+            specs["lines"].append((b, c, tone))
+            specs["joints"].append((b, tone))
+            value = angles[self.angle_columns[alias]]
+            if np.isfinite(value):
+                specs["labels"].append((f"{alias.capitalize()}: {int(value)}", (b[0] + 20, b[1])))
+        return specs
+
+
+def cue_phrases(exercises=None):
+    """Every fixed text the exercises can announce, e.g. for pre-rendering speech."""
+    phrases = []
+    for definition in (exercises or EXERCISES).values():
+        phrases += [rule["cue"] for rule in definition["rules"]]
+        phrases += [text for check in definition.get("checks", ()) for text in (check["cue"], check["ok_cue"])]
+    return list(dict.fromkeys(phrases))
+
+
+EXERCISE_RULES = {name: CompiledExercise(name, definition) for name, definition in EXERCISES.items()}
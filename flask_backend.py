@@ -1,54 +1,665 @@
-from flask import Flask, request, jsonify
+import atexit
+import os
+import threading
+import time
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit
-from gym_posture_correction_yolo import analyze_pose_frame, exercise_state
+from gym_posture_correction_yolo import (FEEDBACK_PHRASES, INFERENCE_ENGINE, ONNX_MODEL_PATH, ONNX_PROVIDER,
+                                         REP_THRESHOLDS, WARMUP_SIZES,
+                                         analyze_pose_frame, compute_metrics, decode_frame, extract_keypoints,
+                                         finish_response, finish_tracked_response, get_model, infer_frame, new_exercise_state,
+                                         render_result, reset_exercise_state, run_inference, warmup)
+from adaptive_rate import AdaptiveRateController, adaptive_inference
+from frame_pipeline import FramePipeline
+from frame_protocol import RESPONSE_MODES, pack_metadata, resolve_response_mode, split_binary_result
+from inference_scheduler import InferenceScheduler
+from inference_workers import MAX_FRAME_SHAPE, InferenceWorkerPool
+from person_tracker import PersonTracker
+from pose_result import result_arrays
+from motion_gate import MOTION_THRESHOLD, MotionGate, gated_inference
+from roi_tracker import RoiTracker, tracked_inference
+from server_metrics import CONTENT_TYPE, MetricsRegistry
+from session_registry import MAX_SESSIONS, SESSION_IDLE_TIMEOUT, SessionRegistry
+from speech_clips import CLIP_CACHE_SIZE, CLIP_MIME_TYPE, ClipCache
+from slow_frames import FRAME_BUDGET_MS, MAX_PROFILE_SECONDS, SlowFrameTracer, StackSampler
+from trajectory_store import FLAG_PERSON, FLAG_PREDICTED, TrajectoryWriter
+
+# Cross-client micro-batching of YOLO inference
+BATCH_INFERENCE = os.environ.get("REPWISE_BATCH_INFERENCE", "1") == "1"
+BATCH_WINDOW_MS = float(os.environ.get("REPWISE_BATCH_WINDOW_MS", "5"))  # Hard cap on added latency
+MAX_BATCH_SIZE = int(os.environ.get("REPWISE_MAX_BATCH_SIZE", "8"))
+
+# Inference worker processes (0 = run the model in this process)
+INFERENCE_WORKERS = int(os.environ.get("REPWISE_INFERENCE_WORKERS", "0"))
+WORKER_THREADS = int(os.environ.get("REPWISE_WORKER_THREADS", "0")) or None  # Intra-op threads per worker
+PRELOAD_FORK = os.environ.get("REPWISE_PRELOAD_FORK", "0") == "1"  # Load weights once, fork workers copy-on-write
+# Largest frame (WIDTHxHEIGHT) a worker's shared-memory slot holds; larger ones are inferred in this process
+WORKER_MAX_FRAME = os.environ.get("REPWISE_WORKER_MAX_FRAME", f"{MAX_FRAME_SHAPE[1]}x{MAX_FRAME_SHAPE[0]}")
+DEBUG = os.environ.get("REPWISE_DEBUG", "1") == "1"
+
+# Session limits (connected clients are only dropped on disconnect)
+SESSION_LIMIT = int(os.environ.get("REPWISE_MAX_SESSIONS", str(MAX_SESSIONS)))
+SESSION_IDLE_SECONDS = float(os.environ.get("REPWISE_SESSION_IDLE_TIMEOUT", str(SESSION_IDLE_TIMEOUT)))
+
+# Person-ROI tracking: infer on a crop around the athlete instead of the full frame
+ROI_TRACKING = os.environ.get("REPWISE_ROI_TRACKING", "0") == "1"
+
+# Rep-phase-aware inference rate: predict keypoints on frames far from a rep transition
+ADAPTIVE_RATE = os.environ.get("REPWISE_ADAPTIVE_RATE", "0") == "1"
+
+# Motion-gated cache: reuse the last keypoints while the scene is static
+MOTION_GATE = os.environ.get("REPWISE_MOTION_GATE", "0") == "1"
+MOTION_GATE_THRESHOLD = float(os.environ.get("REPWISE_MOTION_THRESHOLD", str(MOTION_THRESHOLD)))
+
+# Multi-person mode: track everyone in frame, each with their own rep count
+MULTI_PERSON = os.environ.get("REPWISE_MULTI_PERSON", "0") == "1"
+if MULTI_PERSON and (ROI_TRACKING or ADAPTIVE_RATE):
+    print("⚠️ ROI tracking and adaptive rate follow a single person, turning them off for multi-person mode")
+    ROI_TRACKING = ADAPTIVE_RATE = False
+
+# ROI tracking, adaptive rate and the motion gate keep per-session state that
+# has to see a session's frames one at a time and in order
+STATEFUL_INFERENCE = ROI_TRACKING or ADAPTIVE_RATE or MOTION_GATE
+
+# Per-frame keypoint/state recording for offline replay (empty = off)
+TRAJECTORY_DIR = os.environ.get("REPWISE_TRAJECTORY_DIR", "")
+
+# Slow-frame tracing: keep the slowest recent frames for postmortems (see /admin/slow_frames)
+SLOW_FRAME_TRACE = os.environ.get("REPWISE_SLOW_FRAME_TRACE", "0") == "1"
+SLOW_FRAME_BUDGET_MS = float(os.environ.get("REPWISE_SLOW_FRAME_BUDGET_MS", str(FRAME_BUDGET_MS)))
+SLOW_FRAME_KEEP_FRAMES = os.environ.get("REPWISE_SLOW_FRAME_KEEP_FRAMES", "0") == "1"  # Also keep raw input
+PROFILE_ON_SLOW = os.environ.get("REPWISE_PROFILE_ON_SLOW", "0") == "1"  # Sample stacks when p99 > budget
+PROFILE_DIR = os.environ.get("REPWISE_PROFILE_DIR", "")  # Where profiles are saved (empty = memory only)
+ADMIN_TOKEN = os.environ.get("REPWISE_ADMIN_TOKEN", "")  # Without one, admin endpoints only answer localhost, or nobody when frames are kept
+if SLOW_FRAME_KEEP_FRAMES and not ADMIN_TOKEN:
+    print("⚠️ REPWISE_SLOW_FRAME_KEEP_FRAMES keeps raw camera frames: admin endpoints are disabled "
+          "until REPWISE_ADMIN_TOKEN is set")
+
+# Server-side speech: synthesized feedback clips for web clients (see /tts/<clip>)
+TTS_CLIPS = os.environ.get("REPWISE_TTS_CLIPS", "0") == "1"
+TTS_CACHE_SIZE = int(os.environ.get("REPWISE_TTS_CACHE_SIZE", str(CLIP_CACHE_SIZE)))
+TTS_VOICE = os.environ.get("REPWISE_TTS_VOICE", "") or None  # pyttsx3 voice id (empty = system default)
+TTS_PUSH = os.environ.get("REPWISE_TTS_PUSH", "1") == "1"  # Push each clip once per client; else clients fetch it
+
+# Staged decode -> infer -> annotate/encode pipeline
+PIPELINE = os.environ.get("REPWISE_PIPELINE", "1") == "1"
+PIPELINE_DEPTH = int(os.environ.get("REPWISE_PIPELINE_DEPTH", "2"))  # Frames per client in flight
+DECODE_WORKERS = int(os.environ.get("REPWISE_DECODE_WORKERS", "2"))
+ENCODE_WORKERS = int(os.environ.get("REPWISE_ENCODE_WORKERS", "2"))
 
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}})
 socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
 
+# One rep state machine per connected client, keyed by socket sid
+sessions = SessionRegistry(new_exercise_state, max_sessions=SESSION_LIMIT, idle_timeout=SESSION_IDLE_SECONDS,
+                           max_in_flight=PIPELINE_DEPTH if PIPELINE else 1)
+
+# Worker processes batch on their own, so the in-process scheduler is only
+# used when the model runs here
+worker_pool = None
+oversized_frames = 0  # Frames too large for a worker slot, inferred in this process
+if BATCH_INFERENCE and not INFERENCE_WORKERS:
+    scheduler = InferenceScheduler(run_inference, BATCH_WINDOW_MS, MAX_BATCH_SIZE)
+    infer = scheduler.infer
+else:
+    scheduler = None
+    infer = infer_frame
+
+# In-process instrumentation, scraped from /metrics. Gauges are read at scrape
+# time, so only the counters and histograms cost anything per frame.
+metrics = MetricsRegistry()
+frames_received = metrics.counter("repwise_frames_received_total", "Frames received from clients")
+frames_dropped = metrics.counter("repwise_frames_dropped_total",
+                                 "Frames replaced by a newer one before they were processed")
+frame_results = metrics.counter("repwise_frame_results_total", "Processed frames by outcome", "status")
+stage_seconds = metrics.histogram("repwise_stage_seconds", "Time spent in each frame handling stage", "stage")
+frame_seconds = metrics.histogram("repwise_frame_seconds", "Time from a frame starting processing to its result")
+metrics.gauge("repwise_active_sessions", "Connected client sessions", lambda: len(sessions))
+metrics.gauge("repwise_frames_in_flight", "Frames currently being processed",
+              lambda: sum(session.mailbox.in_flight for session in sessions.sessions()))
+metrics.gauge("repwise_pipeline_queue_depth", "Jobs waiting in front of each pipeline stage",
+              lambda: dict(zip(("decode", "infer", "annotate"), pipeline.depth())) if pipeline else {}, "stage")
+metrics.gauge("repwise_model_ready", "1 once the model is loaded and warmed up", lambda: int(is_ready()))
+
+slow_frame_tracer = None
+if SLOW_FRAME_TRACE:
+    slow_frame_tracer = SlowFrameTracer(budget_ms=SLOW_FRAME_BUDGET_MS, keep_frames=SLOW_FRAME_KEEP_FRAMES,
+                                        sampler=StackSampler(PROFILE_DIR or None) if PROFILE_ON_SLOW else None)
+
+# Voiced feedback texts (angle readouts change every frame and stay text-only)
+SPOKEN_PHRASES = frozenset(FEEDBACK_PHRASES)
+clip_cache = ClipCache(TTS_CACHE_SIZE, voice=TTS_VOICE) if TTS_CLIPS else None
+
+trajectory_writer = None
+if TRAJECTORY_DIR:
+    trajectory_writer = TrajectoryWriter(TRAJECTORY_DIR)
+    atexit.register(trajectory_writer.close)
+
+def record_for(session, exercise):
+    """Callback queueing a frame's pose and rep state for the trajectory store, or None when off."""
+    if trajectory_writer is None:
+        return None
+
+    def record(result, keypoints_data):
+        person = None
+        flags = 0
+        if keypoints_data is not None and len(keypoints_data):
+            person = keypoints_data[0]
+            flags |= FLAG_PERSON
+        if getattr(result, "predicted", False):
+            flags |= FLAG_PREDICTED
+        state = session.exercise_state
+        trajectory_writer.append(session.sid, exercise, person, state["rep_count"], state["current_state"], flags)
+    return record
+
+def tracker_for(session):
+    """The session's person tracker in multi-person mode, otherwise None."""
+    if not MULTI_PERSON:
+        return None
+    if session.person_tracker is None:
+        session.person_tracker = PersonTracker(new_exercise_state)
+    return session.person_tracker
+
+def infer_for(session, exercise):
+    """Inference callable for a session's frames (ROI-tracked, rate-adapted and motion-gated when enabled)."""
+    session_infer = infer
+    if ROI_TRACKING:
+        if session.roi_tracker is None:
+            session.roi_tracker = RoiTracker()
+        tracker = session.roi_tracker
+        session_infer = lambda frame: tracked_inference(tracker, frame, infer)
+    if ADAPTIVE_RATE:
+        if session.rate_controller is None:
+            session.rate_controller = AdaptiveRateController(compute_metrics, REP_THRESHOLDS)
+        controller, tracked_infer = session.rate_controller, session_infer
+        session_infer = lambda frame: adaptive_inference(controller, frame, exercise, tracked_infer,
+                                                         session.exercise_state)
+    if MOTION_GATE:
+        if session.motion_gate is None:
+            session.motion_gate = MotionGate(MOTION_GATE_THRESHOLD)
+        gate, inner_infer = session.motion_gate, session_infer
+        session_infer = lambda frame: gated_inference(gate, frame, inner_infer)
+    return session_infer
+
+# Set once the in-process model is loaded and warmed up
+model_ready = threading.Event()
+
+def warm_up():
+    """Loads the in-process model and runs dummy frames through it before serving."""
+    # Warm the batched shapes too when frames are micro-batched
+    batch_sizes = (1, MAX_BATCH_SIZE) if scheduler is not None else (1,)
+    warmup(batch_sizes=batch_sizes)
+    model_ready.set()
+
+def is_ready():
+    if worker_pool is not None:
+        return worker_pool.ready
+    return model_ready.is_set()
+
+def start_worker_pool():
+    """Moves inference to worker processes. Called at server start only, since workers re-import this module."""
+    global worker_pool, infer
+    preloaded_model = None
+    start_method = "spawn"
+    if PRELOAD_FORK:
+        if INFERENCE_ENGINE == "onnx":
+            print("⚠️ ONNX Runtime sessions can't be shared across fork, workers will load their own")
+        else:
+            # Load (but don't run) the model here so forked workers share the weights
+            preloaded_model = get_model()
+            start_method = "fork"
+
+    width, height = (int(size) for size in WORKER_MAX_FRAME.lower().split("x"))
+    worker_pool = InferenceWorkerPool(INFERENCE_WORKERS, threads_per_worker=WORKER_THREADS,
+                                      max_frame_shape=(height, width), max_batch_size=MAX_BATCH_SIZE, engine=INFERENCE_ENGINE,
+                                      model_path=ONNX_MODEL_PATH if INFERENCE_ENGINE == "onnx" else None,
+                                      onnx_provider=ONNX_PROVIDER, start_method=start_method,
+                                      warmup_sizes=WARMUP_SIZES, preloaded_model=preloaded_model)
+    infer = pooled_infer
+    atexit.register(worker_pool.close)
+
+def pooled_infer(frame, imgsz=None):
+    """Inference on the worker pool; frames too large for its slots run in this process instead."""
+    if worker_pool.fits(frame):
+        return worker_pool.infer(frame, imgsz)
+    global oversized_frames
+    if not oversized_frames:
+        print(f"⚠️ Frame of shape {frame.shape} exceeds REPWISE_WORKER_MAX_FRAME={WORKER_MAX_FRAME}, "
+              "inferring oversized frames in this process")
+    oversized_frames += 1
+    return infer_frame(frame, imgsz)
+
+# Sends one event to one client from any thread; the ASGI server installs its own (see set_emitter)
+emitter = None
+
+def set_emitter(fn):
+    """Routes outgoing events through fn(sid, event, data) instead of the Flask-SocketIO server."""
+    global emitter
+    emitter = fn
+
+def emit_to(sid, event, data):
+    if emitter is not None:
+        emitter(sid, event, data)
+    else:
+        socketio.emit(event, data, to=sid)
+
+def prepare_inference():
+    """Loads and warms up the model, or starts the inference workers, before serving."""
+    if INFERENCE_WORKERS:
+        # Before the clip cache or any inference runs: with REPWISE_PRELOAD_FORK the workers are forked
+        # from this process. The pipeline and scheduler threads already exist but sit idle on their
+        # queues, and a fork only copies the calling thread.
+        start_worker_pool()
+    if clip_cache is not None:
+        clip_cache.warm(SPOKEN_PHRASES)  # Synthesized in the background meanwhile
+    if INFERENCE_WORKERS:
+        if not worker_pool.wait_ready():
+            print("❌ Inference workers failed to start")
+    else:
+        warm_up()
+
+def attach_clip(session, result):
+    """
+    Adds the speech clip id of the result's feedback_text. The audio itself
+    is pushed (as a binary 'feedback_audio' event) only the first time a
+    client needs that clip; after that the id alone is enough.
+    """
+    text = result.get("feedback_text")
+    if text not in SPOKEN_PHRASES:
+        return
+    clip = clip_cache.get(text)
+    if clip is None:
+        return  # Still being synthesized; a later frame will carry it
+    key, data = clip
+    result["feedback_clip"] = key
+    if TTS_PUSH and key not in session.sent_clips:
+        session.sent_clips.add(key)
+        metadata = pack_metadata({"clip": key, "text": text, "mime": CLIP_MIME_TYPE})
+        emit_to(session.sid, 'feedback_audio', (metadata, data))
+
+def send_result(session, result, response_mode):
+    """Emits a frame result to the session's client in its response mode."""
+    session.mailbox.mark_processed()
+    frame_results.inc(result.get("status", "error"))
+    result["frame_stats"] = session.mailbox.stats()
+    if clip_cache is not None:
+        attach_clip(session, result)
+
+    if response_mode == "binary" and "processed_frame" in result:
+        # Metadata and raw JPEG go out as two arguments of one event
+        metadata, frame_bytes = split_binary_result(result)
+        emit_to(session.sid, 'result_binary', (metadata, frame_bytes))
+    else:
+        emit_to(session.sid, 'result', result)
+
+def trace_frame(session, total_seconds, timings, frame, people, frame_data):
+    """Hands a finished frame to the slow-frame tracer, if tracing is on."""
+    if slow_frame_tracer is not None:
+        slow_frame_tracer.record(total_seconds * 1000, timings, session.sid,
+                                 frame.shape if frame is not None else None, people, frame_data)
+
+def timed_stage(name, fn):
+    """Wraps a stage to feed the stage histogram and the job's own timings (kept for the slow-frame tracer)."""
+    def run(job):
+        start = time.perf_counter()
+        try:
+            fn(job)
+        finally:
+            elapsed = time.perf_counter() - start
+            stage_seconds.observe(elapsed, name)
+            job.setdefault("timings", {})[name] = elapsed * 1000
+    return run
+
+# --- Pipeline stages (each runs on its own thread pool) ---
+
+def decode_stage(job):
+    frame = decode_frame(job["image_data"])
+    if frame is None:
+        print("❌ Received empty frame")
+        job["response"] = {"status": "error", "message": "Empty frame received"}
+        return
+    job["frame"] = frame
+
+def infer_stage(job):
+    session = job["session"]
+    if not STATEFUL_INFERENCE:
+        job["result"] = infer_for(session, job["exercise"])(job["frame"])
+        return
+    # With PIPELINE_DEPTH > 1 a session's frames can reach this stage together and out of order
+    with session.infer_lock:
+        if job["seq"] > session.inferred_seq:
+            session.inferred_seq = job["seq"]
+            job["result"] = infer_for(session, job["exercise"])(job["frame"])
+            return
+    # Overtaken by a newer frame: plain inference, leaving the session's tracking state alone
+    job["result"] = infer(job["frame"])
+
+def annotate_stage(job):
+    # Everything here is stateless; the rep state machine runs in order on delivery
+    status, message, keypoints_data = extract_keypoints(job["result"])
+    metrics = compute_metrics(keypoints_data, job["exercise"]) if keypoints_data is not None else {}
+    rendered = render_result(job["frame"], job["result"], keypoints_data, metrics,
+                             job["exercise"], job["response_mode"])
+    job["annotated"] = (status, message, rendered, metrics)
+    job["keypoints"] = keypoints_data
+
+def deliver_job(job):
+    start = time.perf_counter()
+    session = job["session"]
+    if "error" in job:
+        print(f"❌ analyze_pose_frame error: {job['error']}")
+        result = {"status": "error", "message": str(job["error"])}
+    elif "response" in job:
+        result = job["response"]
+    else:
+        status, message, rendered, metrics = job["annotated"]
+        tracker = tracker_for(session)
+        if tracker is not None:
+            result = finish_tracked_response(status, message, rendered, job["result"], job["keypoints"],
+                                             job["exercise"], session.exercise_state, tracker)
+        else:
+            result = finish_response(status, message, rendered, metrics, job["exercise"], session.exercise_state)
+        record = record_for(session, job["exercise"])
+        if record is not None:
+            record(job["result"], job["keypoints"])
+    send_result(session, result, job["response_mode"])
+    done = time.perf_counter()
+    stage_seconds.observe(done - start, "deliver")
+    frame_seconds.observe(done - job["started"])
+    if slow_frame_tracer is not None:
+        timings = dict(job.get("timings", {}), deliver=(done - start) * 1000)
+        keypoints_data = job.get("keypoints")
+        trace_frame(session, done - job["started"], timings, job.get("frame"),
+                    len(keypoints_data) if keypoints_data is not None else 0, job["image_data"])
+
+    # Start the newest frame that arrived meanwhile, if any
+    item = session.mailbox.take_next()
+    if item is not None:
+        submit_frame(session, *item)
+
+def submit_frame(session, frame_data, exercise, response_mode):
+    pipeline.submit(session.sid, {
+        "session": session,
+        "image_data": frame_data,
+        "exercise": exercise,
+        "response_mode": response_mode,
+        "seq": next(session.frame_seq),
+        "started": time.perf_counter()
+    })
+
+if PIPELINE:
+    pipeline = FramePipeline([
+        ("decode", timed_stage("decode", decode_stage), DECODE_WORKERS),
+        # Enough waiting threads to fill a whole batch when batching is on
+        ("infer", timed_stage("infer", infer_stage), INFERENCE_WORKERS * MAX_BATCH_SIZE if INFERENCE_WORKERS
+         else MAX_BATCH_SIZE if BATCH_INFERENCE else 1),
+        ("annotate", timed_stage("annotate", annotate_stage), ENCODE_WORKERS)
+    ], deliver_job)
+else:
+    pipeline = None
+
 @app.route("/health", methods=["GET"])
 def health():
-    return jsonify({"status": "ok"})
+    ready = is_ready()
+    health_info = {
+        "status": "ok" if ready else "warming_up",
+        "ready": ready,
+        "sessions": len(sessions),
+        "dropped_frames": sum(session.mailbox.dropped for session in sessions.sessions())
+    }
+    if scheduler is not None:
+        health_info["batching"] = scheduler.stats()
+    if pipeline is not None:
+        health_info["pipeline_queue_depth"] = pipeline.depth()
+    if worker_pool is not None:
+        health_info["inference_workers"] = dict(worker_pool.stats(), oversized_frames=oversized_frames)
+    if ROI_TRACKING:
+        trackers = [session.roi_tracker for session in sessions.sessions() if session.roi_tracker]
+        crop_frames = sum(tracker.crop_frames for tracker in trackers)
+        total_frames = crop_frames + sum(tracker.full_frames for tracker in trackers)
+        health_info["roi_crop_ratio"] = round(crop_frames / total_frames, 3) if total_frames else 0.0
+    if ADAPTIVE_RATE:
+        controllers = [session.rate_controller for session in sessions.sessions() if session.rate_controller]
+        predicted = sum(controller.predicted_frames for controller in controllers)
+        total_frames = predicted + sum(controller.inferred_frames for controller in controllers)
+        health_info["predicted_frame_ratio"] = round(predicted / total_frames, 3) if total_frames else 0.0
+    if MOTION_GATE:
+        gates = [session.motion_gate for session in sessions.sessions() if session.motion_gate]
+        hits = sum(gate.hits for gate in gates)
+        lookups = hits + sum(gate.misses for gate in gates)
+        health_info["motion_cache"] = {
+            "hit_ratio": round(hits / lookups, 3) if lookups else 0.0,
+            "hits": hits,
+            "threshold": MOTION_GATE_THRESHOLD
+        }
+    if MULTI_PERSON:
+        health_info["tracked_people"] = sum(len(session.person_tracker) for session in sessions.sessions()
+                                            if session.person_tracker)
+    if clip_cache is not None:
+        health_info["tts_clips"] = clip_cache.stats()
+    if trajectory_writer is not None:
+        health_info["trajectories"] = {"written": trajectory_writer.written, "dropped": trajectory_writer.dropped}
+    if slow_frame_tracer is not None:
+        health_info["slow_frames"] = {
+            "p99_ms": round(slow_frame_tracer.p99(), 1),
+            "budget_ms": slow_frame_tracer.budget_ms,
+            "over_budget": slow_frame_tracer.over_budget
+        }
+    # 503 until warmed up, so load balancers hold traffic back
+    return jsonify(health_info), 200 if ready else 503
+
+@app.route("/tts/<clip>", methods=["GET"])
+def tts_clip(clip):
+    # Clip ids come from results' feedback_clip; the content of an id never changes
+    data = clip_cache.lookup(clip) if clip_cache is not None else None
+    if data is None:
+        return jsonify({"status": "error", "message": "Unknown clip"}), 404
+    return Response(data, content_type=CLIP_MIME_TYPE, headers={"Cache-Control": "public, max-age=31536000, immutable"})
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    return Response(metrics.render(), content_type=CONTENT_TYPE)
+
+def admin_allowed():
+    if ADMIN_TOKEN:
+        return request.headers.get("X-Admin-Token") == ADMIN_TOKEN
+    # Behind a reverse proxy every request looks local, so raw frames are never served on that alone
+    if SLOW_FRAME_KEEP_FRAMES:
+        return False
+    return request.remote_addr in ("127.0.0.1", "::1")
+
+@app.route("/admin/slow_frames", methods=["GET"])
+def slow_frames():
+    # Slowest recent frames, slowest first; ?frames=1 adds the raw input, ?clear=1 empties the ring
+    if not admin_allowed():
+        return jsonify({"status": "error", "message": "Forbidden"}), 403
+    if slow_frame_tracer is None:
+        return jsonify({"status": "error", "message": "Slow-frame tracing is off (REPWISE_SLOW_FRAME_TRACE=1)"}), 404
+    dump = slow_frame_tracer.dump(include_frames=request.args.get("frames") == "1",
+                                  clear=request.args.get("clear") == "1")
+    return jsonify(dump)
+
+@app.route("/admin/profile", methods=["GET", "POST"])
+def profile():
+    # GET returns the last profile (stacks in collapsed flame graph format); POST starts one now (?seconds=N)
+    if not admin_allowed():
+        return jsonify({"status": "error", "message": "Forbidden"}), 403
+    sampler = slow_frame_tracer.sampler if slow_frame_tracer is not None else None
+    if sampler is None:
+        return jsonify({"status": "error", "message": "Profiling is off (REPWISE_PROFILE_ON_SLOW=1)"}), 404
+    if request.method == "POST":
+        seconds = request.args.get("seconds", slow_frame_tracer.profile_seconds)
+        try:
+            seconds = float(seconds)
+        except (TypeError, ValueError):
+            seconds = None
+        if seconds is None or not 0 < seconds <= MAX_PROFILE_SECONDS:
+            return jsonify({"status": "error",
+                            "message": f"seconds must be a number in (0, {MAX_PROFILE_SECONDS:g}]"}), 400
+        started = sampler.start(seconds, "manual")
+        return jsonify({"status": "started" if started else "already_running"})
+    if sampler.last_profile is None:
+        return jsonify({"status": "error", "message": "No profile yet"}), 404
+    return jsonify(sampler.last_profile)
 
 @app.route("/reset", methods=["POST"])
 def reset():
-    exercise_state["rep_count"] = 0
-    exercise_state["current_state"] = "ready"
-    exercise_state["last_angle"] = 0
+    # Reset a single client when a sid is given, otherwise every session
+    body = request.get_json(silent=True) or {}
+    sid = body.get('sid') or request.args.get('sid')
+    if sid:
+        session = sessions.find(sid)
+        if session is None:
+            return jsonify({"status": "error", "message": "Unknown session"}), 404
+        reset_session_state(session)
+    else:
+        for session in sessions.sessions():
+            reset_session_state(session)
     return jsonify({"status": "reset"})
 
+# --- Socket.IO events. The session logic below is shared with the ASGI server (asgi_backend) ---
+
+def close_session(sid):
+    sessions.remove(sid)
+    if pipeline is not None:
+        pipeline.forget(sid)
+    if trajectory_writer is not None:
+        trajectory_writer.close_session(sid)
+
+def configure_session(sid, data):
+    """Applies a client's 'configure' event. Returns the (event, payload) to reply with."""
+    session = sessions.get(sid)
+    response_mode = (data or {}).get('response_mode')
+    if response_mode is not None:
+        if response_mode not in RESPONSE_MODES:
+            return 'error', {'message': f'Unknown response_mode: {response_mode}'}
+        session.response_mode = response_mode
+    return 'configured', {'response_mode': session.response_mode}
+
+def reset_session(sid):
+    reset_session_state(sessions.get(sid))
+
+def reset_session_state(session):
+    """Starts a session's exercise over: rep state, tracked people and per-frame inference state."""
+    reset_exercise_state(session.exercise_state)
+    if session.person_tracker is not None:
+        session.person_tracker.reset()
+    with session.infer_lock:
+        if session.roi_tracker is not None:
+            session.roi_tracker.reset()
+        if session.rate_controller is not None:
+            session.rate_controller.reset()
+        if session.motion_gate is not None:
+            session.motion_gate.reset()
+
+def process_frame(session, frame_data, exercise, response_mode):
+    """Analyzes one frame for a session on the calling thread and emits the result."""
+    start = time.perf_counter()
+    timings = {}
+    seen = {}  # Decoded frame and its result, for the slow-frame tracer
+    session_infer = infer_for(session, exercise)
+
+    def timed_infer(frame):
+        infer_start = time.perf_counter()
+        try:
+            seen["frame"] = frame
+            seen["result"] = session_infer(frame)
+            return seen["result"]
+        finally:
+            elapsed = time.perf_counter() - infer_start
+            stage_seconds.observe(elapsed, "infer")
+            timings["infer"] = elapsed * 1000
+
+    try:
+        result = analyze_pose_frame(frame_data, exercise, session.exercise_state, timed_infer,
+                                    response_mode, record_for(session, exercise), tracker_for(session))
+        timings["analyze"] = (time.perf_counter() - start) * 1000
+        stage_seconds.observe(timings["analyze"] / 1000, "analyze")
+        send_result(session, result, response_mode)
+    except Exception as e:
+        print(f"❌ Error processing frame: {e}")
+        frame_results.inc("error")
+        emit_to(session.sid, 'error', {'message': str(e)})
+    total = time.perf_counter() - start
+    frame_seconds.observe(total)
+    if slow_frame_tracer is not None:
+        people = len(result_arrays(seen["result"])[0]) if seen.get("result") is not None else 0
+        trace_frame(session, total, timings, seen.get("frame"), people, frame_data)
+
+def drain_frames(session, item):
+    """Synchronous mode: processes item, then every frame parked meanwhile, on the calling thread."""
+    while item is not None:
+        process_frame(session, *item)
+        item = session.mailbox.take_next()
+
+def accept_frame(sid, data):
+    """
+    Admits a client's 'frame' event. Returns (session, item, error): item is
+    the frame to start now (None if it was parked in the mailbox) and error
+    a message for the client when the event was invalid.
+    """
+    try:
+        # frame is either a base64 data URI string or raw JPEG bytes (binary attachment)
+        frame_data = data.get('frame')
+        exercise = data.get('exercise', 'bicep_curl')
+
+        if not frame_data:
+            return None, None, 'No frame data'
+
+        session = sessions.get(sid)
+        response_mode = resolve_response_mode(data.get('response_mode'), session.response_mode, frame_data)
+    except Exception as e:
+        print(f"❌ Error processing frame: {e}")
+        return None, None, str(e)
+
+    # Latest frame wins: if this client already has its limit of frames in
+    # flight, ours is parked in the mailbox (replacing any stale one)
+    dropped = session.mailbox.dropped
+    item = session.mailbox.offer((frame_data, exercise, response_mode))
+    frames_received.inc()
+    if session.mailbox.dropped != dropped:
+        frames_dropped.inc()
+    return session, item, None
+
 @socketio.on('connect')
 def handle_connect():
     print('✅ Client connected via WebSocket')
-    emit('connected', {'status': 'ok'})
+    sessions.connect(request.sid)
+    sessions.get(request.sid)
+    emit('connected', {'status': 'ok', 'sid': request.sid})
 
 @socketio.on('disconnect')
 def handle_disconnect():
     print('❌ Client disconnected')
+    close_session(request.sid)
+
+@socketio.on('configure')
+def handle_configure(data):
+    emit(*configure_session(request.sid, data))
 
 @socketio.on('frame')
 def handle_frame(data):
-    try:
-        frame_data = data.get('frame')
-        exercise = data.get('exercise', 'bicep_curl')
-        
-        if not frame_data:
-            emit('error', {'message': 'No frame data'})
-            return
-        
-        result = analyze_pose_frame(frame_data, exercise)
-        emit('result', result)
-    except Exception as e:
-        print(f"❌ Error processing frame: {e}")
-        emit('error', {'message': str(e)})
+    session, item, error = accept_frame(request.sid, data)
+    if error is not None:
+        emit('error', {'message': error})
+        return
+
+    if pipeline is not None:
+        if item is not None:
+            submit_frame(session, *item)
+        return
+    drain_frames(session, item)
 
 @socketio.on('reset_exercise')
 def handle_reset():
-    exercise_state["rep_count"] = 0
-    exercise_state["current_state"] = "ready"
-    exercise_state["last_angle"] = 0
+    reset_session(request.sid)
     emit('reset_complete', {'status': 'ok'})
 
 if __name__ == "__main__":
-    socketio.run(app, host="0.0.0.0", port=5000, debug=True, allow_unsafe_werkzeug=True)
\ No newline at end of file
+    # With the debug reloader this block also runs in the file-watcher process,
+    # which never serves traffic, so only the serving process loads models
+    if not DEBUG or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        prepare_inference()
+    socketio.run(app, host="0.0.0.0", port=5000, debug=DEBUG, allow_unsafe_werkzeug=True)
\ No newline at end of file
@@ -0,0 +1,105 @@
+import queue
+import threading
+
+# Default capacity of the queues between stages
+STAGE_QUEUE_SIZE = 16
+
+
+class _ClientOrder:
+    """Reorder buffer for one client: delivers finished jobs in submission order."""
+
+    __slots__ = ("lock", "next_seq", "next_delivery", "finished")
+
+    def __init__(self):
+        # Re-entrant: deliver() may submit the client's next frame
+        self.lock = threading.RLock()
+        self.next_seq = 0
+        self.next_delivery = 0
+        self.finished = {}
+
+
+class FramePipeline:
+    """
+    Staged frame pipeline: each stage has its own pool of worker threads and
+    a bounded queue in front of it, so decoding, inference and encoding of
+    different frames overlap and throughput approaches the slowest stage.
+
+    Jobs are dicts. Each stage is (name, fn, workers) where fn(job) fills in
+    more of the job. A stage may set job["response"] to finish a job early;
+    an exception is stored in job["error"] and skips the remaining stages.
+    deliver(job) is then called once per job, in submission order for each
+    client and never concurrently for the same client.
+    """
+
+    def __init__(self, stages, deliver, queue_size=STAGE_QUEUE_SIZE):
+        self.deliver = deliver
+        self._clients = {}
+        self._clients_lock = threading.Lock()
+        self._threads = []
+
+        # Intake is unbounded: callers bound admission themselves (one
+        # mailbox per client), and deliver() may resubmit from a worker
+        # thread, which must never block on a full queue.
+        self._queues = [queue.Queue()]
+        self._queues += [queue.Queue(maxsize=queue_size) for _ in stages[1:]]
+
+        for index, (name, fn, workers) in enumerate(stages):
+            inbox = self._queues[index]
+            outbox = self._queues[index + 1] if index + 1 < len(stages) else None
+            for n in range(max(1, int(workers))):
+                thread = threading.Thread(target=self._work, args=(fn, inbox, outbox),
+                                          name=f"pipeline-{name}-{n}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, client_id, job):
+        """Queues a job for client_id. Results for a client are delivered in submit order."""
+        with self._clients_lock:
+            order = self._clients.get(client_id)
+            if order is None:
+                order = self._clients[client_id] = _ClientOrder()
+        with order.lock:
+            job["_client"] = client_id
+            job["_seq"] = order.next_seq
+            order.next_seq += 1
+        self._queues[0].put(job)
+
+    def forget(self, client_id):
+        """Drops ordering state for a disconnected client."""
+        with self._clients_lock:
+            self._clients.pop(client_id, None)
+
+    def depth(self):
+        """Number of jobs waiting in front of each stage."""
+        return [q.qsize() for q in self._queues]
+
+    def _work(self, fn, inbox, outbox):
+        while True:
+            job = inbox.get()
+            if "error" not in job and "response" not in job:
+                try:
+                    fn(job)
+                except Exception as e:
+                    job["error"] = e
+            if outbox is not None:
+                outbox.put(job)
+            else:
+                self._finish(job)
+
+    def _finish(self, job):
+        with self._clients_lock:
+            order = self._clients.get(job["_client"])
+        if order is None:
+            return  # Client went away while its frame was in flight
+
+        with order.lock:
+            order.finished[job["_seq"]] = job
+            # Deliver every job that is now in order; holding the client lock
+            # keeps delivery for one client serialized
+            while order.next_delivery in order.finished:
+                ready = order.finished.pop(order.next_delivery)
+                order.next_delivery += 1
+                try:
+                    self.deliver(ready)
+                except Exception as e:
+                    print(f"❌ Pipeline delivery error: {e}")
@@ -0,0 +1,42 @@
+# Wire formats for frame results sent back over Socket.IO:
+# - "base64": the original JSON result, processed_frame is a base64 JPEG data URI.
+# - "binary": processed_frame is sent as raw JPEG bytes (a Socket.IO binary
+#   attachment) next to the rest of the result as a JSON metadata object.
+# - "overlay": no processed_frame at all; the result carries keypoints, joint
+#   angles and draw primitives that the client renders over its own frame.
+
+RESPONSE_MODES = ("base64", "binary", "overlay")
+DEFAULT_RESPONSE_MODE = "base64"
+
+BINARY_TYPES = (bytes, bytearray, memoryview)
+
+
+def is_binary_frame(frame_data):
+    """True if the frame arrived as a binary attachment rather than a base64 string."""
+    return isinstance(frame_data, BINARY_TYPES)
+
+
+def resolve_response_mode(requested, session_mode, frame_data):
+    """
+    Picks the response mode for a frame: an explicit per-frame request wins,
+    then the session's configured mode, then binary clients get binary back.
+    """
+    for mode in (requested, session_mode):
+        if mode in RESPONSE_MODES:
+            return mode
+    return "binary" if is_binary_frame(frame_data) else DEFAULT_RESPONSE_MODE
+
+
+def pack_metadata(result):
+    """
+    Metadata sent next to a binary attachment. Always the plain dict, which
+    Socket.IO sends as a JSON object, so clients get one format whatever is
+    installed on the server.
+    """
+    return result
+
+
+def split_binary_result(result):
+    """Splits a binary-mode result into (metadata, jpeg_bytes) for emitting."""
+    frame_bytes = result.pop("processed_frame", None)
+    return pack_metadata(result), frame_bytes
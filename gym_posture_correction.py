@@ -1,10 +1,11 @@
+import threading
+import time
+
 import cv2
 import mediapipe as mp
-import numpy as np
-import pyttsx3
-import time
-from threading import Thread
-from collections import deque
+from exercise_feedback import BAD_COLOR, TEXT_COLOR, draw_exercise_specs, process_exercise
+from exercise_rules import EXERCISE_RULES, cue_phrases
+from speech_worker import SpeechWorker
 
 # Initialize MediaPipe Pose
 mp_pose = mp.solutions.pose
@@ -13,341 +14,94 @@ pose = mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5)
 
 print("MediaPipe Pose initialized successfully!")
 
-# Initialize text-to-speech engine
-tts_engine = pyttsx3.init()
-tts_engine.setProperty('rate', 150)  # Speed of speech
-tts_engine.setProperty('volume', 0.9)  # Volume (0.0 to 1.0)
-
-# Voice feedback state management
-last_announcement_time = 0
-last_announcement_text = ""
-ANNOUNCEMENT_COOLDOWN = 3.0  # Seconds between announcements
-
-# Smoothing buffers for angles (reduces jitter)
-elbow_angle_buffer = deque(maxlen=5)
-back_angle_buffer = deque(maxlen=5)
-
-
-def speak_async(text):
-    """Speak text in a separate thread to avoid blocking the main loop."""
-    def speak():
-        tts_engine.say(text)
-        tts_engine.runAndWait()
-    
-    thread = Thread(target=speak)
-    thread.daemon = True
-    thread.start()
-
-
-def announce_feedback(feedback_text, force=False):
-    """
-    Announces feedback if the text has changed OR enough time has passed.
-    force=True will announce immediately regardless of cooldown (for important events).
-    """
-    global last_announcement_time, last_announcement_text
-    
-    current_time = time.time()
-    time_since_last = current_time - last_announcement_time
-    
-    # Announce if text changed (immediate) OR cooldown passed OR forced
-    if force or feedback_text != last_announcement_text or time_since_last >= ANNOUNCEMENT_COOLDOWN:
-        speak_async(feedback_text)
-        last_announcement_time = current_time
-        last_announcement_text = feedback_text
-
-
-def calculate_angle(a, b, c):
-    """
-    Calculates the angle between three 3D points.
-    a, b, c: Tuples or lists of (x, y, z) coordinates.
-    The angle is calculated at point 'b'.
-    """
-    a = np.array(a)  # First point
-    b = np.array(b)  # Mid point (vertex)
-    c = np.array(c)  # End point
-
-    # Calculate vectors
-    ba = a - b
-    bc = c - b
-
-    # Calculate dot product
-    dot_product = np.dot(ba, bc)
-
-    # Calculate magnitudes
-    mag_ba = np.linalg.norm(ba)
-    mag_bc = np.linalg.norm(bc)
-
-    # Calculate cosine of the angle
-    # Add a small epsilon to avoid division by zero
-    cosine_angle = dot_product / (mag_ba * mag_bc + 1e-6)
-
-    # Clip values to prevent arccos errors
-    cosine_angle = np.clip(cosine_angle, -1.0, 1.0)
-
-    # Calculate angle in radians and convert to degrees
-    angle = np.arccos(cosine_angle)
-    return np.degrees(angle)
+# Voice feedback: one speech thread, fixed cues pre-rendered (see speech_worker)
+speech = SpeechWorker(cue_phrases())
 
+# Angle smoothing (reduces jitter): one filter bank per exercise, so one
+# exercise's history never leaks into another's
+angle_filters = {}
 
-def smooth_angle(angle, buffer):
-    """Smooth angle using moving average to reduce jitter."""
-    buffer.append(angle)
-    return np.mean(buffer)
+# Active form faults per exercise (hysteresis state for exercise_rules checks)
+form_faults = {}
 
+FPS_SMOOTHING = 0.2  # EMA weight of the newest frame interval in the FPS readout
 
-def get_landmark_coords(landmarks, part_name, image_width, image_height):
-    """
-    Retrieves the pixel coordinates (x, y) of a specific landmark.
-    """
-    lm = landmarks[mp_pose.PoseLandmark[part_name].value]
-    return (int(lm.x * image_width), int(lm.y * image_height))
-
-
-def get_landmark_3d(landmarks, part_name):
-    """
-    Retrieves the 3D coordinates (x, y, z) of a specific landmark.
-    """
-    lm = landmarks[mp_pose.PoseLandmark[part_name].value]
-    return [lm.x, lm.y, lm.z]
-
-
-# --- Exercise Processing Functions ---
 
-def process_pushup(landmarks, frame_width, frame_height, rep_counter, exercise_state, feedback_text):
-    """
-    Processes the logic for a pushup.
-    Calculates angles, provides feedback, counts reps, and returns drawing specs.
-    """
-
-    # Initialize drawing specs
-    drawing_specs = {}
-
-    # Get 3D coordinates for angle calculations
-    left_shoulder_3d = get_landmark_3d(landmarks, "LEFT_SHOULDER")
-    left_elbow_3d = get_landmark_3d(landmarks, "LEFT_ELBOW")
-    left_wrist_3d = get_landmark_3d(landmarks, "LEFT_WRIST")
-    left_hip_3d = get_landmark_3d(landmarks, "LEFT_HIP")
-    left_knee_3d = get_landmark_3d(landmarks, "LEFT_KNEE")
-
-    # Get 2D pixel coordinates for drawing
-    left_shoulder_2d = get_landmark_coords(landmarks, "LEFT_SHOULDER", frame_width, frame_height)
-    left_elbow_2d = get_landmark_coords(landmarks, "LEFT_ELBOW", frame_width, frame_height)
-    left_wrist_2d = get_landmark_coords(landmarks, "LEFT_WRIST", frame_width, frame_height)
-    left_hip_2d = get_landmark_coords(landmarks, "LEFT_HIP", frame_width, frame_height)
-    left_knee_2d = get_landmark_coords(landmarks, "LEFT_KNEE", frame_width, frame_height)
-
-    # Calculate angles with smoothing
-    elbow_angle_raw = calculate_angle(left_shoulder_3d, left_elbow_3d, left_wrist_3d)
-    back_angle_raw = calculate_angle(left_shoulder_3d, left_hip_3d, left_knee_3d)
-    
-    elbow_angle = smooth_angle(elbow_angle_raw, elbow_angle_buffer)
-    back_angle = smooth_angle(back_angle_raw, back_angle_buffer)
-
-    # --- Form Correction Cues & UI Coloring ---
-    elbow_line_color = GOOD_COLOR
-    back_line_color = GOOD_COLOR
-    hip_circle_color = GOOD_COLOR
-
-    # Back straightness
-    if back_angle < 160:  # Threshold for straight back
-        if "back" not in feedback_text:  # Only announce if not already saying it
-            feedback_text = "Keep your back straight!"
-            announce_feedback(feedback_text, force=True)
-        else:
-            feedback_text = "Keep your back straight!"
-        back_line_color = BAD_COLOR
-        hip_circle_color = BAD_COLOR
-    else:
-        if feedback_text == "Keep your back straight!":  # Changed from bad to good
-            feedback_text = "Good back form!"
-            announce_feedback(feedback_text, force=True)
-        else:
-            feedback_text = "Good back form!"
-        back_line_color = GOOD_COLOR
-        hip_circle_color = GOOD_COLOR
-
-    # Elbow depth (for rep counting)
-    if elbow_angle < 90 and back_angle > 160:  # Deep enough and back is straight
-        if exercise_state != "down":
-            exercise_state = "down"
-            feedback_text = "Lower!"
-            announce_feedback(feedback_text, force=True)
-        else:
-            feedback_text = "Lower!"
-        elbow_line_color = GOOD_COLOR
-
-    elif elbow_angle > 160 and exercise_state == "down":  # Back up, rep complete
-        exercise_state = "up"
-        rep_counter += 1
-        feedback_text = "Rep Complete!"
-        elbow_line_color = GOOD_COLOR
-        announce_feedback(feedback_text, force=True)
-
-    elif elbow_angle > 160 and exercise_state == "up":  # Staying up, ready for next rep
-        if feedback_text != "Ready to lower!":
-            feedback_text = "Ready to lower!"
-            announce_feedback(feedback_text)
-        else:
-            feedback_text = "Ready to lower!"
-        elbow_line_color = GOOD_COLOR
-    else:
-        elbow_line_color = BAD_COLOR
-        if "back" not in feedback_text:  # Don't overwrite critical back feedback
-            if feedback_text != "Push up or lower!":
-                feedback_text = "Push up or lower!"
-                announce_feedback(feedback_text)
-            else:
-                feedback_text = "Push up or lower!"
-
-    # Populate drawing_specs for the main loop to draw
-    drawing_specs = {
-        "elbow_line_color": elbow_line_color,
-        "back_line_color": back_line_color,
-        "hip_circle_color": hip_circle_color,
-        "left_elbow_2d": left_elbow_2d,
-        "left_shoulder_2d": left_shoulder_2d,
-        "left_hip_2d": left_hip_2d,
-        "left_knee_2d": left_knee_2d,
-        "elbow_angle": int(elbow_angle),
-        "back_angle": int(back_angle)
-    }
-
-    return rep_counter, exercise_state, feedback_text, drawing_specs
-
-
-def process_bicep_curl(landmarks, frame_width, frame_height, rep_counter, exercise_state, feedback_text):
+class LatestSlot:
     """
-    Simple bicep curl test - just curl your arm to test the system!
-    Works great for testing without doing full push-ups.
+    Single-item handoff between threads where only the newest item matters:
+    put() overwrites, get() waits for something newer than the caller last saw.
     """
-    
-    # Initialize drawing specs
-    drawing_specs = {}
-    
-    # Get 3D coordinates for angle calculation
-    right_shoulder_3d = get_landmark_3d(landmarks, "RIGHT_SHOULDER")
-    right_elbow_3d = get_landmark_3d(landmarks, "RIGHT_ELBOW")
-    right_wrist_3d = get_landmark_3d(landmarks, "RIGHT_WRIST")
-    
-    # Get 2D coordinates for drawing
-    right_shoulder_2d = get_landmark_coords(landmarks, "RIGHT_SHOULDER", frame_width, frame_height)
-    right_elbow_2d = get_landmark_coords(landmarks, "RIGHT_ELBOW", frame_width, frame_height)
-    right_wrist_2d = get_landmark_coords(landmarks, "RIGHT_WRIST", frame_width, frame_height)
-    
-    # Calculate elbow angle with smoothing
-    elbow_angle_raw = calculate_angle(right_shoulder_3d, right_elbow_3d, right_wrist_3d)
-    elbow_angle = smooth_angle(elbow_angle_raw, elbow_angle_buffer)
-    
-    # --- Form checking and rep counting ---
-    elbow_line_color = GOOD_COLOR
-    
-    # Curled position (arm bent)
-    if elbow_angle < 50:  # Fully curled
-        if exercise_state != "curled":  # State changed
-            exercise_state = "curled"
-            feedback_text = "Good curl!"
-            announce_feedback(feedback_text, force=True)  # Announce state change immediately
-        else:
-            feedback_text = "Good curl!"
-        elbow_line_color = GOOD_COLOR
-    
-    # Extended position (arm straight) - completes the rep
-    elif elbow_angle > 140 and exercise_state == "curled":
-        exercise_state = "extended"
-        rep_counter += 1
-        feedback_text = "Rep complete!"
-        elbow_line_color = GOOD_COLOR
-        announce_feedback(feedback_text, force=True)  # Always announce rep completion
-    
-    # Ready position
-    elif elbow_angle > 140 and exercise_state == "extended":
-        if feedback_text != "Curl your arm!":  # Only announce if changing
-            feedback_text = "Curl your arm!"
-            announce_feedback(feedback_text)
-        else:
-            feedback_text = "Curl your arm!"
-        elbow_line_color = GOOD_COLOR
-    
-    # In between
-    else:
-        if elbow_angle < 140 and elbow_angle > 50:
-            if feedback_text != "Keep going...":  # Only announce if changing
-                feedback_text = "Keep going..."
-                announce_feedback(feedback_text)
-            else:
-                feedback_text = "Keep going..."
-            elbow_line_color = (255, 165, 0)  # Orange
-    
-    # Populate drawing specs
-    drawing_specs = {
-        "elbow_line_color": elbow_line_color,
-        "right_shoulder": right_shoulder_2d,
-        "right_elbow": right_elbow_2d,
-        "right_wrist": right_wrist_2d,
-        "elbow_angle": int(elbow_angle)
-    }
-    
-    return rep_counter, exercise_state, feedback_text, drawing_specs
-
-
-# --- Dummy Functions for Other Exercises ---
-
-def process_barbell_squat(landmarks, frame_width, frame_height, rep_counter, exercise_state, feedback_text):
-    feedback_text = "Barbell Squat logic not implemented."
-    return rep_counter, exercise_state, feedback_text, {}
-
 
-def process_deadlift(landmarks, frame_width, frame_height, rep_counter, exercise_state, feedback_text):
-    feedback_text = "Deadlift logic not implemented."
-    return rep_counter, exercise_state, feedback_text, {}
-
-
-def process_chest_press(landmarks, frame_width, frame_height, rep_counter, exercise_state, feedback_text):
-    feedback_text = "Chest Press logic not implemented."
-    return rep_counter, exercise_state, feedback_text, {}
-
-
-def process_shoulder_press(landmarks, frame_width, frame_height, rep_counter, exercise_state, feedback_text):
-    feedback_text = "Shoulder Press logic not implemented."
-    return rep_counter, exercise_state, feedback_text, {}
-
-
-def process_pull_up(landmarks, frame_width, frame_height, rep_counter, exercise_state, feedback_text):
-    feedback_text = "Pull Up logic not implemented."
-    return rep_counter, exercise_state, feedback_text, {}
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self._seq = 0
+
+    def put(self, item):
+        """Stores item. Returns True if it replaced one nobody had taken."""
+        with self._cond:
+            replaced = self._item is not None
+            self._item = item
+            self._seq += 1
+            self._cond.notify_all()
+            return replaced
+
+    def get(self, after_seq, timeout=None):
+        """
+        Returns (seq, item) once an item newer than after_seq is stored, or
+        (after_seq, None) on timeout. Taking the item frees the slot.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > after_seq and self._item is not None, timeout):
+                return after_seq, None
+            item, self._item = self._item, None
+            return self._seq, item
+
+
+class RateMeter:
+    """Events per second, smoothed over recent intervals."""
+
+    def __init__(self, smoothing=FPS_SMOOTHING):
+        self.smoothing = smoothing
+        self.fps = 0.0
+        self._last = None
+
+    def tick(self):
+        now = time.monotonic()
+        if self._last is not None and now > self._last:
+            fps = 1.0 / (now - self._last)
+            self.fps = fps if not self.fps else self.smoothing * fps + (1 - self.smoothing) * self.fps
+        self._last = now
 
 
 # --- Main Application Logic ---
 
 # Global state variables
 rep_counter = 0
-exercise_state = "up"  # Can be "up" or "down" for pushup, "extended" or "curled" for bicep
+exercise_state = "up"  # Rep phase, named by the exercise's rules in exercise_rules.EXERCISES
 feedback_text = ""
 current_exercise = "bicep_curl"  # Default exercise for testing - change to "pushup" when ready
 drawing_specs = {}  # Dictionary to hold drawing info
 
-# Colors for drawing
-GOOD_COLOR = (0, 255, 0)  # Green
-BAD_COLOR = (0, 0, 255)  # Red
-TEXT_COLOR = (255, 255, 255)  # White
-OUTLINE_COLOR = (0, 0, 0)  # Black
-
 # Webcam feed
 cap = cv2.VideoCapture(0)
 if not cap.isOpened():
     print("Error: Could not open webcam.")
     exit()
+cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Don't let the driver queue stale frames (ignored by some backends)
+
+speech.start()  # Pre-renders the fixed cues while the camera warms up
 
 print("AI Gym Coach Started with MediaPipe!")
 print("Press 'q' to quit")
 print(f"Voice announcements will occur on state changes")
 print(f"Current exercise: {current_exercise}")
 
-while cap.isOpened():
-    ret, frame = cap.read()
-    if not ret:
-        print("Error: Could not read frame.")
-        break
+
+def annotate_frame(frame):
+    """Runs pose detection and the exercise rules on frame; returns the annotated BGR image."""
+    global rep_counter, exercise_state, feedback_text, drawing_specs
 
     frame_height, frame_width, _ = frame.shape
 
@@ -369,84 +123,20 @@ while cap.isOpened():
     try:
         landmarks = results.pose_landmarks.landmark
 
-        # --- Exercise-specific Logic Switch ---
+        # --- Exercise Rules (see exercise_rules.EXERCISES) ---
 
-        if current_exercise == "pushup":
-            rep_counter, exercise_state, feedback_text, drawing_specs = process_pushup(
-                landmarks, frame_width, frame_height, rep_counter, exercise_state, feedback_text
-            )
-        elif current_exercise == "bicep_curl":
-            rep_counter, exercise_state, feedback_text, drawing_specs = process_bicep_curl(
-                landmarks, frame_width, frame_height, rep_counter, exercise_state, feedback_text
-            )
-        elif current_exercise == "barbell_squat":
-            rep_counter, exercise_state, feedback_text, drawing_specs = process_barbell_squat(
-                landmarks, frame_width, frame_height, rep_counter, exercise_state, feedback_text
-            )
-        elif current_exercise == "deadlift":
-            rep_counter, exercise_state, feedback_text, drawing_specs = process_deadlift(
-                landmarks, frame_width, frame_height, rep_counter, exercise_state, feedback_text
-            )
-        elif current_exercise == "chest_press":
-            rep_counter, exercise_state, feedback_text, drawing_specs = process_chest_press(
-                landmarks, frame_width, frame_height, rep_counter, exercise_state, feedback_text
-            )
-        elif current_exercise == "shoulder_press":
-            rep_counter, exercise_state, feedback_text, drawing_specs = process_shoulder_press(
-                landmarks, frame_width, frame_height, rep_counter, exercise_state, feedback_text
-            )
-        elif current_exercise == "pull_up":
-            rep_counter, exercise_state, feedback_text, drawing_specs = process_pull_up(
-                landmarks, frame_width, frame_height, rep_counter, exercise_state, feedback_text
+        if current_exercise in EXERCISE_RULES:
+            rep_counter, exercise_state, feedback_text, drawing_specs = process_exercise(
+                current_exercise, landmarks, frame_width, frame_height, rep_counter, exercise_state, feedback_text,
+                angle_filters, form_faults, speech.say
             )
         else:
             feedback_text = "No exercise selected."
 
         # --- Draw Visual Cues on the Body ---
 
-        # Draw cues for bicep curl
-        if current_exercise == "bicep_curl" and drawing_specs:
-            specs = drawing_specs
-            
-            # Draw arm lines
-            cv2.line(image, specs["right_shoulder"], specs["right_elbow"], 
-                    specs["elbow_line_color"], 4)
-            cv2.line(image, specs["right_elbow"], specs["right_wrist"], 
-                    specs["elbow_line_color"], 4)
-            
-            # Draw elbow circle
-            cv2.circle(image, specs["right_elbow"], 12, specs["elbow_line_color"], -1)
-            
-            # Display angle
-            cv2.putText(image, f'Angle: {specs["elbow_angle"]}', 
-                       (specs["right_elbow"][0] + 20, specs["right_elbow"][1]),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, TEXT_COLOR, 2, cv2.LINE_AA)
-
-        # Draw cues for pushup
-        if current_exercise == "pushup" and drawing_specs:
-            specs = drawing_specs
-
-            # Elbow circle
-            cv2.circle(image, specs["left_elbow_2d"], 10, specs["elbow_line_color"], -1)
-
-            # Back lines
-            cv2.line(image, specs["left_shoulder_2d"], specs["left_hip_2d"], specs["back_line_color"], 4)
-            cv2.line(image, specs["left_hip_2d"], specs["left_knee_2d"], specs["back_line_color"], 4)
-
-            # Hip circle
-            cv2.circle(image, specs["left_hip_2d"], 10, specs["hip_circle_color"], -1)
-
-            # Highlight bad back
-            if specs["back_line_color"] == BAD_COLOR:
-                cv2.circle(image, specs["left_hip_2d"], 15, BAD_COLOR, -1)
-            
-            # Display angles
-            cv2.putText(image, f'Elbow: {specs["elbow_angle"]}', 
-                       (specs["left_elbow_2d"][0] + 20, specs["left_elbow_2d"][1]),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, TEXT_COLOR, 1, cv2.LINE_AA)
-            cv2.putText(image, f'Back: {specs["back_angle"]}', 
-                       (specs["left_hip_2d"][0] + 20, specs["left_hip_2d"][1]),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, TEXT_COLOR, 1, cv2.LINE_AA)
+        if drawing_specs:
+            draw_exercise_specs(image, drawing_specs)
 
         # --- Display Reps and General Feedback (GUI) ---
 
@@ -486,14 +176,93 @@ while cap.isOpened():
                               mp_drawing.DrawingSpec(color=(100, 100, 100), thickness=2, circle_radius=2),
                               mp_drawing.DrawingSpec(color=(150, 150, 150), thickness=2, circle_radius=2)
                               )
+    return image
+
+
+def capture_loop():
+    """Reads the camera as fast as it delivers, keeping only the newest frame. Owns (and releases) cap."""
+    try:
+        while not stop_event.is_set():
+            ret, frame = cap.read()
+            if not ret:
+                print("Error: Could not read frame.")
+                break
+            camera_rate.tick()
+            if latest_frame.put((frame, time.monotonic())):
+                stats["dropped"] += 1  # The previous frame was never processed
+    finally:
+        stop_event.set()
+        cap.release()
+
+
+def process_loop():
+    """
+    Annotates the newest captured frame; frames that arrive meanwhile replace
+    each other. Owns (and closes) pose, so it's never closed mid-process().
+    """
+    seq = 0
+    try:
+        while not stop_event.is_set():
+            seq, item = latest_frame.get(seq, timeout=0.1)
+            if item is None:
+                continue
+            frame, captured_at = item
+            started = time.monotonic()
+            try:
+                image = annotate_frame(frame)
+            except Exception as e:
+                print(f"❌ Processing error: {e}")
+                continue
+            stats["process_ms"] = (time.monotonic() - started) * 1000
+            process_rate.tick()
+            latest_image.put((image, captured_at))
+    finally:
+        pose.close()
+
+
+def draw_performance(image, latency_ms):
+    """FPS and latency readout in the top-right corner."""
+    lines = [
+        f"CAM {camera_rate.fps:4.1f} FPS",
+        f"POSE {process_rate.fps:4.1f} FPS ({stats['process_ms']:.0f} ms)",
+        f"LATENCY {latency_ms:.0f} ms",
+        f"DROPPED {stats['dropped']}"
+    ]
+    x = image.shape[1] - 300
+    for i, line in enumerate(lines):
+        cv2.putText(image, line, (x, 25 + 22 * i), cv2.FONT_HERSHEY_SIMPLEX, 0.55, TEXT_COLOR, 1, cv2.LINE_AA)
+
+
+# Capture and processing run on their own threads; display and key handling
+# stay on the main thread (OpenCV windows are not safe elsewhere)
+stop_event = threading.Event()
+latest_frame = LatestSlot()  # (frame, capture time) from the camera
+latest_image = LatestSlot()  # (annotated image, capture time) from processing
+camera_rate = RateMeter()
+process_rate = RateMeter()
+stats = {"dropped": 0, "process_ms": 0.0}
+
+threads = [threading.Thread(target=capture_loop, name="capture", daemon=True),
+           threading.Thread(target=process_loop, name="process", daemon=True)]
+for thread in threads:
+    thread.start()
+
+shown = 0
+while not stop_event.is_set():
+    shown, item = latest_image.get(shown, timeout=0.01)
+    if item is not None:
+        image, captured_at = item
+        draw_performance(image, (time.monotonic() - captured_at) * 1000)
 
-    # Display the image
-    cv2.imshow('AI Gym Coach - MediaPipe', image)
+        # Display the image
+        cv2.imshow('AI Gym Coach - MediaPipe', image)
 
-    # Exit logic
-    if cv2.waitKey(10) & 0xFF == ord('q'):
+    # Exit logic (also keeps the window responsive while waiting for a frame)
+    if cv2.waitKey(1) & 0xFF == ord('q'):
         break
 
-cap.release()
+stop_event.set()
+for thread in threads:
+    thread.join()  # Each releases what it owns (camera, pose model) on its way out
 cv2.destroyAllWindows()
-pose.close()
\ No newline at end of file
+speech.close()
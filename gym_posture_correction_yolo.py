@@ -1,164 +1,423 @@
 import base64
+import os
+import threading
+import time
 import cv2
 import numpy as np
-from ultralytics import YOLO
+from pose_features import COCO_FEATURES, COCO_JOINTS, yolo_points
+from pose_result import KEYPOINT_CONF_THRESHOLD, NUM_KEYPOINTS, SKELETON, PoseResult, result_arrays
 
-print("⚙️ Loading YOLOv8 model...")
-model = YOLO("yolov8n-pose.pt")
-print("✅ YOLO model loaded successfully.")
+# Inference engine: "ultralytics" (PyTorch) or "onnx" (ONNX Runtime, see onnx_pose_engine.py)
+INFERENCE_ENGINE = os.environ.get("REPWISE_ENGINE", "ultralytics")
+MODEL_PATH = "yolov8n-pose.pt"
+ONNX_MODEL_PATH = os.environ.get("REPWISE_ONNX_MODEL", "yolov8n-pose.onnx")
+ONNX_PROVIDER = os.environ.get("REPWISE_ONNX_PROVIDER", "cpu")  # "cpu" or "openvino"
 
-# Exercise state tracking (add this at module level)
-exercise_state = {
-    "rep_count": 0,
-    "current_state": "ready",
-    "last_angle": 0
+# Frame sizes (height x width) warmed up before serving, e.g. "480x640,720x1280"
+WARMUP_SIZES = [tuple(int(v) for v in size.split("x"))
+                for size in os.environ.get("REPWISE_WARMUP_SIZES", "480x640").split(",") if size]
+WARMUP_RUNS = 2  # Passes per size (the first one pays for kernel selection / allocation)
+
+# The model is built on first use (or by warmup), not at import time
+model = None
+_model_lock = threading.Lock()
+
+
+def load_model(engine=INFERENCE_ENGINE, threads=None, model_path=None, onnx_provider=ONNX_PROVIDER):
+    """
+    Builds the pose model for the selected engine. Both are called the same way.
+    threads pins the runtime's intra-op thread count.
+    """
+    if engine == "onnx":
+        from onnx_pose_engine import OnnxPoseEngine
+        return OnnxPoseEngine(model_path or ONNX_MODEL_PATH, onnx_provider, threads=threads)
+
+    from ultralytics import YOLO
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+    return YOLO(model_path or MODEL_PATH)
+
+
+def get_model():
+    """Returns the shared pose model, loading it on first call."""
+    global model
+    if model is None:
+        with _model_lock:
+            if model is None:
+                print("⚙️ Loading YOLOv8 model...")
+                model = load_model()
+                print("✅ YOLO model loaded successfully.")
+    return model
+
+
+def warmup(sizes=None, batch_sizes=(1,), runs=WARMUP_RUNS, pose_model=None):
+    """
+    Runs dummy frames through the model at each input size and batch size so
+    the first real frame doesn't pay for cold kernels. Returns seconds taken.
+    """
+    pose_model = pose_model or get_model()
+    start = time.perf_counter()
+    for height, width in sizes or WARMUP_SIZES:
+        dummy = np.zeros((height, width, 3), np.uint8)
+        for batch_size in batch_sizes:
+            for _ in range(runs):
+                pose_model([dummy] * batch_size, verbose=False, conf=0.5)
+    elapsed = time.perf_counter() - start
+    print(f"🔥 Model warmed up in {elapsed:.2f}s")
+    return elapsed
+
+# Rep state machine thresholds (degrees)
+CURL_UP_ANGLE = 50  # Elbow angle below which a curl counts as up
+CURL_DOWN_ANGLE = 160  # Elbow angle above which the arm counts as extended
+
+# Metric driving each exercise's state machine, and per rep phase the
+# threshold(s) whose crossing moves it to the next phase
+REP_THRESHOLDS = {
+    "bicep_curl": ("elbow_angle", {
+        "ready": (CURL_DOWN_ANGLE,),
+        "down": (CURL_UP_ANGLE,),
+        "up": (CURL_DOWN_ANGLE,)
+    })
 }
 
-def calculate_angle(a, b, c):
-    """Calculate angle between three points (a-b-c)"""
-    a = np.array(a)
-    b = np.array(b)
-    c = np.array(c)
-    
-    radians = np.arctan2(c[1] - b[1], c[0] - b[0]) - np.arctan2(a[1] - b[1], a[0] - b[0])
-    angle = np.abs(radians * 180.0 / np.pi)
-    
-    if angle > 180.0:
-        angle = 360 - angle
-        
-    return float(angle)  # Convert to Python float
-
-def analyze_pose_frame(image_data, exercise="bicep_curl"):
-    try:
-        # If image_data is a base64 string, decode it first
-        if isinstance(image_data, str):
-            # Remove data URI scheme if present
-            if image_data.startswith("data:image"):
-                image_data = image_data.split(",")[1]
+# Feedback texts of the rep state machine (angle readouts aside, which change every frame)
+REP_COMPLETE_TEXT = "✓ Rep complete! Good form."
+LOWER_SLOWLY_TEXT = "Lower the weight slowly"
+SHOW_ARM_TEXT = "Position yourself so your full arm is visible"
+FEEDBACK_PHRASES = (REP_COMPLETE_TEXT, LOWER_SLOWLY_TEXT, SHOW_ARM_TEXT)
 
-            image_data = base64.b64decode(image_data)
+# Overlay colors (RGB, drawn by the browser)
+GOOD_COLOR = (0, 255, 0)  # Green
+WARN_COLOR = (255, 165, 0)  # Orange
+SKELETON_COLOR = (150, 150, 150)  # Grey
+TEXT_COLOR = (255, 255, 255)  # White
 
-        # Convert bytes to NumPy array
-        nparr = np.frombuffer(image_data, np.uint8)
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+def new_exercise_state():
+    """Returns a fresh rep state machine (one per client session)."""
+    return {
+        "rep_count": 0,
+        "current_state": "ready",
+        "last_angle": 0
+    }
 
-        if frame is None:
-            print("❌ Received empty frame")
-            return {"status": "error", "message": "Empty frame received"}
 
-        # Run YOLO inference with conf threshold
-        results = model(frame, verbose=False, conf=0.5)
-
-        # Check if any results exist
-        if len(results) == 0:
-            print("⚠️ No detections found in this frame")
-            # Return original frame
-            _, buffer = cv2.imencode('.jpg', frame)
-            processed_frame_base64 = base64.b64encode(buffer).decode('utf-8')
-            processed_frame = f"data:image/jpeg;base64,{processed_frame_base64}"
-            
-            return {
-                "status": "no_person", 
-                "message": "No person detected",
-                "processed_frame": processed_frame,
-                "rep_count": exercise_state["rep_count"],
-                "exercise_state": "waiting"
-            }
-
-        # Get the first detection result
-        result = results[0]
-        
+def reset_exercise_state(state):
+    """Resets a rep state machine in place."""
+    state.update(new_exercise_state())
+
+
+# Default exercise state, used when no per-session state is passed in
+exercise_state = new_exercise_state()
+
+def decode_frame(image_data):
+    """Decodes a base64 data URI, base64 string or raw bytes into a BGR frame (None if invalid)."""
+    # If image_data is a base64 string, decode it first
+    if isinstance(image_data, str):
+        # Remove data URI scheme if present
+        if image_data.startswith("data:image"):
+            image_data = image_data.split(",")[1]
+
+        image_data = base64.b64decode(image_data)
+
+    # Wrap the bytes as a NumPy array (no copy, also for bytearray/memoryview attachments)
+    nparr = np.frombuffer(image_data, np.uint8)
+    return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+
+
+def encode_frame(frame, response_mode="base64"):
+    """
+    Encodes a BGR frame as JPEG: a base64 data URI by default, or raw
+    bytes when response_mode is "binary".
+    """
+    _, buffer = cv2.imencode('.jpg', frame)
+    if response_mode == "binary":
+        return buffer.tobytes()
+    processed_frame_base64 = base64.b64encode(buffer).decode('utf-8')
+    return f"data:image/jpeg;base64,{processed_frame_base64}"
+
+
+def run_inference(frames, imgsz=None):
+    """
+    Runs YOLO on a list of frames in one batched call. Returns one result per frame.
+    imgsz overrides the network input size (e.g. smaller for person crops).
+    """
+    if imgsz:
+        return get_model()(frames, verbose=False, conf=0.5, imgsz=imgsz)
+    return get_model()(frames, verbose=False, conf=0.5)
+
+
+def infer_frame(frame, imgsz=None):
+    """Runs YOLO on a single frame. Returns its result, or None if there were no detections."""
+    results = run_inference([frame], imgsz)
+    return results[0] if len(results) else None
+
+
+def build_overlay(frame_shape, person, metrics, exercise="bicep_curl"):
+    """
+    Builds the overlay for one person as draw primitives for the client:
+    keypoints, confidences, joint angles and a list of lines, circles and
+    labels (like the drawing_specs dicts in gym_posture_correction.py).
+    person is a (17, 3) array of x, y, confidence.
+    """
+    height, width = frame_shape[:2]
+    person = np.asarray(person, dtype=np.float64).reshape(-1, 3)
+    xy = np.round(person[:, :2], 1)
+    conf = person[:, 2]
+    visible = conf >= KEYPOINT_CONF_THRESHOLD
+    points = xy.tolist()
+
+    primitives = []
+    for a, b in SKELETON:
+        if b < len(points) and visible[a] and visible[b]:
+            primitives.append({"type": "line", "from": points[a], "to": points[b],
+                               "color": SKELETON_COLOR, "thickness": 2})
+    for i in np.flatnonzero(visible):
+        primitives.append({"type": "circle", "center": points[i], "radius": 3,
+                           "color": SKELETON_COLOR, "filled": True})
+
+    # Highlight the joints the exercise is scored on
+    if exercise == "bicep_curl" and "elbow_angle" in metrics and len(points) >= 11:
+        angle = metrics["elbow_angle"]
+        arm_color = WARN_COLOR if CURL_UP_ANGLE < angle < CURL_DOWN_ANGLE else GOOD_COLOR
+        shoulder, elbow, wrist = points[6], points[8], points[10]
+        primitives.append({"type": "line", "from": shoulder, "to": elbow, "color": arm_color, "thickness": 4})
+        primitives.append({"type": "line", "from": elbow, "to": wrist, "color": arm_color, "thickness": 4})
+        primitives.append({"type": "circle", "center": elbow, "radius": 12, "color": arm_color, "filled": True})
+        primitives.append({"type": "label", "text": f"Angle: {int(angle)}",
+                           "position": [elbow[0] + 20, elbow[1]], "color": TEXT_COLOR})
+
+    return {
+        "width": int(width),
+        "height": int(height),
+        "keypoints": points,
+        "confidences": np.round(conf, 3).tolist(),
+        "angles": metrics,
+        "primitives": primitives
+    }
+
+
+def extract_keypoints(result):
+    """
+    Pulls the keypoints array out of a YOLO result (ultralytics Results or PoseResult).
+    Returns (status, message, keypoints_data); keypoints_data is None unless status is "success".
+    """
+    # Check if any results exist
+    if result is None:
+        print("⚠️ No detections found in this frame")
+        return "no_person", "No person detected", None
+
+    if isinstance(result, PoseResult):
+        keypoints_data = result.keypoints
+    else:
         # Check if keypoints exist and are not None
         if result.keypoints is None or result.keypoints.data is None:
             print("⚠️ No keypoints in result")
-            # Return original frame
-            _, buffer = cv2.imencode('.jpg', frame)
-            processed_frame_base64 = base64.b64encode(buffer).decode('utf-8')
-            processed_frame = f"data:image/jpeg;base64,{processed_frame_base64}"
-            
-            return {
-                "status": "no_keypoints", 
-                "message": "No keypoints detected",
-                "processed_frame": processed_frame,
-                "rep_count": exercise_state["rep_count"],
-                "exercise_state": "waiting"
-            }
+            return "no_keypoints", "No keypoints detected", None
 
         # Get keypoints
         keypoints_data = result.keypoints.data.cpu().numpy()
-        
-        if len(keypoints_data) == 0 or len(keypoints_data[0]) == 0:
-            print("⚠️ Empty keypoints array")
-            # Return original frame
-            _, buffer = cv2.imencode('.jpg', frame)
-            processed_frame_base64 = base64.b64encode(buffer).decode('utf-8')
-            processed_frame = f"data:image/jpeg;base64,{processed_frame_base64}"
-            
-            return {
-                "status": "no_keypoints", 
-                "message": "No keypoints detected",
-                "processed_frame": processed_frame,
-                "rep_count": exercise_state["rep_count"],
-                "exercise_state": "waiting"
-            }
-
-        # ✅ Draw the annotated frame with keypoints
-        annotated_frame = result.plot()  # This draws skeleton and keypoints
-        
-        # Encode the annotated frame to base64
-        _, buffer = cv2.imencode('.jpg', annotated_frame)
-        processed_frame_base64 = base64.b64encode(buffer).decode('utf-8')
-        processed_frame = f"data:image/jpeg;base64,{processed_frame_base64}"
-
-        # Get xy coordinates of first person
-        keypoints = keypoints_data[0][:, :2]  # Get only x, y (ignore confidence)
-        
-        print(f"✅ Keypoints detected: {len(keypoints)}")
-
-        # Analyze exercise-specific metrics
-        metrics = {}
-        feedback_text = ""
-        
-        if exercise == "bicep_curl" and len(keypoints) >= 11:
-            # Keypoint indices for YOLO pose:
-            # 5=left shoulder, 7=left elbow, 9=left wrist
-            # 6=right shoulder, 8=right elbow, 10=right wrist
-            
-            # Use right arm (typically facing camera)
-            shoulder = keypoints[6]
-            elbow = keypoints[8]
-            wrist = keypoints[10]
-            
-            # Check if points are detected (confidence > 0)
-            if all([shoulder[0] > 0, elbow[0] > 0, wrist[0] > 0]):
-                # Calculate angle
-                angle = calculate_angle(shoulder, elbow, wrist)
-                metrics["elbow_angle"] = float(angle)
-                
-                # Simple rep counting logic
-                if angle < 50 and exercise_state["current_state"] == "down":
-                    exercise_state["current_state"] = "up"
-                    exercise_state["rep_count"] += 1
-                    feedback_text = "✓ Rep complete! Good form."
-                elif angle > 160:
-                    exercise_state["current_state"] = "down"
-                    feedback_text = "Lower the weight slowly"
-                else:
-                    feedback_text = f"Current angle: {int(angle)}°"
-            else:
-                feedback_text = "Position yourself so your full arm is visible"
-        
-        return {
-            "status": "success", 
-            "processed_frame": processed_frame,
-            "rep_count": int(exercise_state["rep_count"]),
-            "exercise_state": exercise_state["current_state"],
+
+    if len(keypoints_data) == 0 or len(keypoints_data[0]) == 0:
+        print("⚠️ Empty keypoints array")
+        return "no_keypoints", "No keypoints detected", None
+
+    print(f"✅ Keypoints detected: {len(keypoints_data[0])}")
+    return "success", "", keypoints_data
+
+
+def compute_metrics(keypoints_data, exercise="bicep_curl"):
+    """Per-frame joint angles for the first person. Stateless, so it can run on any worker."""
+    metrics = {}
+
+    # First person, as x, y, z (= 0), confidence points for the feature kernel
+    person = keypoints_data[0]
+
+    if exercise == "bicep_curl" and len(person) >= 11:
+        # Use right arm (typically facing camera)
+        arm = [COCO_JOINTS["right_shoulder"], COCO_JOINTS["right_elbow"], COCO_JOINTS["right_wrist"]]
+
+        # Check if points are detected (undetected keypoints sit at x = 0)
+        if (person[arm, 0] > 0).all():
+            angles = COCO_FEATURES(yolo_points(person))[0]
+            metrics["elbow_angle"] = float(angles[COCO_FEATURES.angle_index["right_elbow"]])
+
+    return metrics
+
+
+def update_rep_state(metrics, exercise, state):
+    """Advances the rep state machine with this frame's metrics. Returns the feedback text."""
+    feedback_text = ""
+
+    if exercise == "bicep_curl":
+        angle = metrics.get("elbow_angle")
+        if angle is None:
+            return SHOW_ARM_TEXT
+
+        # Simple rep counting logic
+        if angle < CURL_UP_ANGLE and state["current_state"] == "down":
+            state["current_state"] = "up"
+            state["rep_count"] += 1
+            feedback_text = REP_COMPLETE_TEXT
+        elif angle > CURL_DOWN_ANGLE:
+            state["current_state"] = "down"
+            feedback_text = LOWER_SLOWLY_TEXT
+        else:
+            feedback_text = f"Current angle: {int(angle)}°"
+
+    return feedback_text
+
+
+def render_result(frame, result, keypoints_data, metrics, exercise="bicep_curl", response_mode="base64"):
+    """
+    Produces the visual part of a response: processed_frame (annotated, or the
+    original frame when nobody was found) or, in "overlay" mode, draw primitives.
+    Stateless, so it can run on any worker.
+    """
+    if response_mode == "overlay":
+        # Client draws the primitives over the frame it already has
+        person = keypoints_data[0] if keypoints_data is not None else []
+        return {"overlay": build_overlay(frame.shape, person, metrics, exercise)}
+
+    if keypoints_data is None:
+        # Return original frame
+        return {"processed_frame": encode_frame(frame, response_mode)}
+
+    # ✅ Draw the annotated frame with keypoints
+    annotated_frame = result.plot()  # This draws skeleton and keypoints
+    return {"processed_frame": encode_frame(annotated_frame, response_mode)}
+
+
+def finish_response(status, message, rendered, metrics, exercise, state):
+    """
+    Advances the rep state machine and assembles the client response.
+    Must run in frame order for a given state.
+    """
+    if status != "success":
+        response = {
+            "status": status,
+            "message": message,
+            "rep_count": state["rep_count"],
+            "exercise_state": "waiting"
+        }
+    else:
+        feedback_text = update_rep_state(metrics, exercise, state)
+        response = {
+            "status": "success",
+            "rep_count": int(state["rep_count"]),
+            "exercise_state": state["current_state"],
             "feedback_text": feedback_text,
             "metrics": metrics
         }
 
+    response.update(rendered)
+    return response
+
+
+def finish_tracked_response(status, message, rendered, result, keypoints_data, exercise, state, tracker):
+    """
+    Multi-person variant of finish_response: matches every detected person
+    to a track (see person_tracker.PersonTracker) and advances that track's
+    own rep state machine. The response lists everyone under "people"; the
+    top-level fields, and state, mirror the primary (largest) person so
+    single-athlete clients keep working. Must run in frame order.
+    """
+    people = []
+    if status == "success":
+        boxes = result_arrays(result)[1]
+        for track, i in tracker.update(keypoints_data, boxes):
+            metrics = compute_metrics(keypoints_data[i:i + 1], exercise)
+            feedback_text = update_rep_state(metrics, exercise, track.state)
+            people.append({
+                "track_id": track.id,
+                "box": [round(float(v), 1) for v in track.box[:4]],
+                "rep_count": int(track.state["rep_count"]),
+                "exercise_state": track.state["current_state"],
+                "feedback_text": feedback_text,
+                "metrics": metrics
+            })
+    else:
+        tracker.update(np.zeros((0, NUM_KEYPOINTS, 3), np.float32))
+
+    primary = tracker.primary()
+    if primary is not None:
+        state.update(primary.state)
+
+    if not people:
+        response = {
+            "status": status,
+            "message": message,
+            "rep_count": state["rep_count"],
+            "exercise_state": "waiting",
+            "people": []
+        }
+    else:
+        lead = next(person for person in people if person["track_id"] == primary.id)
+        response = {"status": "success", **lead, "people": people}
+        del response["box"]
+
+    response.update(rendered)
+    return response
+
+
+def build_pose_response(frame, result, exercise="bicep_curl", state=None, response_mode="base64", record=None,
+                        tracker=None):
+    """
+    Turns a YOLO result for frame into the client response and advances
+    the rep state machine. result may be None when nothing was detected.
+    response_mode selects how processed_frame is encoded (see encode_frame);
+    "overlay" skips rendering and encoding entirely and returns draw
+    primitives for the client instead (see build_overlay). record, if given,
+    is called as record(result, keypoints_data) once the state has advanced.
+    With a tracker, every person gets their own rep count (see
+    finish_tracked_response).
+    """
+    if state is None:
+        state = exercise_state
+
+    status, message, keypoints_data = extract_keypoints(result)
+    metrics = compute_metrics(keypoints_data, exercise) if keypoints_data is not None else {}
+    rendered = render_result(frame, result, keypoints_data, metrics, exercise, response_mode)
+    if tracker is not None:
+        response = finish_tracked_response(status, message, rendered, result, keypoints_data, exercise, state,
+                                           tracker)
+    else:
+        response = finish_response(status, message, rendered, metrics, exercise, state)
+    if record is not None:
+        record(result, keypoints_data)
+    return response
+
+
+def analyze_pose_frame(image_data, exercise="bicep_curl", state=None, infer=infer_frame,
+                       response_mode="base64", record=None, tracker=None):
+    """
+    Runs pose estimation on one frame and advances the rep state machine.
+    state is the caller's exercise state dict (see new_exercise_state);
+    it defaults to the module-level exercise_state. infer maps a decoded
+    frame to its YOLO result, so callers can route it through a batching
+    scheduler instead of a direct model call. image_data may be a base64
+    string or raw JPEG bytes; with response_mode="binary" the processed
+    frame is returned as raw JPEG bytes instead of a data URI, and with
+    response_mode="overlay" only keypoints and draw primitives are returned.
+    record and tracker are passed on to build_pose_response.
+    """
+    if state is None:
+        state = exercise_state
+
+    try:
+        frame = decode_frame(image_data)
+
+        if frame is None:
+            print("❌ Received empty frame")
+            return {"status": "error", "message": "Empty frame received"}
+
+        # Run YOLO inference with conf threshold
+        result = infer(frame)
+
+        return build_pose_response(frame, result, exercise, state, response_mode, record, tracker)
+
     except Exception as e:
         print(f"❌ analyze_pose_frame error: {e}")
         import traceback
         traceback.print_exc()
-        return {"status": "error", "message": str(e)}
\ No newline at end of file
+        return {"status": "error", "message": str(e)}
@@ -0,0 +1,115 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+# Default batching parameters
+BATCH_WINDOW_MS = 5.0  # Longest a frame waits for others to join its batch
+MAX_BATCH_SIZE = 8  # Batch is dispatched immediately once this many frames are queued
+
+
+class InferenceScheduler:
+    """
+    Gathers frames from all clients into micro-batches for one batched
+    model call. A batch is dispatched as soon as it holds max_batch_size
+    frames, or batch_window_ms after its first frame arrived, so batching
+    never adds more than batch_window_ms of latency to any frame.
+
+    infer_batch(frames, imgsz) returns one result per frame, in the same
+    order (e.g. gym_posture_correction_yolo.run_inference). Frames queued
+    with different input sizes are run as separate calls.
+    """
+
+    def __init__(self, infer_batch, batch_window_ms=BATCH_WINDOW_MS, max_batch_size=MAX_BATCH_SIZE):
+        self.infer_batch = infer_batch
+        self.batch_window = batch_window_ms / 1000.0
+        self.max_batch_size = max(1, int(max_batch_size))
+        self._queue = queue.Queue()
+        self._stopped = threading.Event()
+        self._batches = 0
+        self._frames = 0
+        self._thread = threading.Thread(target=self._run, name="inference-scheduler", daemon=True)
+        self._thread.start()
+
+    def submit(self, frame, imgsz=None):
+        """Queues a frame for inference. Returns a Future resolving to its result."""
+        if self._stopped.is_set():
+            raise RuntimeError("Inference scheduler is stopped")
+        future = Future()
+        self._queue.put((frame, imgsz, future))
+        return future
+
+    def infer(self, frame, imgsz=None, timeout=None):
+        """Blocking single-frame inference through the batcher."""
+        return self.submit(frame, imgsz).result(timeout)
+
+    def stats(self):
+        batches = self._batches
+        return {
+            "batches": batches,
+            "frames": self._frames,
+            "mean_batch_size": (self._frames / batches) if batches else 0.0,
+            "queued": self._queue.qsize()
+        }
+
+    def stop(self):
+        self._stopped.set()
+        self._queue.put(None)
+        self._thread.join()
+
+    def _collect_batch(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Stop requested: finish this batch, then exit
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            batch = self._collect_batch(item)
+
+            # One model call per input size present in the batch
+            groups = {}
+            for entry in batch:
+                groups.setdefault(entry[1], []).append(entry)
+            for imgsz, group in groups.items():
+                self._run_group(imgsz, group)
+
+        # Fail anything still queued so no caller waits forever
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item[2].set_exception(RuntimeError("Inference scheduler is stopped"))
+
+    def _run_group(self, imgsz, group):
+        frames = [frame for frame, _, _ in group]
+        try:
+            results = list(self.infer_batch(frames, imgsz))
+        except Exception as e:
+            print(f"❌ Batched inference error: {e}")
+            for _, _, future in group:
+                future.set_exception(e)
+            return
+
+        self._batches += 1
+        self._frames += len(group)
+        for i, (_, _, future) in enumerate(group):
+            future.set_result(results[i] if i < len(results) else None)
@@ -0,0 +1,311 @@
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from pose_result import NUM_KEYPOINTS, PoseResult, result_arrays
+
+MAX_FRAME_SHAPE = (720, 1280)  # Default largest (height, width) a shared-memory slot can hold
+MAX_PERSONS = 16  # Most detections returned per frame
+WORKER_BATCH_SIZE = 4  # Most queued frames a worker runs in one batched call
+INFERENCE_TIMEOUT = 10.0  # Seconds to wait for a worker before giving up on a frame
+
+KEYPOINTS_FLOATS = MAX_PERSONS * NUM_KEYPOINTS * 3
+BOXES_FLOATS = MAX_PERSONS * 6
+
+
+def _frame_view(buf, slot, frame_bytes, height, width):
+    return np.ndarray((height, width, 3), np.uint8, buffer=buf, offset=slot * frame_bytes)
+
+
+def _output_views(buf, slot):
+    offset = slot * (KEYPOINTS_FLOATS + BOXES_FLOATS) * 4
+    keypoints = np.ndarray((MAX_PERSONS, NUM_KEYPOINTS, 3), np.float32, buffer=buf, offset=offset)
+    boxes = np.ndarray((MAX_PERSONS, 6), np.float32, buffer=buf, offset=offset + KEYPOINTS_FLOATS * 4)
+    return keypoints, boxes
+
+
+def _worker_main(config, frames_name, outputs_name, tasks, results, preloaded_model=None):
+    """
+    Worker process: loads the model once (or reuses the one inherited from a
+    forked parent), warms it up, then serves frames from the shared-memory ring.
+    """
+    # Pin intra-op threads before the runtime is imported so workers don't oversubscribe the box
+    threads = config["threads"]
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+
+    from gym_posture_correction_yolo import load_model, warmup
+
+    if preloaded_model is not None:
+        # Weights are shared copy-on-write with the parent; only the thread pool is per process
+        import torch
+        torch.set_num_threads(threads)
+        model = preloaded_model
+    else:
+        model = load_model(config["engine"], threads, config["model_path"], config["onnx_provider"])
+    warmup(config["warmup_sizes"], pose_model=model)
+
+    frame_bytes = config["frame_bytes"]
+    max_batch = config["max_batch"]
+    frames_shm = shared_memory.SharedMemory(name=frames_name)
+    outputs_shm = shared_memory.SharedMemory(name=outputs_name)
+    results.put(("ready", os.getpid()))
+
+    stopping = False
+    while not stopping:
+        task = tasks.get()
+        if task is None:
+            break
+
+        # Pick up whatever else is already queued, up to max_batch frames
+        batch = [task]
+        while len(batch) < max_batch:
+            try:
+                task = tasks.get_nowait()
+            except queue.Empty:
+                break
+            if task is None:
+                stopping = True
+                break
+            batch.append(task)
+        # Tell the parent which worker holds these frames, so it knows whose death loses them
+        results.put(("took", os.getpid(), [task[0] for task in batch]))
+
+        # One model call per input size present in the batch
+        groups = {}
+        for task in batch:
+            groups.setdefault(task[4], []).append(task)
+
+        for imgsz, group in groups.items():
+            frames = [_frame_view(frames_shm.buf, slot, frame_bytes, h, w) for _, slot, h, w, _ in group]
+            try:
+                if imgsz:
+                    predictions = model(frames, verbose=False, conf=0.5, imgsz=imgsz)
+                else:
+                    predictions = model(frames, verbose=False, conf=0.5)
+            except Exception as e:
+                for req_id, slot, _, _, _ in group:
+                    results.put((req_id, slot, 0, str(e)))
+                continue
+
+            for (req_id, slot, _, _, _), prediction in zip(group, predictions):
+                keypoints, boxes = result_arrays(prediction)
+                count = min(len(keypoints), MAX_PERSONS)
+                out_keypoints, out_boxes = _output_views(outputs_shm.buf, slot)
+                out_keypoints[:count] = keypoints[:count]
+                out_boxes[:count] = boxes[:count, :6]
+                results.put((req_id, slot, count, None))
+
+    # Drop every view into shared memory before closing it
+    frames = predictions = out_keypoints = out_boxes = None
+    frames_shm.close()
+    outputs_shm.close()
+
+
+class InferenceWorkerPool:
+    """
+    Pool of worker processes that each hold their own YOLO model, so
+    inference isn't bound by the GIL of the Socket.IO process.
+
+    With preloaded_model (an already loaded ultralytics model) and the
+    "fork" start method, workers inherit the parent's weights copy-on-write
+    instead of each loading them. The parent must not have run inference
+    yet, since the runtime's thread pools don't survive a fork.
+
+    Decoded frames are copied once into a shared-memory ring of slots and
+    only (request id, slot, height, width, imgsz) goes through the task queue;
+    workers write keypoints and boxes back into a second shared-memory
+    block. Nothing image-sized is ever pickled. Frames larger than
+    max_frame_shape don't fit a slot (see fits()).
+
+    Workers report which requests they took off the queue. A request that
+    times out gives its slot back right away only if the worker that took
+    it has died, since no result will come; otherwise the late result
+    returns it as usual.
+    """
+
+    def __init__(self, num_workers=2, model_path=None, threads_per_worker=None,
+                 max_frame_shape=MAX_FRAME_SHAPE, slots=None, max_batch_size=WORKER_BATCH_SIZE,
+                 start_method="spawn", engine="ultralytics", onnx_provider="cpu",
+                 warmup_sizes=None, preloaded_model=None):
+        """
+        engine is "ultralytics" or "onnx"; model_path defaults to the .pt or
+        .onnx weights for it, and onnx_provider picks the ONNX Runtime
+        execution provider ("cpu" or "openvino"). Each worker warms up at
+        warmup_sizes before reporting ready.
+        """
+        if preloaded_model is not None and start_method != "fork":
+            raise ValueError("preloaded_model requires the fork start method")
+        self.num_workers = max(1, int(num_workers))
+        if threads_per_worker is None:
+            threads_per_worker = max(1, (os.cpu_count() or 1) // self.num_workers)
+        self.threads_per_worker = threads_per_worker
+        self.frame_bytes = max_frame_shape[0] * max_frame_shape[1] * 3
+        self.slots = slots or self.num_workers * max_batch_size * 2
+
+        self._frames = shared_memory.SharedMemory(create=True, size=self.slots * self.frame_bytes)
+        self._outputs = shared_memory.SharedMemory(
+            create=True, size=self.slots * (KEYPOINTS_FLOATS + BOXES_FLOATS) * 4)
+        self._free_slots = queue.Queue()
+        for slot in range(self.slots):
+            self._free_slots.put(slot)
+
+        self._pending = {}
+        self._owners = {}  # Request id -> pid of the worker that took it
+        self._recycled = set()  # Timed-out requests whose slot was already given back
+        self.recycled_slots = 0
+        self._pending_lock = threading.Lock()
+        self._ids = itertools.count()
+
+        ctx = mp.get_context(start_method)
+        self._tasks = ctx.Queue()
+        self._results = ctx.Queue()
+        self._processes = []
+        config = {
+            "engine": engine,
+            "model_path": model_path,
+            "onnx_provider": onnx_provider,
+            "threads": self.threads_per_worker,
+            "warmup_sizes": warmup_sizes,
+            "frame_bytes": self.frame_bytes,
+            "max_batch": max_batch_size
+        }
+        for _ in range(self.num_workers):
+            process = ctx.Process(target=_worker_main, daemon=True, args=(
+                config, self._frames.name, self._outputs.name, self._tasks, self._results, preloaded_model))
+            process.start()
+            self._processes.append(process)
+
+        self._by_pid = {process.pid: process for process in self._processes}
+        self._ready = 0
+        self._collector = threading.Thread(target=self._collect, name="inference-workers", daemon=True)
+        self._collector.start()
+        print(f"⚙️ Started {self.num_workers} inference worker(s), {self.threads_per_worker} thread(s) each")
+
+    @property
+    def ready(self):
+        """True once every worker has loaded and warmed up its model."""
+        return self._ready >= self.num_workers
+
+    def wait_ready(self, timeout=None):
+        """Blocks until every worker is ready. Returns False on timeout or if a worker died."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.ready:
+            if not all(process.is_alive() for process in self._processes):
+                return False
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.1)
+        return True
+
+    def fits(self, frame):
+        """True if frame (H, W, 3) fits a shared-memory slot."""
+        return frame.ndim == 3 and frame.shape[2] == 3 and frame.size <= self.frame_bytes
+
+    def submit(self, frame, imgsz=None):
+        """Copies frame into a free shared-memory slot and queues it. Returns a Future."""
+        return self._submit(frame, imgsz)[1]
+
+    def infer(self, frame, imgsz=None, timeout=INFERENCE_TIMEOUT):
+        """Blocking single-frame inference on the pool. Returns a PoseResult."""
+        req_id, future = self._submit(frame, imgsz)
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            self._abandon(req_id)
+            raise
+
+    def _submit(self, frame, imgsz):
+        if not self.fits(frame):
+            raise ValueError(f"Frame of shape {frame.shape} does not fit a worker slot")
+
+        height, width = frame.shape[:2]
+        slot = self._free_slots.get()  # Blocks while every slot is in use
+        _frame_view(self._frames.buf, slot, self.frame_bytes, height, width)[:] = frame
+
+        req_id = next(self._ids)
+        future = Future()
+        with self._pending_lock:
+            self._pending[req_id] = (future, frame, slot)
+        self._tasks.put((req_id, slot, height, width, imgsz))
+        return req_id, future
+
+    def _abandon(self, req_id):
+        with self._pending_lock:
+            owner = self._by_pid.get(self._owners.get(req_id))
+            if owner is None or owner.is_alive():
+                return  # Still queued or being worked on; its result frees the slot
+            entry = self._pending.pop(req_id, None)
+            self._owners.pop(req_id, None)
+            if entry is None:
+                return  # The result arrived meanwhile
+            self._recycled.add(req_id)
+            self.recycled_slots += 1
+        self._free_slots.put(entry[2])
+        print(f"⚠️ Inference worker died, recycled the slot of request {req_id}")
+
+    def stats(self):
+        with self._pending_lock:
+            in_flight = len(self._pending)
+        return {
+            "workers": self.num_workers,
+            "alive": sum(process.is_alive() for process in self._processes),
+            "ready": self.ready,
+            "in_flight": in_flight,
+            "recycled_slots": self.recycled_slots
+        }
+
+    def close(self):
+        for _ in self._processes:
+            self._tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+        # A worker killed mid-put can leave a queue lock held forever, so never wait on the queues here
+        self._tasks.cancel_join_thread()
+        self._results.cancel_join_thread()
+        self._results.put(None)
+        self._collector.join(timeout=5)
+        self._frames.close()
+        self._frames.unlink()
+        self._outputs.close()
+        self._outputs.unlink()
+
+    def _collect(self):
+        while True:
+            message = self._results.get()
+            if message is None:
+                break
+            if message[0] == "ready":
+                self._ready += 1
+                continue
+            if message[0] == "took":
+                with self._pending_lock:
+                    for req_id in message[2]:
+                        if req_id in self._pending:
+                            self._owners[req_id] = message[1]
+                continue
+
+            req_id, slot, count, error = message
+            with self._pending_lock:
+                self._owners.pop(req_id, None)
+                if req_id in self._recycled:
+                    self._recycled.discard(req_id)
+                    continue  # Late result of a request whose slot was already given back
+                future, frame, _ = self._pending.pop(req_id, (None, None, None))
+            keypoints, boxes = _output_views(self._outputs.buf, slot)
+            # Copy the (small) outputs out before the slot is reused
+            keypoints, boxes = keypoints[:count].copy(), boxes[:count].copy()
+            self._free_slots.put(slot)
+            if future is None:
+                continue
+            if error:
+                future.set_exception(RuntimeError(error))
+            else:
+                future.set_result(PoseResult(keypoints, boxes, frame))
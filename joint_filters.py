@@ -0,0 +1,92 @@
+import time
+
+import numpy as np
+
+FILTER_MODES = ("mean", "ema", "one_euro")
+DEFAULT_FILTER_MODE = "mean"
+FILTER_WINDOW = 5  # Running-mean window in frames
+EMA_ALPHA = 0.5  # Weight of the newest sample in EMA mode
+ONE_EURO_MIN_CUTOFF = 1.0  # Hz; lower = smoother when the joint is still
+ONE_EURO_BETA = 0.05  # Cutoff increase per degree/second of speed; higher = less lag when moving
+ONE_EURO_D_CUTOFF = 1.0  # Hz; cutoff used to smooth the speed estimate
+
+
+def _one_euro_alpha(cutoff, dt):
+    """Smoothing factor of a first-order low-pass at cutoff Hz (scalar or array)."""
+    return 1.0 / (1.0 + 1.0 / (2 * np.pi * cutoff * dt))
+
+
+class JointFilterBank:
+    """
+    Smooths a fixed set of channels (e.g. every joint angle of one session)
+    with one O(1) update per frame, done on all channels at once. State
+    lives in a few small NumPy arrays, so cost does not grow with history.
+
+    Modes: "mean" (running mean over the last window samples, kept as a ring
+    and a running sum), "ema" (exponential moving average) and "one_euro"
+    (One-Euro filter: smooth when still, low lag when moving). NaN inputs
+    mark missing channels; they keep their last output and are not updated.
+    """
+
+    def __init__(self, channels, mode=DEFAULT_FILTER_MODE, window=FILTER_WINDOW, alpha=EMA_ALPHA,
+                 min_cutoff=ONE_EURO_MIN_CUTOFF, beta=ONE_EURO_BETA, d_cutoff=ONE_EURO_D_CUTOFF):
+        if mode not in FILTER_MODES:
+            raise ValueError(f"Unknown filter mode: {mode} (expected one of {FILTER_MODES})")
+        self.channels = channels
+        self.mode = mode
+        self.window = max(1, int(window))
+        self.alpha = alpha
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        self._value = np.full(self.channels, np.nan)  # Last output per channel
+        self._seen = np.zeros(self.channels, bool)
+        if self.mode == "mean":
+            self._ring = np.zeros((self.window, self.channels))
+            self._sum = np.zeros(self.channels)
+            self._count = np.zeros(self.channels, np.int64)
+            self._pos = np.zeros(self.channels, np.int64)
+        elif self.mode == "one_euro":
+            self._raw = np.zeros(self.channels)  # Last raw sample
+            self._speed = np.zeros(self.channels)  # Smoothed derivative, units/second
+            self._last_time = None
+
+    def update(self, values, timestamp=None):
+        """Feeds one sample per channel and returns the filtered values (a new array)."""
+        values = np.asarray(values, dtype=np.float64)
+        valid = np.isfinite(values)
+        first = valid & ~self._seen
+
+        if self.mode == "mean":
+            idx = np.flatnonzero(valid)
+            pos = self._pos[idx]
+            self._sum[idx] += values[idx] - self._ring[pos, idx]
+            self._ring[pos, idx] = values[idx]
+            self._pos[idx] = (pos + 1) % self.window
+            self._count[idx] = np.minimum(self._count[idx] + 1, self.window)
+            self._value[idx] = self._sum[idx] / self._count[idx]
+
+        elif self.mode == "ema":
+            update = valid & self._seen
+            self._value[update] += self.alpha * (values[update] - self._value[update])
+            self._value[first] = values[first]
+
+        else:
+            now = time.monotonic() if timestamp is None else timestamp
+            dt = (now - self._last_time) if self._last_time is not None else 0.0
+            self._last_time = now
+            update = valid & self._seen
+            if dt > 0 and update.any():
+                speed = (values[update] - self._raw[update]) / dt
+                self._speed[update] += _one_euro_alpha(self.d_cutoff, dt) * (speed - self._speed[update])
+                cutoff = self.min_cutoff + self.beta * np.abs(self._speed[update])
+                self._value[update] += _one_euro_alpha(cutoff, dt) * (values[update] - self._value[update])
+            self._raw[valid] = values[valid]
+            self._value[first] = values[first]
+            self._speed[first] = 0.0
+
+        self._seen |= valid
+        return self._value.copy()
@@ -0,0 +1,92 @@
+import threading
+
+import cv2
+import numpy as np
+
+from pose_result import NUM_KEYPOINTS, PoseResult, result_arrays
+
+MOTION_THUMBNAIL_SIZE = (64, 48)  # (width, height) frames are shrunk to before comparing
+MOTION_THRESHOLD = 2.0  # Mean absolute grey-level difference below which a frame counts as static
+MAX_CACHE_HITS = 30  # Consecutive cached answers before a fresh inference is forced
+
+
+def motion_thumbnail(frame, size=MOTION_THUMBNAIL_SIZE):
+    """Small greyscale copy of a BGR frame; area averaging also smooths sensor noise."""
+    small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(np.int16)
+
+
+class MotionGate:
+    """
+    Per-client change detector in front of inference. Each frame is compared
+    with the frame the cached result was inferred on (not the previous frame,
+    so slow drift still adds up); below threshold the cached keypoints are
+    reused and the model is not run. Rep metrics and state are recomputed from
+    the reused keypoints, which leaves them unchanged for a static scene.
+    """
+
+    def __init__(self, threshold=MOTION_THRESHOLD, max_hits=MAX_CACHE_HITS):
+        self.threshold = threshold
+        self.max_hits = max_hits
+        self._lock = threading.Lock()
+        self._reference = None
+        self._cached = None  # (keypoints, boxes) of the reference frame
+        self._hits_in_row = 0
+        self.hits = 0
+        self.misses = 0
+        self.last_motion = 0.0
+
+    def lookup(self, frame):
+        """Returns (cached PoseResult or None, thumbnail to store on a miss)."""
+        thumbnail = motion_thumbnail(frame)
+        with self._lock:
+            if self._reference is None or self._reference.shape != thumbnail.shape:
+                self.misses += 1
+                return None, thumbnail
+
+            self.last_motion = float(np.abs(thumbnail - self._reference).mean())
+            if self.last_motion >= self.threshold or self._hits_in_row >= self.max_hits:
+                self.misses += 1
+                return None, thumbnail
+
+            self._hits_in_row += 1
+            self.hits += 1
+            keypoints, boxes = self._cached
+        return PoseResult(keypoints, boxes, frame), thumbnail
+
+    def store(self, thumbnail, result):
+        """Caches the result inferred on the frame the thumbnail was taken from."""
+        if result is None:
+            # An empty scene is worth caching too
+            arrays = (np.zeros((0, NUM_KEYPOINTS, 3), np.float32), np.zeros((0, 6), np.float32))
+        else:
+            keypoints, boxes = result_arrays(result)
+            arrays = (keypoints.copy(), boxes.copy())
+        with self._lock:
+            self._reference, self._cached = thumbnail, arrays
+            self._hits_in_row = 0
+
+    def reset(self):
+        with self._lock:
+            self._reference = self._cached = None
+            self._hits_in_row = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+            "threshold": self.threshold,
+            "last_motion": round(self.last_motion, 3)
+        }
+
+
+def gated_inference(gate, frame, infer):
+    """Returns the gate's cached result for a static frame, otherwise runs infer(frame) and caches it."""
+    cached, thumbnail = gate.lookup(frame)
+    if cached is not None:
+        return cached
+    result = infer(frame)
+    gate.store(thumbnail, result)
+    return result
@@ -0,0 +1,174 @@
+import argparse
+import os
+
+import cv2
+import numpy as np
+
+from pose_result import KEYPOINT_CONF_THRESHOLD, NUM_KEYPOINTS, PoseResult
+
+try:
+    import onnxruntime as ort
+except ImportError:  # onnxruntime is optional, only needed for the "onnx" engine
+    ort = None
+
+MODEL_PATH = "yolov8n-pose.pt"
+ONNX_MODEL_PATH = "yolov8n-pose.onnx"
+INPUT_SIZE = 640  # Default square network input (other sizes need a dynamic=True export)
+IOU_THRESHOLD = 0.7  # NMS overlap threshold (ultralytics default)
+MAX_DETECTIONS = 300
+PAD_VALUE = 114  # Letterbox border color, same as ultralytics
+
+PROVIDERS = {
+    "cpu": ["CPUExecutionProvider"],
+    "openvino": ["OpenVINOExecutionProvider", "CPUExecutionProvider"]
+}
+
+
+def export_onnx(model_path=MODEL_PATH, imgsz=INPUT_SIZE, int8=False):
+    """
+    Exports the YOLO pose weights to ONNX (dynamic batch) and optionally writes
+    an INT8 dynamically quantized copy next to it. Returns the path to use.
+    """
+    from ultralytics import YOLO
+
+    onnx_path = YOLO(model_path).export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+    print(f"✅ Exported {onnx_path}")
+    if not int8:
+        return onnx_path
+
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    int8_path = os.path.splitext(onnx_path)[0] + "-int8.onnx"
+    quantize_dynamic(onnx_path, int8_path, weight_type=QuantType.QUInt8)
+    print(f"✅ Quantized {int8_path}")
+    return int8_path
+
+
+def letterbox(frame, size=INPUT_SIZE):
+    """Resizes frame to fit size x size keeping aspect ratio and pads the rest. Returns (image, ratio, (pad_x, pad_y))."""
+    height, width = frame.shape[:2]
+    ratio = min(size / height, size / width)
+    new_width, new_height = int(round(width * ratio)), int(round(height * ratio))
+    pad_x, pad_y = (size - new_width) / 2, (size - new_height) / 2
+
+    if (new_width, new_height) != (width, height):
+        frame = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+    left, right = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+    image = cv2.copyMakeBorder(frame, top, bottom, left, right, cv2.BORDER_CONSTANT,
+                               value=(PAD_VALUE, PAD_VALUE, PAD_VALUE))
+    return image, ratio, (left, top)
+
+
+def nms(boxes, scores, iou_threshold=IOU_THRESHOLD):
+    """Greedy non-maximum suppression on (N, 4) xyxy boxes. Returns kept indices, best first."""
+    x1, y1, x2, y2 = boxes.T
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = w * h
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+
+def decode_predictions(prediction, ratio, pad, frame_shape, conf=0.5, iou=IOU_THRESHOLD):
+    """
+    Decodes one image's raw YOLOv8-pose output (56, anchors): cx, cy, w, h,
+    score, then x, y, confidence for each of the 17 keypoints. Returns
+    (keypoints (N, 17, 3), boxes (N, 6)) in original frame pixels. Like
+    ultralytics, keypoints below KEYPOINT_CONF_THRESHOLD are zeroed (x, y of
+    0 means "missing" to the rest of the code).
+    """
+    prediction = prediction.T  # (anchors, 56)
+    prediction = prediction[prediction[:, 4] > conf]
+    if not len(prediction):
+        return np.zeros((0, NUM_KEYPOINTS, 3), np.float32), np.zeros((0, 6), np.float32)
+
+    cx, cy, w, h = prediction[:, 0], prediction[:, 1], prediction[:, 2], prediction[:, 3]
+    boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+    scores = prediction[:, 4]
+    keep = nms(boxes, scores, iou)[:MAX_DETECTIONS]
+
+    boxes, scores = boxes[keep], scores[keep]
+    keypoints = prediction[keep, 5:].reshape(-1, NUM_KEYPOINTS, 3).copy()
+
+    # Undo the letterbox: remove padding, scale back and clip to the frame
+    height, width = frame_shape[:2]
+    boxes[:, [0, 2]] = ((boxes[:, [0, 2]] - pad[0]) / ratio).clip(0, width)
+    boxes[:, [1, 3]] = ((boxes[:, [1, 3]] - pad[1]) / ratio).clip(0, height)
+    keypoints[..., 0] = ((keypoints[..., 0] - pad[0]) / ratio).clip(0, width)
+    keypoints[..., 1] = ((keypoints[..., 1] - pad[1]) / ratio).clip(0, height)
+    keypoints[keypoints[..., 2] < KEYPOINT_CONF_THRESHOLD, :2] = 0
+
+    detections = np.concatenate([boxes, scores[:, None], np.zeros((len(boxes), 1))], axis=1)
+    return keypoints.astype(np.float32), detections.astype(np.float32)
+
+
+class OnnxPoseEngine:
+    """
+    YOLOv8-pose on ONNX Runtime (CPU or OpenVINO execution provider), with
+    letterbox, NMS and keypoint decoding in NumPy. Called like an ultralytics
+    YOLO model: engine(frames, conf=0.5) returns one PoseResult per frame.
+    """
+
+    def __init__(self, onnx_path=ONNX_MODEL_PATH, provider="cpu", imgsz=INPUT_SIZE, threads=None):
+        if ort is None:
+            raise ImportError("onnxruntime is required for the ONNX engine (pip install onnxruntime)")
+        if provider not in PROVIDERS:
+            raise ValueError(f"Unknown provider: {provider} (expected one of {list(PROVIDERS)})")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        available = ort.get_available_providers()
+        providers = [p for p in PROVIDERS[provider] if p in available]
+
+        self.imgsz = imgsz
+        self.session = ort.InferenceSession(onnx_path, options, providers=providers)
+        self.input_name = self.session.get_inputs()[0].name
+        # A fixed batch dimension means the model was exported without dynamic=True
+        batch_dim = self.session.get_inputs()[0].shape[0]
+        self.max_batch = batch_dim if isinstance(batch_dim, int) else None
+        print(f"✅ ONNX pose model loaded ({', '.join(self.session.get_providers())})")
+
+    def __call__(self, frames, verbose=False, conf=0.5, iou=IOU_THRESHOLD, imgsz=None):
+        # imgsz other than the export size needs a model exported with dynamic=True
+        if isinstance(frames, np.ndarray):
+            frames = [frames]
+
+        inputs, transforms = [], []
+        for frame in frames:
+            image, ratio, pad = letterbox(frame, imgsz or self.imgsz)
+            inputs.append(image)
+            transforms.append((ratio, pad))
+        # BGR HWC uint8 -> RGB CHW float in [0, 1]
+        batch = np.ascontiguousarray(np.stack(inputs)[..., ::-1].transpose(0, 3, 1, 2), dtype=np.float32)
+        batch /= 255.0
+
+        step = self.max_batch or len(batch)
+        outputs = [self.session.run(None, {self.input_name: batch[i:i + step]})[0]
+                   for i in range(0, len(batch), step)]
+        outputs = np.concatenate(outputs)
+
+        results = []
+        for frame, prediction, (ratio, pad) in zip(frames, outputs, transforms):
+            keypoints, boxes = decode_predictions(prediction, ratio, pad, frame.shape, conf, iou)
+            results.append(PoseResult(keypoints, boxes, frame))
+        return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the YOLOv8 pose model to ONNX")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--imgsz", type=int, default=INPUT_SIZE)
+    parser.add_argument("--int8", action="store_true", help="Also write an INT8 dynamically quantized model")
+    args = parser.parse_args()
+    export_onnx(args.model, args.imgsz, args.int8)
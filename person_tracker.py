@@ -0,0 +1,150 @@
+import numpy as np
+
+from pose_result import KEYPOINT_CONF_THRESHOLD, NUM_KEYPOINTS
+
+TRACK_IOU_THRESHOLD = 0.3  # Least box overlap for a detection to continue a track
+TRACK_KEYPOINT_DISTANCE = 0.5  # ...or most mean keypoint distance, in units of the track's box size
+TRACK_MAX_MISSES = 15  # Frames a track survives without a matching detection
+
+
+class Track:
+    """One tracked person: last box and keypoints, and their own rep state machine."""
+
+    __slots__ = ("id", "box", "keypoints", "state", "misses", "hits")
+
+    def __init__(self, track_id, box, keypoints, state):
+        self.id = track_id
+        self.box = box
+        self.keypoints = keypoints
+        self.state = state
+        self.misses = 0
+        self.hits = 1
+
+    @property
+    def area(self):
+        return max(0.0, float(self.box[2] - self.box[0])) * max(0.0, float(self.box[3] - self.box[1]))
+
+
+def keypoint_boxes(keypoints):
+    """(N, 4) boxes around each person's visible keypoints (zeros when none are visible)."""
+    keypoints = np.asarray(keypoints, dtype=np.float32)
+    boxes = np.zeros((len(keypoints), 4), np.float32)
+    for i, person in enumerate(keypoints):
+        visible = person[person[:, 2] >= KEYPOINT_CONF_THRESHOLD, :2]
+        if len(visible):
+            boxes[i, :2] = visible.min(axis=0)
+            boxes[i, 2:] = visible.max(axis=0)
+    return boxes
+
+
+def box_iou(a, b):
+    """Pairwise IoU of (T, 4) and (N, 4) x1, y1, x2, y2 boxes, as a (T, N) matrix."""
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(np.clip(a[:, 2:] - a[:, :2], 0, None), axis=1)
+    area_b = np.prod(np.clip(b[:, 2:] - b[:, :2], 0, None), axis=1)
+    union = area_a[:, None] + area_b[None, :] - intersection
+    return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+
+def keypoint_distance(a, b, scale):
+    """
+    Mean distance between the keypoints visible in both of (T, 17, 3) and
+    (N, 17, 3), divided by each track's scale (T,). inf where none are shared.
+    """
+    shared = (a[:, None, :, 2] >= KEYPOINT_CONF_THRESHOLD) & (b[None, :, :, 2] >= KEYPOINT_CONF_THRESHOLD)
+    distance = np.linalg.norm(a[:, None, :, :2] - b[None, :, :, :2], axis=3)
+    count = shared.sum(axis=2)
+    total = np.where(shared, distance, 0).sum(axis=2)
+    mean = np.divide(total, count, out=np.full(count.shape, np.inf), where=count > 0)
+    return mean / np.maximum(scale, 1.0)[:, None]
+
+
+class PersonTracker:
+    """
+    Gives every person in the frame a stable track id across frames, so
+    each athlete in a wide shot keeps their own rep state machine.
+
+    Detections are matched to live tracks greedily by cost (1 - IoU plus the
+    normalized keypoint distance), allowing a match when the boxes overlap
+    enough or the skeletons are close enough. That is O(T * N) cost terms
+    and a sort per frame. Unmatched detections start new tracks; tracks
+    unmatched for more than max_misses frames are dropped.
+    """
+
+    def __init__(self, state_factory, iou_threshold=TRACK_IOU_THRESHOLD,
+                 keypoint_distance=TRACK_KEYPOINT_DISTANCE, max_misses=TRACK_MAX_MISSES):
+        self.state_factory = state_factory
+        self.iou_threshold = iou_threshold
+        self.keypoint_distance = keypoint_distance
+        self.max_misses = max_misses
+        self.reset()
+
+    def reset(self):
+        self.tracks = []
+        self._next_id = 1
+
+    def __len__(self):
+        return len(self.tracks)
+
+    def update(self, keypoints, boxes=None):
+        """
+        Matches this frame's people ((N, 17, 3) keypoints, optional (N, >=4)
+        boxes) to tracks. Returns a list of (track, detection index), one per
+        detection, in detection order.
+        """
+        keypoints = np.asarray(keypoints, dtype=np.float32).reshape(-1, NUM_KEYPOINTS, 3)
+        fallback = keypoint_boxes(keypoints)
+        if boxes is None or len(boxes) != len(keypoints):
+            boxes = fallback
+        else:
+            boxes = np.asarray(boxes, dtype=np.float32)[:, :4].copy()
+            # Predicted or box-less results carry empty boxes
+            empty = (boxes[:, 2] <= boxes[:, 0]) | (boxes[:, 3] <= boxes[:, 1])
+            boxes[empty] = fallback[empty]
+
+        assigned = [None] * len(keypoints)
+        matched_tracks = set()
+        if self.tracks and len(keypoints):
+            track_boxes = np.array([track.box for track in self.tracks], np.float32)
+            track_keypoints = np.array([track.keypoints for track in self.tracks], np.float32)
+            scale = np.sqrt(np.prod(np.clip(track_boxes[:, 2:] - track_boxes[:, :2], 0, None), axis=1))
+            iou = box_iou(track_boxes, boxes)
+            distance = keypoint_distance(track_keypoints, keypoints, scale)
+            allowed = (iou >= self.iou_threshold) | (distance <= self.keypoint_distance)
+            cost = (1 - iou) + np.minimum(distance, 10.0)
+
+            most_matches = min(cost.shape)
+            for flat in np.argsort(cost, axis=None):
+                if len(matched_tracks) == most_matches:
+                    break
+                t, d = np.unravel_index(flat, cost.shape)
+                if not allowed[t, d]:
+                    continue
+                if t in matched_tracks or assigned[d] is not None:
+                    continue
+                track = self.tracks[t]
+                track.box, track.keypoints = boxes[d], keypoints[d]
+                track.misses = 0
+                track.hits += 1
+                assigned[d] = track
+                matched_tracks.add(t)
+
+        for t, track in enumerate(self.tracks):
+            if t not in matched_tracks:
+                track.misses += 1
+        self.tracks = [track for track in self.tracks if track.misses <= self.max_misses]
+
+        for d in range(len(keypoints)):
+            if assigned[d] is None:
+                track = Track(self._next_id, boxes[d], keypoints[d], self.state_factory())
+                self._next_id += 1
+                self.tracks.append(track)
+                assigned[d] = track
+        return [(track, d) for d, track in enumerate(assigned)]
+
+    def primary(self):
+        """The live track with the largest box (the athlete closest to the camera), or None."""
+        live = [track for track in self.tracks if track.misses == 0]
+        return max(live, key=lambda track: track.area) if live else None
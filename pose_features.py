@@ -0,0 +1,111 @@
+import numpy as np
+
+# Landmark indices of the joints we score, per pose model
+MEDIAPIPE_JOINTS = {
+    "nose": 0,
+    "left_shoulder": 11, "right_shoulder": 12,
+    "left_elbow": 13, "right_elbow": 14,
+    "left_wrist": 15, "right_wrist": 16,
+    "left_hip": 23, "right_hip": 24,
+    "left_knee": 25, "right_knee": 26,
+    "left_ankle": 27, "right_ankle": 28
+}
+COCO_JOINTS = {
+    "nose": 0,
+    "left_shoulder": 5, "right_shoulder": 6,
+    "left_elbow": 7, "right_elbow": 8,
+    "left_wrist": 9, "right_wrist": 10,
+    "left_hip": 11, "right_hip": 12,
+    "left_knee": 13, "right_knee": 14,
+    "left_ankle": 15, "right_ankle": 16
+}
+
+# Joint angles as (end, vertex, end); the angle is measured at the vertex
+ANGLES = {}
+for _side in ("left", "right"):
+    ANGLES.update({
+        f"{_side}_elbow": (f"{_side}_shoulder", f"{_side}_elbow", f"{_side}_wrist"),
+        f"{_side}_shoulder": (f"{_side}_hip", f"{_side}_shoulder", f"{_side}_elbow"),
+        f"{_side}_hip": (f"{_side}_shoulder", f"{_side}_hip", f"{_side}_knee"),  # Back straightness
+        f"{_side}_knee": (f"{_side}_hip", f"{_side}_knee", f"{_side}_ankle")
+    })
+
+# Segment lengths as (joint, joint)
+SEGMENTS = {}
+for _side in ("left", "right"):
+    SEGMENTS.update({
+        f"{_side}_upper_arm": (f"{_side}_shoulder", f"{_side}_elbow"),
+        f"{_side}_forearm": (f"{_side}_elbow", f"{_side}_wrist"),
+        f"{_side}_torso": (f"{_side}_shoulder", f"{_side}_hip"),
+        f"{_side}_thigh": (f"{_side}_hip", f"{_side}_knee"),
+        f"{_side}_shin": (f"{_side}_knee", f"{_side}_ankle")
+    })
+
+
+def mediapipe_points(landmarks):
+    """MediaPipe landmark list -> (33, 4) float32 array of x, y, z, visibility (normalized coordinates)."""
+    return np.array([(lm.x, lm.y, lm.z, lm.visibility) for lm in landmarks], dtype=np.float32)
+
+
+def yolo_points(keypoints_data):
+    """YOLO (..., 17, 3) keypoints (x, y, confidence) -> (..., 17, 4) with z = 0."""
+    keypoints_data = np.asarray(keypoints_data, dtype=np.float32)
+    points = np.zeros(keypoints_data.shape[:-1] + (4,), np.float32)
+    points[..., :2] = keypoints_data[..., :2]
+    points[..., 3] = keypoints_data[..., 2]
+    return points
+
+
+def pixel_coords(points, width, height):
+    """Normalized (..., K, 4) points -> integer pixel (x, y) pairs as nested lists, ready for OpenCV."""
+    return (points[..., :2] * (width, height)).astype(np.int64).tolist()
+
+
+class PoseFeatureKernel:
+    """
+    Computes every configured joint angle and segment length of a pose in
+    one vectorized pass. Points are a (..., K, 4) array of x, y, z,
+    visibility; any leading dimensions (persons, frames) are batched, so one
+    call covers a whole batch. Angles are in degrees, in [0, 180].
+    """
+
+    def __init__(self, joints, angles=ANGLES, segments=SEGMENTS):
+        self.joints = joints
+        self.angle_names = list(angles)
+        self.segment_names = list(segments)
+        self.angle_index = {name: i for i, name in enumerate(self.angle_names)}
+        self.segment_index = {name: i for i, name in enumerate(self.segment_names)}
+        # (A, 3) and (S, 2) landmark index tables, gathered in one fancy-index each
+        self._angle_joints = np.array([[joints[j] for j in angles[name]] for name in self.angle_names], np.intp)
+        self._segment_joints = np.array([[joints[j] for j in segments[name]] for name in self.segment_names],
+                                        np.intp)
+
+    def __call__(self, points):
+        """Returns (angles (..., A), segment lengths (..., S), angle visibility (..., A))."""
+        points = np.asarray(points, dtype=np.float32)
+        xyz = points[..., :3]
+
+        triples = xyz[..., self._angle_joints, :]  # (..., A, 3, 3)
+        ba = triples[..., 0, :] - triples[..., 1, :]
+        bc = triples[..., 2, :] - triples[..., 1, :]
+        cosine = (ba * bc).sum(-1) / (np.linalg.norm(ba, axis=-1) * np.linalg.norm(bc, axis=-1) + 1e-6)
+        angles = np.degrees(np.arccos(np.clip(cosine, -1.0, 1.0)))
+
+        pairs = xyz[..., self._segment_joints, :]  # (..., S, 2, 3)
+        lengths = np.linalg.norm(pairs[..., 0, :] - pairs[..., 1, :], axis=-1)
+
+        # An angle is only as trustworthy as its least visible joint
+        visibility = points[..., 3][..., self._angle_joints].min(-1)
+        return angles, lengths, visibility
+
+    def features(self, points):
+        """Single pose convenience: {"angles": {name: deg}, "segments": {name: length}}."""
+        angles, lengths, _ = self(points)
+        return {
+            "angles": dict(zip(self.angle_names, angles.tolist())),
+            "segments": dict(zip(self.segment_names, lengths.tolist()))
+        }
+
+
+MEDIAPIPE_FEATURES = PoseFeatureKernel(MEDIAPIPE_JOINTS)
+COCO_FEATURES = PoseFeatureKernel(COCO_JOINTS)
@@ -0,0 +1,68 @@
+import cv2
+import numpy as np
+
+# COCO keypoint pairs that make up the skeleton (same topology result.plot() draws)
+SKELETON = [
+    (5, 7), (7, 9), (6, 8), (8, 10), (5, 6), (5, 11), (6, 12), (11, 12),
+    (11, 13), (13, 15), (12, 14), (14, 16), (0, 1), (0, 2), (1, 3), (2, 4), (3, 5), (4, 6)
+]
+NUM_KEYPOINTS = 17
+KEYPOINT_CONF_THRESHOLD = 0.5  # Keypoints below this confidence are not drawn
+
+# Plot colors (BGR, drawn with OpenCV)
+BOX_COLOR = (255, 128, 0)
+LIMB_COLOR = (0, 255, 255)
+JOINT_COLOR = (0, 0, 255)
+
+
+def draw_pose(image, keypoints_data, boxes=None):
+    """Draws person boxes and skeletons onto image in place."""
+    if boxes is not None:
+        for box in boxes:
+            x1, y1, x2, y2 = (int(v) for v in box[:4])
+            cv2.rectangle(image, (x1, y1), (x2, y2), BOX_COLOR, 2)
+
+    for person in keypoints_data:
+        visible = person[:, 2] >= KEYPOINT_CONF_THRESHOLD
+        points = [(int(x), int(y)) for x, y in person[:, :2]]
+        for a, b in SKELETON:
+            if visible[a] and visible[b]:
+                cv2.line(image, points[a], points[b], LIMB_COLOR, 2, cv2.LINE_AA)
+        for i in np.flatnonzero(visible):
+            cv2.circle(image, points[i], 4, JOINT_COLOR, -1, cv2.LINE_AA)
+    return image
+
+
+def result_arrays(result):
+    """Returns (keypoints (N, 17, 3), boxes (N, 6)) from an ultralytics Results or a PoseResult."""
+    if isinstance(result, PoseResult):
+        return result.keypoints, result.boxes
+    if result.keypoints is None or result.keypoints.data is None:
+        return np.zeros((0, NUM_KEYPOINTS, 3), np.float32), np.zeros((0, 6), np.float32)
+    return result.keypoints.data.cpu().numpy(), result.boxes.data.cpu().numpy()
+
+
+class PoseResult:
+    """
+    Model-agnostic pose result made of plain NumPy arrays, for inference
+    backends that don't return ultralytics Results (worker processes,
+    ONNX Runtime). keypoints is (N, 17, 3) as x, y, confidence and boxes is
+    (N, 6) as x1, y1, x2, y2, confidence, class.
+    """
+
+    __slots__ = ("keypoints", "boxes", "orig_img", "predicted")
+
+    def __init__(self, keypoints, boxes=None, orig_img=None, predicted=False):
+        self.keypoints = np.asarray(keypoints, dtype=np.float32).reshape(-1, NUM_KEYPOINTS, 3)
+        if boxes is None:
+            boxes = np.zeros((len(self.keypoints), 6), np.float32)
+        self.boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 6)
+        self.orig_img = orig_img
+        self.predicted = predicted  # True if extrapolated instead of inferred
+
+    def __len__(self):
+        return len(self.keypoints)
+
+    def plot(self):
+        """Returns a copy of the original frame with boxes and skeletons drawn, like Results.plot()."""
+        return draw_pose(self.orig_img.copy(), self.keypoints, self.boxes)
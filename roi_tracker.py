@@ -0,0 +1,115 @@
+import threading
+
+import numpy as np
+
+from pose_result import PoseResult, result_arrays
+
+ROI_PADDING = 0.25  # Fraction of the box width/height added on each side of the crop
+ROI_INPUT_SIZE = 320  # Network input size for crops (full frames use the model default)
+ROI_MIN_CONFIDENCE = 0.5  # Below this box confidence the track is considered lost
+ROI_REACQUIRE_INTERVAL = 30  # Frames between forced full-frame detections
+ROI_MIN_SIZE = 64  # Smallest crop side in pixels
+
+
+class RoiTracker:
+    """
+    Follows one athlete's person box between frames so inference can run
+    on a padded crop at a smaller input size instead of the full frame.
+    Falls back to full-frame detection when the track is lost (no person
+    or low confidence in the crop) and every reacquire_interval frames.
+    """
+
+    def __init__(self, padding=ROI_PADDING, input_size=ROI_INPUT_SIZE,
+                 min_confidence=ROI_MIN_CONFIDENCE, reacquire_interval=ROI_REACQUIRE_INTERVAL):
+        self.padding = padding
+        self.input_size = input_size
+        self.min_confidence = min_confidence
+        self.reacquire_interval = reacquire_interval
+        self._lock = threading.Lock()
+        self._box = None
+        self._frames_since_full = 0
+        self.crop_frames = 0
+        self.full_frames = 0
+
+    def next_roi(self, frame_shape):
+        """Returns the (x1, y1, x2, y2) crop for the next frame, or None for a full-frame pass."""
+        with self._lock:
+            if self._box is None or self._frames_since_full >= self.reacquire_interval:
+                return None
+            box = self._box
+
+        height, width = frame_shape[:2]
+        x1, y1, x2, y2 = box
+        pad_x = max((x2 - x1) * self.padding, (ROI_MIN_SIZE - (x2 - x1)) / 2)
+        pad_y = max((y2 - y1) * self.padding, (ROI_MIN_SIZE - (y2 - y1)) / 2)
+        roi = (int(max(0, x1 - pad_x)), int(max(0, y1 - pad_y)),
+               int(min(width, x2 + pad_x)), int(min(height, y2 + pad_y)))
+        if roi[2] - roi[0] < 2 or roi[3] - roi[1] < 2:
+            return None
+        return roi
+
+    def update(self, boxes, full_frame):
+        """
+        Records this frame's detections (frame coordinates). Returns False if
+        the tracked person was lost, in which case the next frame is full-frame.
+        """
+        with self._lock:
+            if full_frame:
+                self._frames_since_full = 0
+                self.full_frames += 1
+            else:
+                self._frames_since_full += 1
+                self.crop_frames += 1
+
+            # Track the first (most confident) person, the one the rep logic uses
+            if len(boxes) == 0 or boxes[0][4] < self.min_confidence:
+                self._box = None
+                return False
+            self._box = tuple(float(v) for v in boxes[0][:4])
+            return True
+
+    def reset(self):
+        with self._lock:
+            self._box = None
+
+    def stats(self):
+        total = self.crop_frames + self.full_frames
+        return {
+            "crop_frames": self.crop_frames,
+            "full_frames": self.full_frames,
+            "crop_ratio": round(self.crop_frames / total, 3) if total else 0.0
+        }
+
+
+def tracked_inference(tracker, frame, infer):
+    """
+    Runs infer on the tracker's crop of frame when it has a track, mapping the
+    detections back to frame coordinates, and on the full frame otherwise.
+    infer(image, imgsz=None) is any of the backend's inference callables.
+    Returns a result for the full frame (None if nothing was detected).
+    """
+    roi = tracker.next_roi(frame.shape)
+    if roi is not None:
+        x1, y1, x2, y2 = roi
+        crop = np.ascontiguousarray(frame[y1:y2, x1:x2])
+        result = infer(crop, imgsz=tracker.input_size)
+        if result is not None:
+            keypoints, boxes = result_arrays(result)
+            keypoints, boxes = keypoints.copy(), boxes.copy()
+            # Shift crop coordinates back into the full frame; undetected
+            # keypoints stay at (0, 0), which the rep logic treats as missing
+            found = (keypoints[..., 0] > 0) | (keypoints[..., 1] > 0)
+            keypoints[..., 0][found] += x1
+            keypoints[..., 1][found] += y1
+            boxes[:, [0, 2]] += x1
+            boxes[:, [1, 3]] += y1
+            if tracker.update(boxes, full_frame=False):
+                return PoseResult(keypoints, boxes, frame)
+        else:
+            tracker.update(np.zeros((0, 6), np.float32), full_frame=False)
+        # Lost the athlete in the crop: detect again on this frame's full view
+
+    result = infer(frame)
+    boxes = result_arrays(result)[1] if result is not None else np.zeros((0, 6), np.float32)
+    tracker.update(boxes, full_frame=True)
+    return result
@@ -0,0 +1,142 @@
+import threading
+import time
+from bisect import bisect_left
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"  # Prometheus text exposition format
+
+
+def _format_labels(label, value):
+    return f'{{{label}="{value}"}}' if label else ""
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter, optionally split by one label."""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, label=None):
+        self.name = name
+        self.help = help_text
+        self.label = label
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_value=None, amount=1):
+        with self._lock:
+            self._values[label_value] = self._values.get(label_value, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        if not values and self.label is None:
+            values[None] = 0
+        return [(self.name + _format_labels(self.label, key), value) for key, value in values.items()]
+
+
+class Gauge:
+    """Value read at scrape time from fn(), which returns a number or a {label value: number} dict."""
+
+    kind = "gauge"
+
+    def __init__(self, name, help_text, fn, label=None):
+        self.name = name
+        self.help = help_text
+        self.label = label
+        self.fn = fn
+
+    def samples(self):
+        value = self.fn()
+        if isinstance(value, dict):
+            return [(self.name + _format_labels(self.label, key), v) for key, v in value.items()]
+        return [(self.name, value)]
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram, optionally split by one label. observe() is a
+    bisect plus three additions under a lock, so it costs about a microsecond.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, label=None, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label = label
+        self.buckets = tuple(buckets)
+        self._series = {}  # label value -> [per-bucket counts (+Inf last), sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, label_value=None):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def timed(self, fn, label_value=None):
+        """Wraps fn so each call's duration is observed (also when it raises)."""
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.observe(time.perf_counter() - start, label_value)
+        return wrapper
+
+    def samples(self):
+        with self._lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        samples = []
+        for key, (counts, total, count) in series.items():
+            prefix = f'{self.label}="{key}",' if self.label else ""
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                samples.append((f'{self.name}_bucket{{{prefix}le="{le}"}}', cumulative))
+            samples.append((f"{self.name}_sum" + _format_labels(self.label, key), total))
+            samples.append((f"{self.name}_count" + _format_labels(self.label, key), count))
+        return samples
+
+
+class MetricsRegistry:
+    """Holds the process's metrics and renders them in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, help_text, label=None):
+        return self._register(Counter(name, help_text, label))
+
+    def gauge(self, name, help_text, fn, label=None):
+        return self._register(Gauge(name, help_text, fn, label))
+
+    def histogram(self, name, help_text, label=None, buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, help_text, label, buckets))
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            try:
+                samples = metric.samples()
+            except Exception as e:
+                print(f"❌ Metric {metric.name} failed: {e}")
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name} {_format_value(value)}" for name, value in samples)
+        return "\n".join(lines) + "\n"
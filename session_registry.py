@@ -0,0 +1,210 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+
+# Session limits (keep memory bounded no matter how many clients come and go)
+MAX_SESSIONS = 64  # Most sessions kept before disconnected ones are evicted (REPWISE_MAX_SESSIONS)
+SESSION_IDLE_TIMEOUT = 300.0  # Seconds without a frame before a disconnected session is evicted
+SWEEP_INTERVAL = 5.0  # Seconds between idle sweeps
+FPS_SMOOTHING = 0.2  # EMA weight of the newest frame interval in effective_fps
+
+
+class FrameMailbox:
+    """
+    Latest-frame-wins mailbox for one client. At most max_in_flight frames
+    are processed at once; beyond that, newer frames overwrite the single
+    pending one instead of queueing, so feedback never falls behind.
+    """
+
+    def __init__(self, max_in_flight=1):
+        self.max_in_flight = max(1, int(max_in_flight))
+        self._lock = threading.Lock()
+        self._pending = None
+        self._in_flight = 0
+        self._last_done = None
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self.effective_fps = 0.0
+
+    def offer(self, item):
+        """
+        Admits a new frame. Returns item if the caller should start processing
+        it now, or None if it was parked as the pending frame (replacing, and
+        dropping, any stale pending one).
+        """
+        with self._lock:
+            self.received += 1
+            if self._in_flight < self.max_in_flight:
+                self._in_flight += 1
+                return item
+            if self._pending is not None:
+                self.dropped += 1
+            self._pending = item
+            return None
+
+    def take_next(self):
+        """
+        Called when a frame finishes. Returns the pending frame to start next
+        (keeping the slot in flight), or None if there is nothing waiting.
+        """
+        with self._lock:
+            item = self._pending
+            self._pending = None
+            if item is None:
+                self._in_flight -= 1
+            return item
+
+    def mark_processed(self):
+        """Records a finished frame and updates the effective FPS estimate."""
+        now = time.monotonic()
+        with self._lock:
+            self.processed += 1
+            if self._last_done is not None:
+                interval = now - self._last_done
+                if interval > 0:
+                    fps = 1.0 / interval
+                    if self.effective_fps:
+                        fps = FPS_SMOOTHING * fps + (1 - FPS_SMOOTHING) * self.effective_fps
+                    self.effective_fps = fps
+            self._last_done = now
+
+    @property
+    def in_flight(self):
+        """Frames of this client currently being processed."""
+        return self._in_flight
+
+    def stats(self):
+        return {
+            "received_frames": self.received,
+            "processed_frames": self.processed,
+            "dropped_frames": self.dropped,
+            "effective_fps": round(self.effective_fps, 1)
+        }
+
+
+class Session:
+    """Per-connection state: one independent rep state machine per client."""
+
+    __slots__ = ("sid", "exercise_state", "response_mode", "mailbox", "roi_tracker", "rate_controller",
+                 "motion_gate", "person_tracker", "sent_clips", "frame_seq", "infer_lock", "inferred_seq",
+                 "created_at", "last_seen")
+
+    def __init__(self, sid, exercise_state, max_in_flight=1):
+        self.sid = sid
+        self.exercise_state = exercise_state
+        self.response_mode = None  # Set by the client via the 'configure' event
+        self.mailbox = FrameMailbox(max_in_flight)
+        self.roi_tracker = None  # Created by the backend when ROI tracking is on
+        self.rate_controller = None  # Created by the backend when adaptive inference rate is on
+        self.motion_gate = None  # Created by the backend when the motion-gated cache is on
+        self.person_tracker = None  # Created by the backend in multi-person mode
+        self.sent_clips = set()  # Ids of speech clips already pushed to this client
+        self.frame_seq = itertools.count()  # Numbers this client's frames in arrival order
+        self.infer_lock = threading.Lock()  # Serializes the per-session inference state above
+        self.inferred_seq = -1  # Newest frame that went through that state
+        self.created_at = time.monotonic()
+        self.last_seen = self.created_at
+
+    def touch(self):
+        self.last_seen = time.monotonic()
+
+
+class SessionRegistry:
+    """
+    Thread-safe registry of sessions keyed by Socket.IO sid.
+
+    Sessions of connected clients are only dropped by remove() (on
+    disconnect), however long they pause. Sessions whose sid is not
+    connected (e.g. recreated by a frame that raced its disconnect) are
+    evicted once idle for longer than idle_timeout, or least recently used
+    first once there are more than max_sessions sessions.
+    """
+
+    def __init__(self, state_factory, max_sessions=MAX_SESSIONS,
+                 idle_timeout=SESSION_IDLE_TIMEOUT, sweep_interval=SWEEP_INTERVAL, max_in_flight=1):
+        self.state_factory = state_factory
+        self.max_in_flight = max_in_flight  # Frames per client processed concurrently
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.sweep_interval = sweep_interval
+        self._sessions = OrderedDict()
+        self._live = set()  # Sids with an open connection
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+    def connect(self, sid):
+        """Marks sid as connected, so its session is kept until remove(sid)."""
+        with self._lock:
+            self._live.add(sid)
+
+    def get(self, sid):
+        """Returns the session for sid, creating it if needed."""
+        with self._lock:
+            self._maybe_sweep()
+            session = self._sessions.get(sid)
+            if session is None:
+                session = Session(sid, self.state_factory(), self.max_in_flight)
+                self._sessions[sid] = session
+                self._evict_over_limit()
+            else:
+                self._sessions.move_to_end(sid)
+            session.touch()
+            return session
+
+    def find(self, sid):
+        """Returns the session for sid without creating one (None if unknown)."""
+        with self._lock:
+            return self._sessions.get(sid)
+
+    def remove(self, sid):
+        """Drops sid's session and forgets the connection (call on disconnect)."""
+        with self._lock:
+            self._live.discard(sid)
+            return self._sessions.pop(sid, None)
+
+    def sessions(self):
+        """Snapshot of the current sessions."""
+        with self._lock:
+            return list(self._sessions.values())
+
+    def evict_idle(self):
+        """Drops every disconnected session idle for longer than idle_timeout. Returns the count."""
+        with self._lock:
+            return self._evict_idle(time.monotonic())
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def _evict_over_limit(self):
+        over = len(self._sessions) - self.max_sessions
+        if over <= 0:
+            return
+        # Least recently used first, never a connected client's (nor the one just created)
+        evictable = [sid for sid in list(self._sessions)[:-1] if sid not in self._live][:over]
+        for sid in evictable:
+            del self._sessions[sid]
+            print(f"♻️ Evicted least recently used session {sid}")
+
+    def _maybe_sweep(self):
+        now = time.monotonic()
+        if now - self._last_sweep >= self.sweep_interval:
+            self._evict_idle(now)
+
+    def _evict_idle(self, now):
+        self._last_sweep = now
+        cutoff = now - self.idle_timeout
+        # Sessions are kept in LRU order, so idle ones are at the front
+        idle = []
+        for sid, session in self._sessions.items():
+            if session.last_seen >= cutoff:
+                break
+            if sid not in self._live:
+                idle.append(sid)
+        for sid in idle:
+            del self._sessions[sid]
+        if idle:
+            print(f"♻️ Evicted {len(idle)} idle session(s)")
+        return len(idle)
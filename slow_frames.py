@@ -0,0 +1,200 @@
+import base64
+import heapq
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+import numpy as np
+
+SLOW_FRAME_CAPACITY = 32  # Slowest frames kept in the ring
+SLOW_FRAME_MAX_AGE = 600.0  # Seconds before a traced frame falls out of the ring
+PRUNE_INTERVAL = 1.0  # Most often record() scans the ring for expired frames, in seconds
+FRAME_BUDGET_MS = 250.0  # p99 frame latency budget; exceeding it triggers the profiler
+P99_WINDOW = 1000  # Recent frame latencies the p99 is computed over
+P99_CHECK_EVERY = 100  # Frames between p99 checks
+PROFILE_SECONDS = 5.0  # Length of a triggered profile
+MAX_PROFILE_SECONDS = 60.0  # Longest profile /admin/profile may ask for
+PROFILE_INTERVAL = 0.005  # Seconds between stack samples
+PROFILE_COOLDOWN = 300.0  # Seconds after a profile before another may be triggered
+
+
+class StackSampler:
+    """
+    Sampling profiler built on sys._current_frames(): a background thread
+    snapshots every thread's stack at a fixed interval and counts collapsed
+    stacks ("outer;inner;leaf count" lines, the flame graph input format).
+    Costs nothing until started.
+    """
+
+    def __init__(self, output_dir=None, interval=PROFILE_INTERVAL):
+        self.output_dir = output_dir
+        self.interval = interval
+        self.last_profile = None  # {"started", "seconds", "samples", "reason", "stacks", "path"}
+        self._running = threading.Event()
+
+    @property
+    def running(self):
+        return self._running.is_set()
+
+    def start(self, seconds=PROFILE_SECONDS, reason=""):
+        """Profiles for `seconds` on a background thread. Returns False if a profile is already running."""
+        if self._running.is_set():
+            return False
+        self._running.set()
+        threading.Thread(target=self._run, args=(seconds, reason), name="stack-sampler", daemon=True).start()
+        return True
+
+    def _run(self, seconds, reason):
+        own = threading.get_ident()
+        stacks = Counter()
+        samples = 0
+        started = time.time()
+        deadline = time.monotonic() + seconds
+        try:
+            while time.monotonic() < deadline:
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own:
+                        continue
+                    names = []
+                    while frame is not None:
+                        code = frame.f_code
+                        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                        frame = frame.f_back
+                    stacks[";".join(reversed(names))] += 1
+                samples += 1
+                time.sleep(self.interval)
+
+            profile = {
+                "started": started,
+                "seconds": seconds,
+                "samples": samples,
+                "reason": reason,
+                "stacks": "".join(f"{stack} {count}\n" for stack, count in stacks.most_common()),
+                "path": None
+            }
+            if self.output_dir:
+                os.makedirs(self.output_dir, exist_ok=True)
+                path = os.path.join(self.output_dir, f"profile-{int(started)}.collapsed")
+                with open(path, "w") as f:
+                    f.write(profile["stacks"])
+                profile["path"] = path
+            self.last_profile = profile
+            print(f"🔬 Profile done ({samples} samples{', ' + profile['path'] if profile['path'] else ''})")
+        finally:
+            self._running.clear()
+
+
+class SlowFrameTracer:
+    """
+    Keeps the slowest recent frames (a min-heap of at most capacity entries,
+    each dropped after max_age seconds) with their stage breakdown, for
+    postmortems of the outliers that averages hide. Frames faster than the
+    fastest kept one return after one comparison. When a sampler is given,
+    it is started whenever the rolling p99 exceeds budget_ms. clock gives
+    the wall-clock time frames are stamped and aged with.
+    """
+
+    def __init__(self, capacity=SLOW_FRAME_CAPACITY, budget_ms=FRAME_BUDGET_MS, keep_frames=False,
+                 sampler=None, max_age=SLOW_FRAME_MAX_AGE, profile_seconds=PROFILE_SECONDS,
+                 profile_cooldown=PROFILE_COOLDOWN, clock=time.time):
+        self.capacity = capacity
+        self.budget_ms = budget_ms
+        self.keep_frames = keep_frames
+        self.sampler = sampler
+        self.max_age = max_age
+        self.profile_seconds = profile_seconds
+        self.profile_cooldown = profile_cooldown
+        self.clock = clock
+        self.traced = 0
+        self.over_budget = 0
+        self._heap = []  # (total_ms, seq, entry)
+        self._seq = itertools.count()
+        self._recent = deque(maxlen=P99_WINDOW)
+        self._last_profile = None
+        self._last_prune = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, total_ms, stages, client_id, resolution=None, people=None, frame_data=None):
+        """
+        Notes one finished frame. stages maps stage name to milliseconds;
+        resolution is (height, width); frame_data is the raw input (only kept
+        when keep_frames is on).
+        """
+        check_p99 = False
+        now = self.clock()
+        with self._lock:
+            self.traced += 1
+            self._recent.append(total_ms)
+            if total_ms > self.budget_ms:
+                self.over_budget += 1
+            check_p99 = self.sampler is not None and self.traced % P99_CHECK_EVERY == 0
+            if len(self._heap) >= self.capacity:
+                # Expired frames must not hold a newer slow frame out of a full ring
+                if now - self._last_prune >= PRUNE_INTERVAL:
+                    self._prune(now)
+            if len(self._heap) >= self.capacity and total_ms <= self._heap[0][0]:
+                entry = None  # Fast path: not among the slowest
+            else:
+                entry = {
+                    "time": now,
+                    "client": client_id,
+                    "total_ms": round(total_ms, 2),
+                    "stages_ms": {name: round(ms, 2) for name, ms in stages.items()},
+                    "resolution": list(resolution[:2]) if resolution is not None else None,
+                    "people": people
+                }
+                if self.keep_frames and frame_data is not None:
+                    entry["frame"] = frame_data
+                item = (total_ms, next(self._seq), entry)
+                if len(self._heap) >= self.capacity:
+                    heapq.heapreplace(self._heap, item)
+                else:
+                    heapq.heappush(self._heap, item)
+        if check_p99:
+            self._maybe_profile()
+
+    def p99(self):
+        with self._lock:
+            recent = list(self._recent)
+        return float(np.percentile(recent, 99)) if recent else 0.0
+
+    def _maybe_profile(self):
+        p99 = self.p99()
+        now = time.monotonic()
+        if p99 <= self.budget_ms or self.sampler.running:
+            return
+        if self._last_profile is not None and now - self._last_profile < self.profile_cooldown:
+            return
+        self._last_profile = now
+        print(f"🐢 p99 {p99:.0f} ms over the {self.budget_ms:.0f} ms budget, profiling for {self.profile_seconds}s")
+        self.sampler.start(self.profile_seconds, f"p99 {p99:.1f} ms > {self.budget_ms} ms")
+
+    def _prune(self, now):
+        # Caller holds the lock
+        self._last_prune = now
+        cutoff = now - self.max_age
+        if any(item[2]["time"] < cutoff for item in self._heap):
+            self._heap = [item for item in self._heap if item[2]["time"] >= cutoff]
+            heapq.heapify(self._heap)
+
+    def dump(self, include_frames=False, clear=False):
+        """Slowest first. Raw frames (base64 for bytes) are only included when asked for."""
+        with self._lock:
+            self._prune(self.clock())
+            entries = [dict(item[2]) for item in sorted(self._heap, key=lambda item: -item[0])]
+            if clear:
+                self._heap = []
+        for entry in entries:
+            frame = entry.pop("frame", None)
+            if include_frames and frame is not None:
+                entry["frame"] = frame if isinstance(frame, str) else base64.b64encode(bytes(frame)).decode("ascii")
+        return {
+            "budget_ms": self.budget_ms,
+            "p99_ms": round(self.p99(), 2),
+            "traced_frames": self.traced,
+            "over_budget_frames": self.over_budget,
+            "frames": entries
+        }
@@ -0,0 +1,132 @@
+import hashlib
+import queue
+import threading
+from collections import OrderedDict
+
+from speech_worker import SPEECH_RATE, SPEECH_VOLUME, create_engine, render_clip
+
+CLIP_CACHE_SIZE = 256  # Most clips kept
+CLIP_CACHE_BYTES = 64 * 1024 * 1024  # Most clip bytes kept (WAV is roughly 40 KB per second of speech)
+CLIP_MIME_TYPE = "audio/wav"
+
+
+def clip_id(text, voice=None, rate=SPEECH_RATE, volume=SPEECH_VOLUME):
+    """Stable id of the clip for text under the given voice settings (also its URL/cache key)."""
+    key = f"{voice or ''}|{rate}|{volume}|{text}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+class ClipCache:
+    """
+    Bounded LRU cache of synthesized speech clips keyed by clip_id (phrase
+    plus voice settings). get() never waits: a phrase that isn't cached yet
+    is queued for the synthesis thread (which owns the TTS engine) and is
+    available from a later call. Bounded by entry count and total bytes.
+    """
+
+    def __init__(self, max_entries=CLIP_CACHE_SIZE, max_bytes=CLIP_CACHE_BYTES, voice=None,
+                 rate=SPEECH_RATE, volume=SPEECH_VOLUME, engine_factory=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.voice = voice
+        self.rate = rate
+        self.volume = volume
+        self.engine_factory = engine_factory or self._create_engine
+        self.hits = 0
+        self.misses = 0
+        self.synthesized = 0
+        self._clips = OrderedDict()  # clip id -> WAV bytes, least recently used first
+        self._bytes = 0
+        self._queued = set()
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._thread = None  # Started by the first request, so an unused cache costs nothing
+
+    def _create_engine(self):
+        engine = create_engine(self.rate, self.volume)
+        if self.voice:
+            engine.setProperty('voice', self.voice)
+        return engine
+
+    def id_for(self, text):
+        return clip_id(text, self.voice, self.rate, self.volume)
+
+    def get(self, text):
+        """Returns (clip id, WAV bytes) for text, or None after queueing its synthesis."""
+        key = self.id_for(text)
+        with self._lock:
+            data = self._clips.get(key)
+            if data is not None:
+                self._clips.move_to_end(key)
+                self.hits += 1
+                return key, data
+            self.misses += 1
+        self._request(key, text)
+        return None
+
+    def lookup(self, key):
+        """WAV bytes of a cached clip by id, or None."""
+        with self._lock:
+            data = self._clips.get(key)
+            if data is not None:
+                self._clips.move_to_end(key)
+            return data
+
+    def warm(self, phrases):
+        """Queues synthesis of phrases (e.g. every known cue) so they are cached before first use."""
+        for text in phrases:
+            self._request(self.id_for(text), text)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._clips),
+                "bytes": self._bytes,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+                "synthesized": self.synthesized,
+                "queued": len(self._queued)
+            }
+
+    def close(self):
+        self._queue.put(None)
+
+    def _request(self, key, text):
+        with self._lock:
+            if key in self._clips or key in self._queued:
+                return
+            self._queued.add(key)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="clip-synthesis", daemon=True)
+                self._thread.start()
+        self._queue.put((key, text))
+
+    def _run(self):
+        try:
+            engine = self.engine_factory()
+        except Exception as e:
+            print(f"❌ Text-to-speech unavailable, no feedback clips: {e}")
+            return
+
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            key, text = item
+            try:
+                data = render_clip(engine, text)
+            except Exception as e:
+                print(f"❌ Clip synthesis error for {text!r}: {e}")
+                data = None
+            with self._lock:
+                self._queued.discard(key)
+                if data:
+                    self._store(key, data)
+
+    def _store(self, key, data):
+        self._clips[key] = data
+        self._bytes += len(data)
+        self.synthesized += 1
+        while self._clips and (len(self._clips) > self.max_entries or self._bytes > self.max_bytes):
+            _, evicted = self._clips.popitem(last=False)
+            self._bytes -= len(evicted)
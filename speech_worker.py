@@ -0,0 +1,232 @@
+import heapq
+import io
+import itertools
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+try:
+    import simpleaudio  # Optional: in-process playback of pre-rendered clips
+except ImportError:
+    simpleaudio = None
+
+try:
+    import winsound  # Standard library on Windows
+except ImportError:
+    winsound = None
+
+ANNOUNCEMENT_COOLDOWN = 3.0  # Seconds before the same text is spoken again
+SPEECH_RATE = 150  # Speed of speech (words per minute)
+SPEECH_VOLUME = 0.9  # Volume (0.0 to 1.0)
+MAX_PENDING_CUES = 3  # Most forced cues waiting at once; the oldest are dropped beyond this
+
+# Command-line WAV players shipped with the OS, tried in order when neither module above is available
+PLAYER_COMMANDS = (("afplay",), ("paplay",), ("aplay", "-q"))
+
+# Queue priorities (lower is spoken first)
+FORCE_PRIORITY = 0  # Phase changes and form faults
+HOLD_PRIORITY = 1  # Everything else; superseded by any newer cue
+
+
+def create_engine(rate=SPEECH_RATE, volume=SPEECH_VOLUME):
+    """Creates a pyttsx3 engine. Use it only from the thread that created it."""
+    import pyttsx3
+    engine = pyttsx3.init()
+    engine.setProperty('rate', rate)
+    engine.setProperty('volume', volume)
+    return engine
+
+
+def render_clip(engine, text):
+    """Synthesizes text to WAV bytes with engine (on the engine's own thread)."""
+    fd, path = tempfile.mkstemp(suffix=".wav")
+    os.close(fd)
+    try:
+        engine.save_to_file(text, path)
+        engine.runAndWait()
+        with open(path, "rb") as f:
+            return f.read()
+    finally:
+        os.remove(path)
+
+
+class WavPlayer:
+    """
+    Plays pre-rendered WAV clips with what the system already has:
+    simpleaudio when installed, winsound on Windows, otherwise the OS's
+    command-line player (afplay on macOS, paplay or aplay on Linux).
+    """
+
+    def __init__(self):
+        self.command = None
+        if simpleaudio is None and winsound is None:
+            self.command = next((list(command) for command in PLAYER_COMMANDS if shutil.which(command[0])), None)
+        self._dir = None
+
+    @property
+    def available(self):
+        return simpleaudio is not None or winsound is not None or self.command is not None
+
+    def load(self, data):
+        """Prepares WAV bytes for play(). Returns the clip to pass to it."""
+        if simpleaudio is not None:
+            return simpleaudio.WaveObject.from_wave_file(io.BytesIO(data))
+        if winsound is not None:
+            return data
+        # Command-line players read files, written once per clip
+        if self._dir is None:
+            self._dir = tempfile.mkdtemp(prefix="repwise-clips-")
+        fd, path = tempfile.mkstemp(suffix=".wav", dir=self._dir)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        return path
+
+    def play(self, clip):
+        """Plays a loaded clip and waits until it has finished."""
+        if simpleaudio is not None:
+            clip.play().wait_done()
+        elif winsound is not None:
+            winsound.PlaySound(clip, winsound.SND_MEMORY)
+        else:
+            subprocess.run(self.command + [clip], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def close(self):
+        if self._dir is not None:
+            shutil.rmtree(self._dir, ignore_errors=True)
+            self._dir = None
+
+
+class SpeechWorker:
+    """
+    One long-lived speech thread that owns the TTS engine, so announcements
+    never overlap and say() never blocks the frame loop.
+
+    Cues wait in a small priority queue: forced cues (reps, form faults)
+    before hold cues, oldest first. A new cue supersedes every waiting hold
+    cue, a cue already waiting is merged with its repeat, and a non-forced
+    repeat of the last cue within cooldown seconds is dropped. When idle,
+    the thread pre-renders the given fixed phrases to WAV clips and plays
+    those instead of synthesizing again (see WavPlayer). Without any way to
+    play WAVs, or if playback fails, everything is synthesized live.
+    """
+
+    def __init__(self, phrases=(), engine_factory=create_engine, cooldown=ANNOUNCEMENT_COOLDOWN,
+                 max_pending=MAX_PENDING_CUES, player=None):
+        self.engine_factory = engine_factory
+        self.cooldown = cooldown
+        self.max_pending = max_pending
+        self.player = player or WavPlayer()
+        self.spoken = 0
+        self.merged = 0
+        self.superseded = 0
+        self._to_render = list(dict.fromkeys(phrases)) if self.player.available else []
+        self._clips = {}
+        self._pending = []  # Heap of (priority, seq, text)
+        self._seq = itertools.count()
+        self._last_text = None
+        self._last_time = 0.0
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closed = False
+
+    def say(self, text, force=False):
+        """Queues text to be spoken. Returns False if it was merged into an earlier cue."""
+        if not text:
+            return False
+        now = time.monotonic()
+        with self._cond:
+            if not force and text == self._last_text and now - self._last_time < self.cooldown:
+                self.merged += 1
+                return False
+            if any(pending == text for _, _, pending in self._pending):
+                if force:
+                    # Promote the waiting copy
+                    self._pending = [item for item in self._pending if item[2] != text]
+                    heapq.heapify(self._pending)
+                else:
+                    self.merged += 1
+                    return False
+
+            # Anything not forced that is still waiting is stale now
+            kept = [item for item in self._pending if item[0] == FORCE_PRIORITY]
+            self.superseded += len(self._pending) - len(kept)
+            if force and len(kept) >= self.max_pending:
+                kept.sort()
+                self.superseded += len(kept) - self.max_pending + 1
+                kept = kept[len(kept) - self.max_pending + 1:]
+            self._pending = kept
+            heapq.heapify(self._pending)
+            heapq.heappush(self._pending, (FORCE_PRIORITY if force else HOLD_PRIORITY, next(self._seq), text))
+
+            self._last_text = text
+            self._last_time = now
+            self.start()
+            self._cond.notify()
+        return True
+
+    def stats(self):
+        with self._cond:
+            return {
+                "pending": len(self._pending),
+                "spoken": self.spoken,
+                "merged": self.merged,
+                "superseded": self.superseded,
+                "clips": len(self._clips)
+            }
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+    def start(self):
+        """Starts the speech thread (say() does this too). Pre-rendering begins right away."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="speech-worker", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        try:
+            engine = self.engine_factory()
+        except Exception as e:
+            print(f"❌ Text-to-speech unavailable: {e}")
+            return
+
+        while True:
+            with self._cond:
+                while not self._pending and not self._to_render and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    self.player.close()
+                    return
+                text = heapq.heappop(self._pending)[2] if self._pending else None
+                render = self._to_render.pop(0) if text is None else None
+
+            try:
+                if text is not None:
+                    self._speak(engine, text)
+                    self.spoken += 1
+                elif render not in self._clips:
+                    # Idle: pre-render a fixed phrase so it never needs synthesis again
+                    clip = render_clip(engine, render)
+                    self._clips[render] = self.player.load(clip)
+            except Exception as e:
+                print(f"❌ Speech error: {e}")
+
+    def _speak(self, engine, text):
+        clip = self._clips.get(text)
+        if clip is not None:
+            try:
+                self.player.play(clip)
+                return
+            except Exception as e:
+                # E.g. no audio device for the command-line player: synthesize from now on
+                print(f"⚠️ Clip playback failed, speaking live instead: {e}")
+                with self._cond:
+                    self._to_render = []
+                    self._clips.clear()
+        engine.say(text)
+        engine.runAndWait()
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("flask_socketio")
+
+import flask_backend
+from pose_result import NUM_KEYPOINTS, PoseResult
+from roi_tracker import RoiTracker, tracked_inference
+
+
+class FakeWorkerPool:
+    """Stands in for InferenceWorkerPool: one person at a fixed box, in the coordinates of the given image."""
+
+    def __init__(self, max_side):
+        self.max_side = max_side
+        self.calls = []
+
+    def fits(self, frame):
+        return max(frame.shape[:2]) <= self.max_side
+
+    def infer(self, frame, imgsz=None):
+        self.calls.append((frame.shape[:2], imgsz))
+        keypoints = np.full((1, NUM_KEYPOINTS, 3), 1.0, np.float32)
+        keypoints[..., :2] = 20
+        boxes = np.array([[10, 10, 40, 60, 0.9, 0]], np.float32)
+        return PoseResult(keypoints, boxes, frame)
+
+
+def test_roi_crops_run_on_the_worker_pool(monkeypatch):
+    pool = FakeWorkerPool(max_side=1280)
+    monkeypatch.setattr(flask_backend, "worker_pool", pool)
+    tracker = RoiTracker()
+    frame = np.zeros((480, 640, 3), np.uint8)
+
+    tracked_inference(tracker, frame, flask_backend.pooled_infer)  # Full frame finds the athlete
+    tracked_inference(tracker, frame, flask_backend.pooled_infer)  # Then a crop at the ROI input size
+
+    assert pool.calls[0] == ((480, 640), None)
+    assert pool.calls[1][1] == tracker.input_size
+    assert tracker.crop_frames == 1
+
+
+def test_oversized_roi_frames_fall_back_with_the_input_size(monkeypatch):
+    pool = FakeWorkerPool(max_side=32)  # Every frame is too large for a slot
+    fallback = []
+    monkeypatch.setattr(flask_backend, "worker_pool", pool)
+    monkeypatch.setattr(flask_backend, "infer_frame",
+                        lambda frame, imgsz=None: fallback.append(imgsz) or FakeWorkerPool(0).infer(frame))
+    tracker = RoiTracker()
+    frame = np.zeros((1080, 1920, 3), np.uint8)
+
+    tracked_inference(tracker, frame, flask_backend.pooled_infer)
+    tracked_inference(tracker, frame, flask_backend.pooled_infer)
+
+    assert pool.calls == []
+    assert fallback == [None, tracker.input_size]
@@ -0,0 +1,19 @@
+from slow_frames import SlowFrameTracer
+
+
+def test_expired_frames_do_not_block_newer_slow_frames():
+    now = [1000.0]
+    tracer = SlowFrameTracer(capacity=4, budget_ms=100.0, max_age=600.0, clock=lambda: now[0])
+
+    # Cold-start spike fills the ring
+    for _ in range(4):
+        tracer.record(2000.0, {"infer": 2000.0}, "client")
+
+    # Twenty minutes later the spike has expired; newer slow frames must be kept
+    now[0] += 20 * 60
+    for _ in range(10):
+        tracer.record(900.0, {"infer": 900.0}, "client")
+
+    frames = tracer.dump()["frames"]
+    assert len(frames) == 4
+    assert all(frame["total_ms"] == 900.0 for frame in frames)
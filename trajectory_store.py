@@ -0,0 +1,199 @@
+import json
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from pose_features import COCO_FEATURES, yolo_points
+from pose_result import KEYPOINT_CONF_THRESHOLD, NUM_KEYPOINTS
+
+FORMAT_VERSION = 1
+PHASES = ("ready", "down", "up", "waiting")  # Rep phase codes; anything else is stored as UNKNOWN_PHASE
+UNKNOWN_PHASE = 255
+WRITE_QUEUE_SIZE = 4096  # Records waiting for the writer thread before new ones are dropped
+WRITE_BATCH_SIZE = 256  # Most records written per batch
+
+FLAG_PERSON = 1  # A person was detected
+FLAG_PREDICTED = 2  # Keypoints were predicted, not inferred (see adaptive_rate)
+
+# One fixed-width record per frame; files are plain arrays of these
+RECORD_DTYPE = np.dtype([
+    ("t", "<f8"),  # Unix time
+    ("frame", "<u4"),  # Frame number within the session
+    ("keypoints", "<f4", (NUM_KEYPOINTS, 3)),  # x, y, confidence
+    ("angles", "<f4", (len(COCO_FEATURES.angle_names),)),  # See angle_names in format.json
+    ("rep_count", "<u4"),
+    ("phase", "u1"),
+    ("flags", "u1")
+])
+
+
+class TrajectoryWriter:
+    """
+    Appends per-frame pose records to one file per session, on a background
+    thread so the frame path only pays for a queue put. Joint angles are
+    computed on the writer thread for a whole batch in one kernel call.
+    An index.jsonl line is written when a session's file is created.
+    """
+
+    def __init__(self, directory, queue_size=WRITE_QUEUE_SIZE):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        _write_format(directory)
+        self._queue = queue.Queue(queue_size)
+        self._files = {}
+        self._frames = {}
+        self.written = 0
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name="trajectory-writer", daemon=True)
+        self._thread.start()
+
+    def append(self, session_id, exercise, keypoints, rep_count, phase, flags=0):
+        """Queues one frame's record. keypoints is the (17, 3) first person, or None."""
+        if keypoints is not None:
+            keypoints = np.array(keypoints, dtype=np.float32)
+        try:
+            self._queue.put_nowait(("record", session_id, exercise, time.time(), keypoints,
+                                    rep_count, phase, flags))
+        except queue.Full:
+            self.dropped += 1
+
+    def close_session(self, session_id):
+        """Flushes and closes a session's file (e.g. on disconnect)."""
+        self._queue.put(("close", session_id))
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            batch = []
+            while item is not None:
+                if item[0] == "close":
+                    self._write_logged(batch)
+                    batch = []
+                    handle = self._files.pop(item[1], None)
+                    try:
+                        if handle is not None:
+                            handle.close()
+                    except Exception as e:
+                        print(f"❌ Trajectory write error: {e}")
+                else:
+                    batch.append(item)
+                if len(batch) >= WRITE_BATCH_SIZE:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            stopping = item is None
+            self._write_logged(batch)
+
+        for handle in self._files.values():
+            handle.close()
+
+    def _write_logged(self, batch):
+        # An I/O error loses this batch only; the writer thread keeps going
+        try:
+            self._write(batch)
+        except Exception as e:
+            print(f"❌ Trajectory write error: {e}")
+
+    def _write(self, batch):
+        if not batch:
+            return
+        records = np.zeros(len(batch), RECORD_DTYPE)
+        for i, (_, session_id, _, t, keypoints, rep_count, phase, flags) in enumerate(batch):
+            records[i]["t"] = t
+            records[i]["rep_count"] = rep_count
+            records[i]["phase"] = PHASES.index(phase) if phase in PHASES else UNKNOWN_PHASE
+            records[i]["flags"] = flags
+            if keypoints is not None:
+                records[i]["keypoints"] = keypoints
+        # Every angle of every record in one vectorized call; NaN where a joint wasn't seen
+        angles, _, visibility = COCO_FEATURES(yolo_points(records["keypoints"]))
+        angles[visibility < KEYPOINT_CONF_THRESHOLD] = np.nan
+        records["angles"] = angles
+
+        sessions = [item[1] for item in batch]
+        for session_id in dict.fromkeys(sessions):
+            rows = [i for i, s in enumerate(sessions) if s == session_id]
+            handle = self._open(session_id, batch[rows[0]])
+            start = self._frames.get(session_id, 0)
+            records["frame"][rows] = np.arange(start, start + len(rows))
+            self._frames[session_id] = start + len(rows)
+            handle.write(records[rows].tobytes())
+            handle.flush()
+        self.written += len(batch)
+
+    def _open(self, session_id, first):
+        handle = self._files.get(session_id)
+        if handle is None:
+            path = os.path.join(self.directory, f"{session_id}.traj")
+            if not os.path.exists(path):
+                with open(os.path.join(self.directory, "index.jsonl"), "a") as index:
+                    index.write(json.dumps({"session": session_id, "file": os.path.basename(path),
+                                            "exercise": first[2], "start": first[3]}) + "\n")
+            else:
+                self._frames.setdefault(session_id, os.path.getsize(path) // RECORD_DTYPE.itemsize)
+            handle = self._files[session_id] = open(path, "ab")
+        return handle
+
+
+class TrajectoryStore:
+    """
+    Read side: memory-maps session files as RECORD_DTYPE arrays, so replaying
+    months of sessions through new rule logic never copies or re-infers.
+    Columns are views, e.g. store.load(sid)["angles"][:, i].
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, "format.json")) as f:
+            self.format = json.load(f)
+        if self.format["version"] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported trajectory format version {self.format['version']}")
+        self.angle_index = {name: i for i, name in enumerate(self.format["angle_names"])}
+
+    def sessions(self, start=None, end=None):
+        """Index entries, oldest first, optionally only sessions that began in [start, end)."""
+        path = os.path.join(self.directory, "index.jsonl")
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+        return sorted((e for e in entries if (start is None or e["start"] >= start)
+                       and (end is None or e["start"] < end)), key=lambda e: e["start"])
+
+    def load(self, session_id, start=None, end=None):
+        """Zero-copy view of a session's records, optionally only those with start <= t < end."""
+        path = os.path.join(self.directory, f"{session_id}.traj")
+        count = os.path.getsize(path) // RECORD_DTYPE.itemsize
+        if count == 0:
+            return np.zeros(0, RECORD_DTYPE)
+        records = np.memmap(path, RECORD_DTYPE, mode="r", shape=(count,))
+        lo = np.searchsorted(records["t"], start) if start is not None else 0
+        hi = np.searchsorted(records["t"], end) if end is not None else count
+        return records[lo:hi]
+
+    def replay(self, start=None, end=None):
+        """Yields (index entry, records) for every session that began in [start, end)."""
+        for entry in self.sessions(start, end):
+            yield entry, self.load(entry["session"])
+
+
+def _write_format(directory):
+    path = os.path.join(directory, "format.json")
+    if not os.path.exists(path):
+        with open(path, "w") as f:
+            json.dump({
+                "version": FORMAT_VERSION,
+                "dtype": RECORD_DTYPE.descr,
+                "angle_names": COCO_FEATURES.angle_names,
+                "phases": PHASES
+            }, f, indent=2)